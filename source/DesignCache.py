@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+class DesignCache:
+    """Content-addressed cache of evaluated designs.
+
+    Entries are keyed by a hash of the design inputs (see key()) and hold
+    whatever the caller stores for that design: the derived state of a
+    GearPair, tessellated tooth profiles, batch results.  Because the key is
+    the content, any two routes to the same design (undo, reopening a file,
+    overlapping batch runs) share one entry.
+
+    In memory the least recently used entries are evicted once the total size
+    goes over maxBytes.  If path is given, entries are also written to a
+    directory store there, one file per key, and misses in memory are looked
+    up on disk.  Files are written to a temporary name and renamed into place,
+    so several processes can share the store without locking; the worst case
+    is two processes computing the same entry.
+
+    Entries are made of dicts, lists, strings, numbers and NumPy arrays, and
+    are stored on disk as JSON, so reading a file someone else put in a
+    shared store can't run code the way unpickling it could.
+    """
+
+    def __init__(self, maxBytes=64*2**20, path=None):
+        self.maxBytes = maxBytes
+        self.path = path
+
+        self.entries = OrderedDict()    # key : entry, least recently used first
+        self.sizes = {}                 # key : estimated entry size in bytes
+        self.nbytes = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        if self.path is not None:
+            os.makedirs(self.path, exist_ok=True)
+
+    @staticmethod
+    def key(_design):
+        """Canonical hash of a design dict, e.g. from GearPair.createJSON().
+
+        Numbers are compared by value, so 17 and 17.0 give the same key.
+        """
+        def canonical(value):
+            if isinstance(value, dict):
+                return {str(k) : canonical(v) for k, v in value.items()}
+            if isinstance(value, (list, tuple)):
+                return [canonical(v) for v in value]
+            if isinstance(value, (bool, np.bool_)):
+                return bool(value)
+            if isinstance(value, (int, float, np.number)):
+                return repr(float(value))
+            return value
+
+        text = json.dumps(canonical(_design), sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, _key):
+        return _key in self.entries or (self.path is not None and os.path.exists(self.filePath(_key)))
+
+    def get(self, _key):
+        """Returns the entry stored under _key, or None."""
+        if _key in self.entries:
+            self.entries.move_to_end(_key)
+            self.hits += 1
+            return self.entries[_key]
+
+        if self.path is not None:
+            try:
+                with open(self.filePath(_key), 'r', encoding='utf-8') as f:
+                    entry = json.load(f, object_hook=fromJSON)
+            except (OSError, ValueError):
+                entry = None
+            if entry is not None:
+                self.hits += 1
+                self.store(_key, entry)
+                return entry
+
+        self.misses += 1
+        return None
+
+    def put(self, _key, _entry):
+        """Stores _entry under _key, in memory and on disk."""
+        self.store(_key, _entry)
+        self.persist(_key)
+
+    def update(self, _key, _name, _value):
+        """Adds one item to the dict entry under _key, e.g. a tessellated profile."""
+        entry = self.entries.get(_key)
+        if entry is None:
+            return
+        entry[_name] = _value
+        self.store(_key, entry)
+        self.persist(_key)
+
+    def clear(self):
+        """Empties the memory cache.  The disk store is left alone."""
+        self.entries.clear()
+        self.sizes.clear()
+        self.nbytes = 0
+
+    def store(self, _key, _entry):
+        self.nbytes -= self.sizes.get(_key, 0)
+        self.entries[_key] = _entry
+        self.entries.move_to_end(_key)
+        self.sizes[_key] = entrySize(_entry)
+        self.nbytes += self.sizes[_key]
+
+        # evict least recently used, but keep the newest entry
+        while self.nbytes > self.maxBytes and len(self.entries) > 1:
+            oldKey, oldEntry = self.entries.popitem(last=False)
+            self.nbytes -= self.sizes.pop(oldKey)
+
+    def filePath(self, _key):
+        return os.path.join(self.path, _key[:2], _key[2:] + '.json')
+
+    def persist(self, _key):
+        if self.path is None:
+            return
+
+        filePath = self.filePath(_key)
+        os.makedirs(os.path.dirname(filePath), exist_ok=True)
+
+        # write then rename, readers never see a partial file
+        fd, tmpPath = tempfile.mkstemp(dir=os.path.dirname(filePath), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.entries[_key], f, default=toJSON, separators=(',', ':'))
+            os.replace(tmpPath, filePath)
+        except (OSError, TypeError, ValueError):
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+
+def toJSON(_value):
+    """json.dump default for the NumPy parts of an entry."""
+    if isinstance(_value, np.ndarray):
+        return {"__ndarray__" : _value.tolist(), "dtype" : str(_value.dtype)}
+    if isinstance(_value, np.generic):
+        return _value.item()
+    raise TypeError("Can't store a " + type(_value).__name__ + " in a DesignCache file")
+
+def fromJSON(_dict):
+    """json.load object_hook, turns toJSON() arrays back into arrays."""
+    if "__ndarray__" in _dict:
+        return np.array(_dict["__ndarray__"], dtype=_dict["dtype"])
+    return _dict
+
+def entrySize(_value):
+    """Rough size in bytes of a cache entry."""
+    if isinstance(_value, np.ndarray):
+        return _value.nbytes + 112
+    if isinstance(_value, dict):
+        return 64 + sum(entrySize(k) + entrySize(v) for k, v in _value.items())
+    if isinstance(_value, (list, tuple)):
+        return 56 + sum(entrySize(v) for v in _value)
+    if isinstance(_value, str):
+        return 49 + len(_value)
+    return 32
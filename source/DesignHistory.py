@@ -0,0 +1,79 @@
+import sys
+from collections import namedtuple
+
+# Immutable copy of the inputs of a GearPair, see GearPair.snapshot().  gear1
+# and gear2 hold the values of Gear.inputNames, mesh those of
+# GearPair.meshInputs.  Snapshots taken one after the other share the parts
+# that didn't change, so an edit to one gear only costs a new tuple for that
+# gear.
+DesignSnapshot = namedtuple('DesignSnapshot', ['gear1', 'gear2', 'mesh'])
+
+class DesignHistory:
+    """Undo / redo stack of DesignSnapshots.
+
+    Only the inputs are kept.  Restoring a snapshot with
+    GearPair.restoreSnapshot() re-evaluates the design, which with a
+    DesignCache attached is a cache hit rather than a re-solve.  Past
+    maxLength snapshots the oldest are dropped.
+    """
+
+    def __init__(self, maxLength=10000):
+        self.maxLength = maxLength
+        self.snapshots = []
+        self.index = -1                 # position of the current design
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def current(self):
+        return self.snapshots[self.index] if self.snapshots else None
+
+    def push(self, _snapshot):
+        """Records a new current design, dropping anything that could be redone.
+
+        A snapshot equal to the current one is ignored, so it is safe to push
+        after every edit, including ones that didn't change anything.
+        """
+        if self.snapshots and _snapshot == self.current():
+            return
+
+        del self.snapshots[self.index+1:]
+        self.snapshots.append(_snapshot)
+        if len(self.snapshots) > self.maxLength:
+            del self.snapshots[:len(self.snapshots) - self.maxLength]
+        self.index = len(self.snapshots) - 1
+
+    def canUndo(self):
+        return self.index > 0
+
+    def canRedo(self):
+        return self.index < len(self.snapshots) - 1
+
+    def undo(self):
+        """Steps back, returns the snapshot to restore or None."""
+        if not self.canUndo():
+            return None
+        self.index -= 1
+        return self.current()
+
+    def redo(self):
+        """Steps forward, returns the snapshot to restore or None."""
+        if not self.canRedo():
+            return None
+        self.index += 1
+        return self.current()
+
+    def nbytes(self):
+        """Memory held by the history, counting shared tuples and values once."""
+        seen = set()
+        total = sys.getsizeof(self.snapshots)
+        pending = list(self.snapshots)
+        while pending:
+            item = pending.pop()
+            if id(item) in seen:
+                continue
+            seen.add(id(item))
+            total += sys.getsizeof(item)
+            if isinstance(item, tuple):
+                pending.extend(item)
+        return total
@@ -0,0 +1,221 @@
+from GearPairBatch import GearPairBatch
+
+import glob
+import json
+import os
+import sqlite3
+
+import numpy as np
+
+class DesignStore:
+    """SQLite store of many designs and their computed results.
+
+    Each row holds a design dict as written by GearPair.createJSON(), the
+    name it was stored under (usually the file it came from), and columns
+    for the main inputs and results, so questions like "every pair with mod
+    1.5, CR > 1.4 and pinion bending stress under 200 MPa" are one indexed
+    query instead of opening files one by one.
+
+    Results are computed with GearPairBatch when designs are added, so bulk
+    imports evaluate the whole set in one vectorized pass and insert it in
+    one transaction.
+
+    nearest() finds the designs most like a given one in the space of the
+    main inputs, each divided by its standard deviation over the store.  The
+    inputs of every stored design are read into an array once and kept
+    until the next write, so repeated searches over 10^5 designs take
+    milliseconds.
+    """
+
+    defaultPath = os.path.join(os.path.expanduser("~"), ".jpgearqt", "designs.sqlite")
+
+    # column : GearPairBatch attribute it comes from
+    columns = {
+        'N1' : 'N1', 'N2' : 'N2', 'mod' : 'mod', 'PA_deg' : 'PA_deg', 'x1' : 'x1', 'x2' : 'x2',
+        'CD' : 'CD', 'bkl' : 'bkl', 'torque' : 'torque', 'FW' : 'FW',
+        'OPA_deg' : 'OPA_deg', 'CR' : 'CR',
+        'stressB1' : 'stressB1', 'stressB2' : 'stressB2', 'stressC' : 'stressC',
+        'undercut1' : 'undercut1', 'undercut2' : 'undercut2',
+    }
+    indexed = ['N1', 'N2', 'mod', 'CD', 'CR', 'stressB1', 'stressB2', 'stressC']
+    # inputs compared by nearest()
+    featureColumns = ['N1', 'N2', 'mod', 'PA_deg', 'x1', 'x2']
+
+    def __init__(self, path=None):
+        self.path = self.defaultPath if path is None else path
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self.connection = sqlite3.connect(self.path)
+        self.connection.row_factory = sqlite3.Row
+
+        self.features = None            # (ids, array of featureColumns), until the next write
+
+        columnDefs = ", ".join(name + (" INTEGER" if name.startswith('undercut') else " REAL")
+                               for name in self.columns)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS designs (id INTEGER PRIMARY KEY, "
+                                    "name TEXT, design TEXT NOT NULL, converged INTEGER, " + columnDefs + ")")
+            for name in self.indexed:
+                self.connection.execute("CREATE INDEX IF NOT EXISTS idx_" + name + " ON designs (" + name + ")")
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM designs").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+# Adding designs ##############################################################
+    def add(self, _design, name=None):
+        """Stores one design dict, returns its id."""
+        return self.addMany([_design], [name])[0]
+
+    def addMany(self, _designs, names=None):
+        """Evaluates and stores a list of design dicts in one transaction, returns their ids."""
+        if names is None:
+            names = [None]*len(_designs)
+
+        # a batch needs all designs on the same backlash / center distance input
+        rows = [None]*len(_designs)
+        for CD_bkl in [0, 1]:
+            group = [i for i, design in enumerate(_designs) if design["Mesh"]["set_CD_bkl"] == CD_bkl]
+            if not group:
+                continue
+            batch = GearPairBatch.fromJSON([_designs[i] for i in group]).evaluate()
+            converged = np.logical_and.reduce([np.broadcast_to(value, batch.shape)
+                                               for value in batch.converged.values()])
+            values = [self.sqlValues(getattr(batch, attribute)) for attribute in self.columns.values()]
+            for k, i in enumerate(group):
+                rows[i] = [names[i], json.dumps(_designs[i], separators=(',', ':')), int(converged[k])] + \
+                          [value[k] for value in values]
+
+        sql = ("INSERT INTO designs (name, design, converged, " + ", ".join(self.columns) + ") VALUES (" +
+               ", ".join(["?"]*(len(self.columns) + 3)) + ")")
+        ids = []
+        with self.connection:
+            for row in rows:
+                ids.append(self.connection.execute(sql, row).lastrowid)
+        self.features = None
+        return ids
+
+    @staticmethod
+    def sqlValues(_array):
+        """Column of batch results as a list of Python numbers, NaN as NULL."""
+        array = np.ravel(_array)
+        if array.dtype == bool:
+            return array.astype(int).tolist()
+        values = array.astype(float).tolist()
+        for k in np.flatnonzero(np.isnan(array)):
+            values[k] = None
+        return values
+
+    def importFolder(self, _folder, pattern="*.json"):
+        """Stores every design file in a folder, returns (ids, files that couldn't be read)."""
+        designs = []
+        names = []
+        skipped = []
+        for path in sorted(glob.glob(os.path.join(_folder, pattern))):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    design = json.load(f)
+                design["Mesh"]["set_CD_bkl"]
+            except (OSError, ValueError, KeyError, TypeError):
+                skipped.append(path)
+                continue
+            designs.append(design)
+            names.append(path)
+
+        ids = self.addMany(designs, names) if designs else []
+        return ids, skipped
+
+    def remove(self, _id):
+        with self.connection:
+            self.connection.execute("DELETE FROM designs WHERE id = ?", (_id,))
+        self.features = None
+
+# Queries #####################################################################
+    def design(self, _id):
+        """The design dict stored under _id, for GearPair.apply_design()."""
+        row = self.connection.execute("SELECT design FROM designs WHERE id = ?", (_id,)).fetchone()
+        if row is None:
+            raise KeyError(_id)
+        return json.loads(row['design'])
+
+    def find(self, orderBy=None, limit=None, **_constraints):
+        """Stored designs meeting every constraint, as a list of dicts of the columns.
+
+        Each constraint is a column name with either a value, matched
+        exactly, or a (low, high) range where either end can be None, e.g.
+            store.find(mod=1.5, CR=(1.4, None), stressB1=(None, 200))
+        """
+        where = []
+        params = []
+        for name, value in _constraints.items():
+            self.checkColumn(name)
+            if isinstance(value, (tuple, list)):
+                low, high = value
+                if low is not None:
+                    where.append(name + " >= ?")
+                    params.append(low)
+                if high is not None:
+                    where.append(name + " <= ?")
+                    params.append(high)
+            else:
+                where.append(name + " = ?")
+                params.append(value)
+
+        sql = "SELECT id, name, converged, " + ", ".join(self.columns) + " FROM designs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if orderBy is not None:
+            self.checkColumn(orderBy)
+            sql += " ORDER BY " + orderBy
+        if limit is not None:
+            sql += " LIMIT " + str(int(limit))
+
+        return [dict(row) for row in self.connection.execute(sql, params)]
+
+    def checkColumn(self, _name):
+        # names go into the SQL text, so only known columns are allowed
+        if _name not in self.columns:
+            raise ValueError("Unknown design store column '" + str(_name) + "', use one of " + ", ".join(self.columns))
+
+    def nearest(self, _design, k=10):
+        """The k stored designs most like a design dict, closest first.
+
+        Distance is over featureColumns, each scaled by its standard
+        deviation across the store.  Returns dicts of the columns, with the
+        distance added.
+        """
+        if self.features is None:
+            rows = self.connection.execute("SELECT id, " + ", ".join(self.featureColumns) +
+                                           " FROM designs").fetchall()
+            ids = np.array([row[0] for row in rows], dtype=int)
+            values = np.array([tuple(row)[1:] for row in rows], dtype=float).reshape(len(rows), -1)
+            self.features = (ids, values)
+
+        ids, values = self.features
+        if len(ids) == 0:
+            return []
+
+        target = np.array([self.feature(_design, name) for name in self.featureColumns])
+        scale = np.nanstd(values, axis=0)
+        scale = np.where(scale > 0, scale, 1)
+        distance = np.sqrt(np.nansum(((values - target)/scale)**2, axis=1))
+
+        k = min(k, len(ids))
+        best = np.argpartition(distance, k-1)[:k]
+        best = best[np.argsort(distance[best])]
+
+        found = []
+        for i in best:
+            row = self.connection.execute("SELECT id, name, converged, " + ", ".join(self.columns) +
+                                          " FROM designs WHERE id = ?", (int(ids[i]),)).fetchone()
+            found.append(dict(row, distance=float(distance[i])))
+        return found
+
+    @staticmethod
+    def feature(_design, _name):
+        if _name[-1] in '12':
+            return float(_design["Gear"+_name[-1]][_name[:-1]])
+        return float(_design["Mesh"][_name])
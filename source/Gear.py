@@ -1,4 +1,17 @@
 class Gear:
+    """Inputs and derived geometry of one gear of a GearPair.
+
+    Slotted, so a gear is a fixed record without a per-instance __dict__,
+    which keeps large numbers of designs small in memory.
+    """
+
+    __slots__ = ('ID', 'N', 'x', 'tts', 'tt', 'Rs', 'Rp', 'Rb', 'Pb', 'Ros', 'Ro', 'Romax',
+                 'Rtip', 'Rtip_max', 'Roe', 'Rr', 'Rrs', 'Rf', 'Rff', 'theta_F', 'phi_JFI',
+                 'Rhp', 'undercut', 'FW', 'E', 'nu', 'stressB', 'lewisParams')
+
+    # the user inputs, as saved by GearPair.createJSON()
+    inputNames = ('N', 'x', 'Ro', 'Rtip', 'Rf', 'FW', 'E', 'nu')
+
     def __init__(self, _ID):
         self.ID = _ID
 
@@ -35,3 +48,6 @@ class Gear:
         self.FW = 1				# face width
         self.E = 200000                         # Young's modulus
         self.nu = 0.3                           # Poisson's ratio
+
+        self.stressB = 0                        # Lewis bending stress
+        self.lewisParams = None                 # [Rd, gamma, x, y, a] of the Lewis parabola
@@ -0,0 +1,1114 @@
+from Gear import Gear
+from DesignCache import DesignCache
+from DesignHistory import DesignSnapshot
+from ToothProfile import ToothProfile
+from GearPairBatch import GearPairBatch
+import quality
+from involute import tau, invF, revInvF
+from solvers import solveOPA, solveMaxTipRadius, solveFullFillet, solveLewisParabola
+
+from numpy import pi, sin, cos, tan, arcsin, arccos, arctan
+from numpy import rad2deg, deg2rad
+from numpy import sqrt
+
+from contextlib import contextmanager
+
+def is_number(n):
+    try:
+        float(n)
+    except (ValueError, TypeError):
+        return False
+    return True
+
+class GearPair:
+    """Gear mesh computation engine.
+
+    Holds the two gears and the mesh parameters, and keeps every derived
+    quantity up to date as the inputs change.  Nothing in here knows about Qt,
+    so a GearPair can be evaluated headless (scripts, worker processes) and the
+    jpgearqt widget only has to display the results.
+    """
+
+    def __init__(self, _G1=None, _G2=None):
+        # gear objects
+        self.G1 = _G1 if _G1 is not None else Gear(1)
+        self.G2 = _G2 if _G2 is not None else Gear(2)
+
+        # mesh parameters
+        self.mod = -1                   # module
+        self.PA_deg = 20                # pressure angle, degrees
+        self.PA = deg2rad(self.PA_deg)  # pressure angle, radians
+        self.OPA_deg = -1               # operating pressure angle, degrees
+        self.OPA = -1                   # operating pressure angle, radians
+        self.CD_bkl = 0                 # 0: backlash is the input, 1: center distance is the input
+        self.bkl = 0                    # backlash
+        self.rtcl1 = 0                  # root clearances
+        self.rtcl2 = 0
+        self.rtclStd = True             # root clearances follow the standard value
+        self.CD = -1                    # center distance
+        self.CR = 0                     # contact ratio
+        self.speed = 1                  # pinion speed
+        self.torque = 1                 # pinion torque
+
+        # AGMA-908 line of action parameters
+        self.C1 = self.C2 = self.C3 = self.C4 = self.C5 = self.C6 = 0
+        self.LoC = 0                    # length of line of contact
+
+        # stress results
+        self.velocity = 0               # pitch line velocity
+        self.stressC = 0                # contact stress
+
+        self.converged = {}             # convergence of the last solve of each kind
+
+        # optional DesignCache of evaluated designs
+        self.cache = None
+        self.cacheKeys = []             # keys of the current design's entry, empty if it isn't cached
+        self.cacheEntry = None
+
+        # tooth outlines, kept up to date incrementally, see toothProfile()
+        self.profiles = {}
+
+        # continuation for sweeps, seed each solve from the previous designs
+        self.continuation = False
+        self.solutionHistory = {}       # last two solutions of each solve
+
+        self.setupGraph()
+
+    def setupGraph(self):
+        """Builds the dependency graph of derived quantities.
+
+        Each node updates one group of derived quantities.  The nodes are listed
+        in evaluation order, with the upstream nodes whose results they read.
+        Setters mark the node that consumes their input as dirty, and
+        evaluate() recomputes the dirty nodes plus everything downstream of
+        them, each exactly once.
+        """
+        G1 = self.G1
+        G2 = self.G2
+
+        # node : (upstream nodes, update function)
+        self.graph = {
+            'tts1'      : ([], lambda: self.updateStandardToothThickness(G1)),
+            'tts2'      : ([], lambda: self.updateStandardToothThickness(G2)),
+            'base1'     : ([], lambda: self.updateBaseAndPitch(G1)),
+            'base2'     : ([], lambda: self.updateBaseAndPitch(G2)),
+            'Romax1'    : (['tts1', 'base1'], lambda: self.updateRomax(G1)),
+            'Romax2'    : (['tts2', 'base2'], lambda: self.updateRomax(G2)),
+            'pitch'     : (['tts1', 'tts2', 'base1', 'base2'], lambda: self.updateCenterDistance()),
+            # Ro only reads Rp to pick its default, so it follows 'pitch' without depending on it
+            'Ro1'       : (['Romax1'], lambda: self.updateOuterRadius(G1)),
+            'Ro2'       : (['Romax2'], lambda: self.updateOuterRadius(G2)),
+            'Rtip_max1' : (['Ro1'], lambda: self.updateMaxTipRadius(G1)),
+            'Rtip_max2' : (['Ro2'], lambda: self.updateMaxTipRadius(G2)),
+            'Rtip1'     : (['Rtip_max1'], lambda: self.updateTipRadius(G1)),
+            'Rtip2'     : (['Rtip_max2'], lambda: self.updateTipRadius(G2)),
+            'Roe1'      : (['Rtip1'], lambda: self.updateRoe(G1)),
+            'Roe2'      : (['Rtip2'], lambda: self.updateRoe(G2)),
+            'CR'        : (['pitch', 'Roe1', 'Roe2'], lambda: self.updateContactRatio()),
+            'rtcl'      : (['pitch'], lambda: self.calcStandardRtcl()),
+            'Rr1'       : (['rtcl', 'Ro2'], lambda: self.updateRootRadius(G1)),
+            'Rr2'       : (['rtcl', 'Ro1'], lambda: self.updateRootRadius(G2)),
+            'Rff1'      : (['Rr1'], lambda: self.updateMaxRootFillet(G1)),
+            'Rff2'      : (['Rr2'], lambda: self.updateMaxRootFillet(G2)),
+            'Rf1'       : (['Rff1'], lambda: self.updateRootFillet(G1)),
+            'Rf2'       : (['Rff2'], lambda: self.updateRootFillet(G2)),
+            'JFI1'      : (['Rf1'], lambda: self.checkUndercut(G1)),
+            'JFI2'      : (['Rf2'], lambda: self.checkUndercut(G2)),
+        }
+
+        # reverse edges, for finding everything downstream of an edit
+        self.dependents = {node : [] for node in self.graph}
+        for node, (upstream, update) in self.graph.items():
+            for parent in upstream:
+                self.dependents[parent].append(node)
+
+        self.dirty = set()
+        self.recomputed = []            # nodes recomputed by the last evaluate()
+        self.batchDepth = 0             # nesting of batch() blocks, evaluation waits for the outermost
+
+    def markDirty(self, *_nodes):
+        self.dirty.update(_nodes)
+
+    @contextmanager
+    def batch(self):
+        """Groups edits into one evaluation.
+
+        Inside the with block the setters only assign their inputs and mark
+        nodes dirty, and the graph is evaluated once when the outermost block
+        exits, e.g.
+            with pair.batch():
+                pair.set_N(pair.G1, 20)
+                pair.set_N(pair.G2, 60)
+                pair.set_Rf(pair.G1, 0.4)
+        so the result doesn't depend on the order of the edits, and no edit
+        is evaluated against a half applied design.
+        """
+        self.batchDepth += 1
+        try:
+            yield self
+        finally:
+            self.batchDepth -= 1
+            if self.batchDepth == 0:
+                self.evaluate()
+
+    def evaluate(self):
+        """Recomputes the dirty nodes and everything downstream of them.
+
+        With a cache attached, a design that has been evaluated before is
+        restored from the cache instead.  Inside a batch() nothing is
+        evaluated until the batch ends.  Returns the number of nodes that
+        were recomputed.
+        """
+        if self.batchDepth > 0:
+            return 0
+
+        key = None
+        if self.cache is not None and self.dirty:
+            key = self.designKey()
+            entry = self.cache.get(key)
+            if entry is not None:
+                self.restoreState(entry['state'])
+                self.cacheKeys, self.cacheEntry = [key], entry
+                self.dirty.clear()
+                self.recomputed = []
+                return 0
+
+        stale = set()
+        pending = list(self.dirty)
+        while pending:
+            node = pending.pop()
+            if node not in stale:
+                stale.add(node)
+                pending.extend(self.dependents[node])
+
+        self.dirty.clear()
+        self.recomputed = []
+        # the graph is listed in evaluation order
+        for node, (upstream, update) in self.graph.items():
+            if node in stale:
+                update()
+                self.recomputed.append(node)
+
+        # a failed solve keeps the last good values, which depend on history
+        if key is not None and all(self.geometryConverged().values()):
+            entry = {'state' : self.snapshotState()}
+            self.cache.put(key, entry)
+            self.cacheKeys, self.cacheEntry = [key], entry
+            # the clamped inputs lead to the same design, e.g. when it's saved and reopened
+            clampedKey = self.designKey()
+            if clampedKey != key:
+                # an entry already there is the same design, and may hold its profiles
+                if clampedKey not in self.cache:
+                    self.cache.put(clampedKey, entry)
+                self.cacheKeys.append(clampedKey)
+        elif key is not None:
+            self.cacheKeys, self.cacheEntry = [], None
+
+        return len(self.recomputed)
+
+# Cache #######################################################################
+    # stress inputs and results don't change the geometry, they are neither
+    # part of the key nor of the cached state
+    stressAttributes = ['FW', 'E', 'nu', 'stressB', 'lewisParams']
+    stressSolves = ['lewis1', 'lewis2']
+    meshAttributes = ['PA_deg', 'PA', 'OPA_deg', 'OPA', 'CD_bkl', 'bkl', 'CD',
+                      'rtcl1', 'rtcl2', 'rtclStd', 'CR', 'C1', 'C2', 'C3', 'C4', 'C5', 'C6', 'LoC']
+
+    # every length of a design scales linearly with the module while angles,
+    # profile shifts and CR don't, so the cache holds designs at mod = 1
+    gearLengths = ['tts', 'tt', 'Rs', 'Rp', 'Rb', 'Pb', 'Ros', 'Ro', 'Romax', 'Rtip',
+                   'Rtip_max', 'Roe', 'Rr', 'Rrs', 'Rf', 'Rff', 'Rhp']
+    meshLengths = ['bkl', 'CD', 'rtcl1', 'rtcl2', 'C1', 'C2', 'C3', 'C4', 'C5', 'C6', 'LoC']
+
+    def moduleScale(self):
+        return self.mod if self.mod > 0 else 1
+
+    def designKey(self):
+        """Cache key of the current inputs, see DesignCache.key.
+
+        Built from the createJSON() fields that evaluate() reads.  Derived
+        fields (CD with backlash as the input and vice versa, standard root
+        clearances) and the stress-only fields are left out, the solver
+        tolerance of the quality profile is added.  Lengths are divided by the
+        module, so the same design at any module shares a key; they are
+        rounded to 12 decimals so that the division doesn't split keys on the
+        last bit.
+        """
+        scale = self.moduleScale()
+        design = self.createJSON()
+        for dictGear in [design["Gear1"], design["Gear2"]]:
+            for name in ["FW", "E", "nu"]:
+                del dictGear[name]
+            for name in ["Ro", "Rtip", "Rf"]:
+                dictGear[name] = round(dictGear[name]/scale, 12)
+
+        dictMesh = design["Mesh"]
+        del dictMesh["speed"], dictMesh["torque"]
+        del dictMesh["CD" if self.CD_bkl == 0 else "bkl"]
+        if self.rtclStd:
+            del dictMesh["rtcl1"], dictMesh["rtcl2"]
+        dictMesh["rtclStd"] = self.rtclStd
+        dictMesh["xtol"] = quality.setting('xtol')
+        for name in ["bkl", "CD", "rtcl1", "rtcl2"]:
+            if name in dictMesh:
+                dictMesh[name] = round(dictMesh[name]/scale, 12)
+        if self.mod > 0:
+            dictMesh["mod"] = 1
+
+        return DesignCache.key(design)
+
+    def snapshotState(self):
+        """Copy of the inputs and derived quantities at mod = 1, for the cache."""
+        scale = self.moduleScale()
+
+        def gearState(_gear):
+            return {name : getattr(_gear, name)/scale if name in self.gearLengths else getattr(_gear, name)
+                    for name in _gear.__slots__
+                    if name not in self.stressAttributes}
+
+        return {
+            "Gear1" : gearState(self.G1),
+            "Gear2" : gearState(self.G2),
+            "Mesh" : {name : getattr(self, name)/scale if name in self.meshLengths else getattr(self, name)
+                      for name in self.meshAttributes},
+            "converged" : self.geometryConverged(),
+        }
+
+    def restoreState(self, _state):
+        """Loads a snapshotState(), scaled to the current module."""
+        scale = self.moduleScale()
+        for gear, dictGear in [(self.G1, _state["Gear1"]), (self.G2, _state["Gear2"])]:
+            for name, value in dictGear.items():
+                setattr(gear, name, value*scale if name in self.gearLengths else value)
+        for name, value in _state["Mesh"].items():
+            setattr(self, name, value*scale if name in self.meshLengths else value)
+        # the stress solves of the current design stand
+        self.converged.update((name, value) for name, value in _state["converged"].items()
+                              if name not in self.stressSolves)
+
+    def geometryConverged(self):
+        """Convergence of the geometry solves, without the stress ones."""
+        return {name : value for name, value in self.converged.items() if name not in self.stressSolves}
+
+# Tooth Profile ###############################################################
+    def toothProfile(self, _gear, _tolerance=None):
+        """The ToothProfile of a gear, updated to the current design.
+
+        One profile is kept per gear and chord tolerance (by default the one
+        of the quality profile), and only the sections that changed since the
+        last call are recomputed.  With a cache attached, the sections and
+        tessellation are also kept in the design's cache entry, so going back
+        to a design (undo, reopening it) restores them instead.  Returns None
+        until the gear is defined.
+        """
+        if _gear.Rb < 0 or _gear.Rr < 0:
+            return None
+
+        if _tolerance is None:
+            _tolerance = quality.setting('chordTolerance')
+
+        profile = self.profiles.get((_gear.ID, _tolerance))
+        if profile is None:
+            profile = self.profiles[(_gear.ID, _tolerance)] = ToothProfile(_tolerance)
+
+        if self.cache is None or self.cacheEntry is None:
+            return profile.update(self, _gear)
+
+        # entries are shared by every module, profiles are not
+        name = 'profile' + str(_gear.ID) + '@' + repr(float(_tolerance)) + '@' + repr(float(self.mod))
+        sections = self.cacheEntry.get(name)
+        if sections is not None and sections['keys'] != profile.sectionKeys():
+            profile.restoreSections(sections)
+
+        profile.update(self, _gear)
+        if sections is None or profile.retessellated:
+            profile.polygon()
+            for key in self.cacheKeys:
+                self.cache.update(key, name, profile.sections())
+        return profile
+
+# Quality #####################################################################
+    def set_quality(self, _name):
+        """Switches the global quality profile and re-evaluates with its tolerances."""
+        quality.setQuality(_name)
+        self.markDirty('tts1', 'tts2', 'base1', 'base2')
+        self.evaluate()
+
+    @contextmanager
+    def useQuality(self, _name):
+        """Evaluates with another quality profile inside a with block, e.g. for export."""
+        previous = quality.active
+        self.set_quality(_name)
+        try:
+            yield self
+        finally:
+            self.set_quality(previous)
+
+    def estimatedError(self):
+        """Estimated errors in mm of the current design under the active quality profile.
+
+        'solver' is the Newton step tolerance carried over to the largest
+        radius, 'profile' the chord error of the tessellated teeth and
+        'parabola' the chord error of the drawn Lewis parabolas.
+        """
+        Rmax = max(self.G1.Ro, self.G2.Ro, 0)
+        errors = {
+            'solver' : quality.setting('xtol') * 2*Rmax,
+            'profile' : quality.setting('chordTolerance'),
+            'parabola' : 0,
+        }
+
+        # drawn over +-1.1*x, the sagitta of one segment is a*h^2/8
+        for gear in [self.G1, self.G2]:
+            if gear.lewisParams is not None:
+                Rd, gamma, x, y, a = gear.lewisParams
+                h = 2.2*abs(x) / (quality.setting('parabolaSamples') - 1)
+                errors['parabola'] = max(errors['parabola'], abs(a)*h**2/8)
+
+        return errors
+
+# History #####################################################################
+    # the mesh inputs, as saved by createJSON()
+    meshInputs = ('mod', 'PA_deg', 'CD_bkl', 'bkl', 'CD', 'rtcl1', 'rtcl2', 'rtclStd', 'speed', 'torque')
+
+    def snapshot(self, _previous=None):
+        """Immutable copy of the current inputs, for undo / redo.
+
+        Parts that are equal to those of the _previous snapshot are shared
+        with it instead of copied, see DesignSnapshot.
+        """
+        parts = [tuple(getattr(self.G1, name) for name in Gear.inputNames),
+                 tuple(getattr(self.G2, name) for name in Gear.inputNames),
+                 tuple(getattr(self, name) for name in self.meshInputs)]
+        if _previous is not None:
+            parts = [old if old == new else new for old, new in zip(_previous, parts)]
+
+        return DesignSnapshot(*parts)
+
+    # graph nodes that read each input, as marked by the setters
+    gearInputNodes = {'N' : ['base'], 'x' : ['tts'], 'Ro' : ['Ro'], 'Rtip' : ['Rtip'], 'Rf' : ['Rf']}
+    meshInputNodes = {'mod' : ['tts1', 'tts2', 'base1', 'base2'], 'PA_deg' : ['tts1', 'tts2', 'base1', 'base2'],
+                      'CD_bkl' : ['pitch'], 'bkl' : ['pitch'], 'CD' : ['pitch'],
+                      'rtcl1' : ['rtcl'], 'rtcl2' : ['rtcl'], 'rtclStd' : ['rtcl']}
+
+    def restoreSnapshot(self, _snapshot):
+        """Returns to the design of a snapshot().
+
+        Only the inputs that differ from the current ones are set, and only
+        the nodes reading them are marked dirty, the same as the setters
+        would.  Stepping through a history therefore acts like undoing the
+        edits one by one, and with a cache attached each step is a lookup of
+        a design that has been seen before.
+        """
+        for gear, values in [(self.G1, _snapshot.gear1), (self.G2, _snapshot.gear2)]:
+            for name, value in zip(Gear.inputNames, values):
+                if getattr(gear, name) != value:
+                    setattr(gear, name, value)
+                    self.markDirty(*[node+str(gear.ID) for node in self.gearInputNodes.get(name, [])])
+        for name, value in zip(self.meshInputs, _snapshot.mesh):
+            if getattr(self, name) != value:
+                setattr(self, name, value)
+                self.markDirty(*self.meshInputNodes.get(name, []))
+        self.PA = deg2rad(self.PA_deg)
+
+        self.evaluate()
+
+# Continuation ################################################################
+    def solveContinued(self, _name, _solve, _unknown):
+        """Runs one of the solvers, warm started when continuation is on.
+
+        _solve(x0) calls the solver with a starting point (None for its own
+        cold start guess) and returns a tuple ending in converged; _unknown
+        picks the solver's unknown out of that tuple.  With continuation on,
+        x0 is predicted from the last two solutions of the same solve by
+        linear extrapolation, which suits evenly stepped sweeps.  A warm start
+        that fails to converge falls back to a cold start.
+        """
+        x0 = None
+        history = self.solutionHistory.get(_name, [])
+        if self.continuation and len(history) == 2:
+            # secant predictor
+            x0 = 2*history[1] - history[0]
+        elif self.continuation and len(history) == 1:
+            x0 = history[0]
+
+        sol = _solve(x0)
+        if x0 is not None and not sol[-1]:
+            sol = _solve(None)
+
+        if sol[-1]:
+            self.solutionHistory[_name] = (history + [float(_unknown(sol))])[-2:]
+
+        return sol
+
+    def sweep(self, _setter, _values):
+        """Evaluates the design along a sweep of one input, with continuation on.
+
+        _setter is called with each value in turn, e.g.
+            pair.sweep(lambda x: pair.set_x(pair.G1, x), np.linspace(0, 0.5, 51))
+        Returns a list of results(), one per value.  The design is left at the
+        last value.
+        """
+        continuation = self.continuation
+        self.continuation = True
+        self.solutionHistory = {}
+
+        results = []
+        try:
+            for value in _values:
+                _setter(value)
+                self.updateStress()
+                results.append(self.results())
+        finally:
+            self.continuation = continuation
+
+        return results
+
+# Design I/O ##################################################################
+    def createJSONGear(self, _gear):
+        return {
+            "N" : _gear.N,
+            "x" : _gear.x,
+            "Ro" : _gear.Ro,
+            "Rtip" : _gear.Rtip,
+            "Rf" : _gear.Rf,
+            "FW" : _gear.FW,
+            "E" : _gear.E,
+            "nu" : _gear.nu,
+        }
+
+    def createJSONMesh(self):
+        return {
+            "mod" : self.mod,
+            "PA_deg" : self.PA_deg,
+            "set_CD_bkl" : self.CD_bkl,
+            "bkl" : self.bkl,
+            "CD" : self.CD,
+            "rtcl1" : self.rtcl1,
+            "rtcl2" : self.rtcl2,
+            "rtclStd" : self.rtclStd,
+            "speed" : self.speed,
+            "torque" : self.torque
+        }
+
+    def createJSON(self):
+        return {
+                "Gear1" : self.createJSONGear(self.G1),
+                "Gear2" : self.createJSONGear(self.G2),
+                "Mesh" : self.createJSONMesh()
+            }
+
+    def apply_design(self, _dictFull):
+        """Loads a complete design, as written by createJSON(), with one evaluation.
+
+        Every input is assigned first and the graph is evaluated once at the
+        end, see batch(), so the clamps (Ro, Rtip, Rf) see the whole design
+        no matter the order of the fields.  The root clearances are kept as
+        saved unless the design says they are the standard ones.  Files
+        without rtclStd predate it, and get the standard clearances like
+        they always did.
+        """
+        dictM = _dictFull["Mesh"]
+
+        with self.batch():
+            self.set_mod(dictM["mod"])
+            self.set_PA_deg(dictM["PA_deg"])
+
+            # use backlash or center distance
+            self.CD_bkl = 0 if dictM["set_CD_bkl"] == 0 else 1
+            if self.CD_bkl == 0:
+                self.set_bkl(dictM["bkl"])
+            else:
+                self.set_CD(dictM["CD"])
+
+            self.set_speed(dictM["speed"])
+            self.set_torque(dictM["torque"])
+
+            for gear, dictGear in [(self.G1, _dictFull["Gear1"]), (self.G2, _dictFull["Gear2"])]:
+                self.set_N(gear, dictGear["N"])
+                self.set_x(gear, dictGear["x"])
+                self.set_Ro(gear, dictGear["Ro"])
+                self.set_Rtip(gear, dictGear["Rtip"])
+                self.set_Rf(gear, dictGear["Rf"])
+                self.set_FW(gear, dictGear["FW"])
+                self.set_E(gear, dictGear["E"])
+                self.set_nu(gear, dictGear["nu"])
+
+            # after the setters above, which reset them to standard
+            self.set_rtcl(self.G1, dictM["rtcl1"])
+            self.set_rtcl(self.G2, dictM["rtcl2"])
+            self.rtclStd = bool(dictM.get("rtclStd", True))
+
+    def loadJSON(self, _dictFull):
+        self.apply_design(_dictFull)
+
+    def results(self):
+        """Returns all derived quantities of the current design as a plain dict."""
+        def gearResults(_gear):
+            return {
+                "tts" : _gear.tts,
+                "tt" : _gear.tt,
+                "Rs" : _gear.Rs,
+                "Rp" : _gear.Rp,
+                "Rb" : _gear.Rb,
+                "Pb" : _gear.Pb,
+                "Ros" : _gear.Ros,
+                "Ro" : _gear.Ro,
+                "Romax" : _gear.Romax,
+                "Rtip" : _gear.Rtip,
+                "Rtip_max" : _gear.Rtip_max,
+                "Roe" : _gear.Roe,
+                "Rr" : _gear.Rr,
+                "Rrs" : _gear.Rrs,
+                "Rf" : _gear.Rf,
+                "Rff" : _gear.Rff,
+                "theta_F" : _gear.theta_F,
+                "phi_JFI" : _gear.phi_JFI,
+                "Rhp" : _gear.Rhp,
+                "undercut" : _gear.undercut,
+                "stressB" : _gear.stressB,
+            }
+
+        return {
+            "Gear1" : gearResults(self.G1),
+            "Gear2" : gearResults(self.G2),
+            "Mesh" : {
+                "OPA" : self.OPA,
+                "OPA_deg" : self.OPA_deg,
+                "CD" : self.CD,
+                "bkl" : self.bkl,
+                "rtcl1" : self.rtcl1,
+                "rtcl2" : self.rtcl2,
+                "CR" : self.CR,
+                "LoC" : self.LoC,
+                "C1" : self.C1,
+                "C2" : self.C2,
+                "C3" : self.C3,
+                "C4" : self.C4,
+                "C5" : self.C5,
+                "C6" : self.C6,
+                "velocity" : self.velocity,
+                "stressC" : self.stressC,
+            }
+        }
+
+    def sensitivities(self, _wrt=None):
+        """Analytic derivatives of CR, Romax, Rtip_max, Rff and stresses.
+
+        Evaluates the current design as a one element GearPairBatch, see
+        GearPairBatch.sensitivities.  Returns {output: {input: float}}.
+        """
+        batch = GearPairBatch(self.G1.N, self.G2.N, self.mod, self.PA_deg,
+                              self.G1.x, self.G2.x, self.G1.Ro, self.G2.Ro,
+                              self.G1.Rtip, self.G2.Rtip, self.G1.Rf, self.G2.Rf,
+                              None if self.rtclStd else self.rtcl1,
+                              None if self.rtclStd else self.rtcl2,
+                              self.bkl, self.CD if self.CD_bkl == 1 else None,
+                              self.torque, min(self.G1.FW, self.G2.FW),
+                              self.G1.E, self.G2.E, self.G1.nu, self.G2.nu).evaluate()
+
+        sens = batch.sensitivities(_wrt)
+        return {output: {name: float(value) for name, value in derivs.items()}
+                for output, derivs in sens.items()}
+
+# Setters #####################################################################
+    def set_mod(self, _mod):
+        if is_number(_mod):
+            self.mod = float(_mod)
+            self.rtclStd = True
+            self.markDirty('tts1', 'tts2', 'base1', 'base2')
+            self.evaluate()
+
+    def set_PA_deg(self, _PA_deg):
+        if is_number(_PA_deg):
+            self.PA_deg = float(_PA_deg)
+            self.PA = deg2rad(self.PA_deg)
+            self.rtclStd = True
+            self.markDirty('tts1', 'tts2', 'base1', 'base2')
+            self.evaluate()
+
+    def set_bkl(self, _bkl):
+        if is_number(_bkl):
+            self.bkl = float(_bkl)
+            self.markDirty('pitch')
+            self.evaluate()
+
+    def set_CD(self, _CD):
+        if is_number(_CD):
+            self.CD = float(_CD)
+            self.markDirty('pitch')
+            self.evaluate()
+
+    def set_N(self, _gear, _N):
+        if is_number(_N):
+            _gear.N = int(_N)
+            self.rtclStd = True
+            self.markDirty('base'+str(_gear.ID))
+            self.evaluate()
+
+    def set_x(self, _gear, _x):
+        if is_number(_x):
+            _gear.x = float(_x)
+            self.rtclStd = True
+            self.markDirty('tts'+str(_gear.ID))
+            self.evaluate()
+
+    def set_Ro(self, _gear, _Ro):
+        if is_number(_Ro):
+            _gear.Ro = float(_Ro)
+            self.markDirty('Ro'+str(_gear.ID))
+            self.evaluate()
+
+    def set_Rtip(self, _gear, _Rtip):
+        if is_number(_Rtip):
+            _gear.Rtip = float(_Rtip)
+            self.markDirty('Rtip'+str(_gear.ID))
+            self.evaluate()
+
+    def set_rtcl(self, _gear, _rtcl):
+        if is_number(_rtcl):
+            if _gear.ID == 1:
+                self.rtcl1 = float(_rtcl)
+            else:
+                self.rtcl2 = float(_rtcl)
+            self.rtclStd = False
+            self.markDirty('rtcl')
+            self.evaluate()
+
+    def set_Rf(self, _gear, _Rf):
+        if is_number(_Rf):
+            _gear.Rf = float(_Rf)
+            self.markDirty('Rf'+str(_gear.ID))
+            self.evaluate()
+
+    def set_FW(self, _gear, _FW):
+        if is_number(_FW):
+            _gear.FW = float(_FW)
+
+    def set_speed(self, _speed):
+        if is_number(_speed):
+            self.speed = float(_speed)
+
+    def set_torque(self, _torque):
+        if is_number(_torque):
+            self.torque = float(_torque)
+
+    def set_E(self, _gear, _E):
+        if is_number(_E):
+            _gear.E = float(_E)
+
+    def set_nu(self, _gear, _nu):
+        if is_number(_nu):
+            _gear.nu = float(_nu)
+
+# Geometry ####################################################################
+    def updateStandardToothThickness(self, _gear):
+        if self.mod > 0 and self.PA > 0:
+            # GOIG 6.11
+            _gear.tts = self.mod * (pi/2 + 2*_gear.x*tan(self.PA))
+
+    def updateBaseAndPitch(self, _gear):
+        if _gear.N > 0 and self.mod > 0:
+            _gear.Rs = 0.5 * _gear.N * self.mod
+            _gear.Rb = _gear.Rs * cos(self.PA)
+            _gear.Pb = tau * _gear.Rb / _gear.N
+            _gear.Ros = (self.mod * (_gear.N+2) / 2)
+
+    def updateRomax(self, _gear):
+        if _gear.Rs > 0:
+            # max OD is when theta_A is 0, i.e. the involute hits the tooth centerline
+            # theta_A = (gear.tts / (2*gear.Rs)) + invF(gear.PA) - invF(phi_A)
+            # 0 = (gear.tts / (2*gear.Rs)) + invF(gear.PA) - invF(phi_A)
+            # invF(phi_A) = (gear.tts / (2*gear.Rs)) + invF(gear.PA)
+            phi_A = revInvF((_gear.tts / (2*_gear.Rs)) + invF(self.PA))
+            _gear.Romax = _gear.Rb / cos(phi_A)
+
+    def updateOuterRadius(self, _gear):
+        if _gear.Romax < 0:
+            return
+
+        # start from the standard outer radius
+        if _gear.Ro < 0 or _gear.Ro < _gear.Rp:
+            _gear.Ro = _gear.Ros
+
+        if _gear.Ro > _gear.Romax:
+            _gear.Ro = _gear.Romax
+
+    def updateTipRadius(self, _gear):
+        if _gear.Rtip > _gear.Rtip_max:
+            _gear.Rtip = _gear.Rtip_max
+
+    def updateRoe(self, _gear):
+        if _gear.Rb < 0 or _gear.Ro < 0:
+            return
+
+        _gear.Roe = sqrt( _gear.Rb**2 + ( sqrt((_gear.Ro-_gear.Rtip)**2 - _gear.Rb**2) + _gear.Rtip )**2 )
+
+    def updateMaxTipRadius(self, _gear):
+        """
+        ##########################################
+        A : point on involute where fillet starts
+        E : tangent point on base circle, determined by A and phi_A
+        C : center point of gear
+        F : center point of fillet
+
+        ##########################################
+        # angle between A and tooth centerline
+        theta_A = (tts/(2*Rs)) + invF(PA) - invF(phi_A)
+
+        # angle between line CE and tooth centerline
+        alpha = phi_A - theta_A
+
+        # length of line from E to A
+        EA = Rb*tan(phi_A)
+
+        # length of line from E to F
+        EF = Rb*tan(alpha)
+
+        # the tip fillet radius is the difference between EA and EF
+        RTip1 = EA - EF
+        Rtip = Rb*tan(phi_A) - Rb*tan(alpha)
+        Rtip = Rb*tan(phi_A) - Rb*tan(phi_A - theta_A)
+        Rtip = Rb*tan(phi_A) - Rb*tan(phi_A - (tts/(2*Rs)) - invF(PA) + invF(phi_A))
+
+        # length of line from C to F
+        CF = Rb / cos(alpha)
+
+        # the tip fillet radius is the difference between Ro and CF
+        Rtip2 = Ro - CF
+        Rtip2 = Ro - (Rb / cos(alpha))
+        Rtip2 = Ro - (Rb / cos(phi_A - theta_A))
+        Rtip2 = Ro - (Rb / cos(phi_A - (tts/(2*Rs)) - invF(PA) + invF(phi_A)))
+
+        """
+
+        if _gear.N <= 1 or _gear.Ro < 0:
+            return
+
+        # with t = tan(phi_A), RTip1 - RTip2 is monotonic in t, see solvers.solveMaxTipRadius
+        theta_B = (_gear.tts/(2*_gear.Rs)) + invF(self.PA)
+        Rtip_max, phi_tip, converged = self.solveContinued(
+            'Rtip_max'+str(_gear.ID),
+            lambda x0: solveMaxTipRadius(_gear.Rb, _gear.Ro, theta_B, x0=x0, xtol=quality.setting('xtol')),
+            lambda sol: tan(sol[1]))
+
+        self.converged['Rtip_max'+str(_gear.ID)] = converged
+        if converged:
+            _gear.Rtip_max = float(Rtip_max)
+        else:
+            # no tip radius rather than a bad one
+            _gear.Rtip_max = 0
+
+    def calcStandardRtcl(self):
+        if self.G1.Ros < 0 or self.G2.Ros < 0:
+            return
+
+        addendum1 = self.G1.Ros - self.G1.Rp
+        addendum2 = self.G2.Ros - self.G2.Rp
+
+        rtcl1 = 0.25 * addendum2
+        rtcl2 = 0.25 * addendum1
+
+        # any change to the tooth geometry resets the clearances to standard
+        if self.rtclStd == True:
+            self.rtcl1 = rtcl1
+            self.rtcl2 = rtcl2
+
+        self.G1.Rrs = self.G1.Rp - addendum2 - rtcl1
+        self.G2.Rrs = self.G2.Rp - addendum1 - rtcl2
+
+    def updateMaxRootFillet(self, _gear):
+        if _gear.N < 0 or _gear.Rr < 0:
+            return
+
+        ###########################################################################
+        #   Calculate fillet radius. This function computes two separate distances:
+        #   1.) the distance from the fillet center to the involute curve, and
+        #   2.) the distance from the fillet center to the root circle
+        #   The function then finds the condition where these two distances are the
+        #   same.
+
+        N = _gear.N
+        tts = _gear.tts
+        Rs = _gear.Rs
+        Rb = _gear.Rb
+        Rr = _gear.Rr
+        PA = self.PA
+
+        # phi_A - profile angle at some point A on the involute
+        # theta_A - angle between tooth centerline and some point A on the involute
+        # phi_F - profile angle between fillet centerline and Rb, where a line tangent to
+        #   the base circle goes through some point A on the involute
+        # Rf_1 - distance between fillet centerline and some point A on the
+        #   involute, along a line tangent to the base circle
+        # Rf_2 - distance between the fillet center and the root circle
+        # JFI - junction of fillet and involute
+        ###########################################################################
+
+        # angle between tooth centerline and involute at base circle (phi_A = 0)
+        theta_A = tts/(2*Rs) + invF(PA)
+
+        # Rf1 - Rf2 is monotonic in tan(phi_A), see solvers.solveFullFillet
+        newRff, phi_JFI, converged = self.solveContinued(
+            'Rff'+str(_gear.ID),
+            lambda x0: solveFullFillet(N, Rb, Rr, _gear.Ro, theta_A, x0=x0, xtol=quality.setting('xtol')),
+            lambda sol: tan(sol[1]))
+
+        self.converged['Rff'+str(_gear.ID)] = converged
+        if not converged or newRff < 0:
+            _gear.Rff = 0
+        else:
+            _gear.Rff = float(newRff)
+
+    def updateRootFillet(self, _gear):
+        if _gear.Rf > _gear.Rff:
+            _gear.Rf = _gear.Rff
+
+    def updateCenterDistance(self):
+        if self.G1.Rs < 0 or self.G2.Rs < 0:
+            return
+
+        Rp1, Rp2, tt1, tt2 = self.updatePitchRadius()
+        # e.g. a center distance too small for the base circles, keep the last good mesh
+        if not self.converged['OPA']:
+            return
+
+        # update pitch radius
+        self.G1.Rp = float(Rp1)
+        self.G2.Rp = float(Rp2)
+        # update tooth thickness at new pitch radius
+        self.G1.tt = float(tt1)
+        self.G2.tt = float(tt2)
+
+        if self.CD_bkl == 0:
+            # update center distance
+            self.CD = self.G1.Rp + self.G2.Rp
+        elif self.CD_bkl == 1:
+            # update backlash
+            self.bkl = (tau*self.G1.Rp)/self.G1.N - self.G1.tt - self.G2.tt
+
+        # Operating pressure angle at updated center distance
+        self.OPA = arccos((self.G1.Rb+self.G2.Rb) / self.CD)
+        self.OPA_deg = rad2deg(self.OPA)
+
+    def updatePitchRadius(self):
+        """Finds pitch radius and effective tooth thickness"""
+        # both pitch circles share the operating pressure angle, see solvers.solveOPA
+        if self.CD_bkl == 0:
+            def solve(x0):
+                return solveOPA(self.G1.N, self.G1.Rb, self.G2.Rb,
+                                self.G1.tts, self.G2.tts, self.G1.Rs, self.G2.Rs,
+                                self.PA, bkl=self.bkl, x0=x0, xtol=quality.setting('xtol'))
+            OPA, self.converged['OPA'] = self.solveContinued('OPA', solve, lambda sol: sol[0])
+        else:
+            OPA, self.converged['OPA'] = solveOPA(self.G1.N, self.G1.Rb, self.G2.Rb,
+                                                  self.G1.tts, self.G2.tts, self.G1.Rs, self.G2.Rs,
+                                                  self.PA, CD=self.CD)
+
+        # Precalculate involute function at standard pitch / PA
+        invS = invF(self.PA)
+
+        Rp1 = self.G1.Rb / cos(OPA)
+        Rp2 = self.G2.Rb / cos(OPA)
+        # tt = Rp*( (tts/Rs) + 2*(invF(PA) - invF(acos(Rb/Rp)) ) )
+        tt1 = Rp1*( (self.G1.tts/self.G1.Rs) + 2*(invS - invF(OPA)) )
+        tt2 = Rp2*( (self.G2.tts/self.G2.Rs) + 2*(invS - invF(OPA)) )
+
+        return [Rp1, Rp2, tt1, tt2]
+
+    def updateContactRatio(self):
+        if self.G1.Rs < 0 or self.G2.Rs < 0 or self.G1.Roe <= 0 or self.G2.Roe <= 0:
+            return
+
+        # AGMA-908 Parameters
+        # max line action, Rb to Rb
+        self.C6 = self.CD * sin(self.OPA)
+        # start of line of contact, when G2 is at Roe
+        self.C1 = self.C6 - sqrt(self.G2.Roe**2 - self.G2.Rb**2)
+        # end of line of contact, when G1 is at Roe
+        self.C5 = sqrt(self.G1.Roe**2 - self.G1.Rb**2)
+        # point where line of contact intersects center line
+        self.C3 = (self.G1.N/(self.G1.N+self.G2.N)) * self.C6
+        # lowest point of single tooth contact for G1
+        self.C2 = self.C5 - self.G1.Pb
+        # highest point of single tooth contact for G1
+        self.C4 = self.C1 + self.G1.Pb
+
+        # Line of contact
+        self.LoC = self.C5 - self.C1;
+
+        # Contact ratio
+        self.CR = self.LoC / self.G1.Pb;
+
+        # Highest point of single tooth contact
+        self.G1.Rhp = sqrt(self.G1.Rb**2 + self.C4**2);
+        self.G2.Rhp = sqrt(self.G2.Rb**2 + (self.C6-self.C2)**2);
+
+    def updateRootRadius(self, _gear):
+        if self.CD < 0 or self.G1.Ro < 0 or self.G2.Ro < 0:
+            return
+
+        if _gear.ID == 1:
+            self.G1.Rr = self.CD - self.G2.Ro - self.rtcl1
+        else:
+            self.G2.Rr = self.CD - self.G1.Ro - self.rtcl2
+
+    def checkUndercut(self, _gear):
+        if _gear.Rr < 0:
+            return
+
+        # distance from the gear center to the center point of the root fillet,
+        # assuming the JFI is on the base circle
+        # this forms a right triangle with Rb and Rf
+        CF = sqrt(_gear.Rb**2 + _gear.Rf**2)
+        # CF sets the minimum Rr for a given Rf
+        Rrmin = CF - _gear.Rf
+
+        # Undercut check
+        if _gear.Rr < Rrmin:
+            _gear.undercut = True
+        else:
+            _gear.undercut = False
+
+        self.updateJFI(_gear)
+
+    def updateJFI(self, _gear):
+        if _gear.Rr < 0:
+            return
+
+        if _gear.undercut == True:
+            _gear.phi_JFI = 0
+
+            theta_A = (_gear.tts/(2*_gear.Rs)) + invF(self.PA)
+            # angle between JFI and center of fillet circle
+            alpha_F = arcsin(_gear.Rf / (_gear.Rr + _gear.Rf))
+            _gear.theta_F = theta_A + alpha_F
+        else:
+            # profile angle through center of fillet circle
+            phi_F = arccos(_gear.Rb / (_gear.Rr + _gear.Rf))
+            # line tangent to base circle through fillet center point
+            EF = sqrt((_gear.Rr+_gear.Rf)**2 - _gear.Rb**2)
+            # line tangent to base circle to involute
+            EA = EF - _gear.Rf
+            # profile angle at JFI
+            phi_A = arctan(EA / _gear.Rb)
+            theta_A = (_gear.tts/(2*_gear.Rs)) + invF(self.PA) - invF(phi_A)
+            theta_F = phi_F - phi_A + theta_A
+
+            _gear.phi_JFI = phi_A
+            _gear.theta_F = theta_F
+
+# Stress ######################################################################
+    def updateStress(self):
+        """Computes pitch line velocity, contact stress and bending stress.
+
+        Returns False if the design is not complete enough to evaluate.
+        """
+        if self.G1.N < 1 or self.G2.N < 1:
+            return False
+        if self.G1.FW < 0 or self.G2.FW < 0:
+            return False
+
+        # use smallest face width
+        FW = min(self.G1.FW, self.G2.FW)
+
+        # convert torque to force through HPSTC tangent to base circle
+        w = self.torque / (self.G1.Rb * FW)
+
+        self.calcPitchLineVelocity()
+        self.calcContactStress(w)
+        self.calcBendingStress(w)
+
+        return True
+
+    def calcPitchLineVelocity(self):
+        self.velocity = (tau * self.G1.Rp * (self.speed / 60)) / 1000
+
+    def calcContactStress(self, _w):
+        # elastic coefficient
+        E1 = self.G1.E
+        E2 = self.G2.E
+        nu1 = self.G1.nu
+        nu2 = self.G2.nu
+
+        Cp = 1/sqrt( (pi*(1-nu1**2)/E1) + (pi*(1-nu2**2)/E2) )
+
+        # max contact stress occurs at lowest point of single tooth contact
+        rho1 = sqrt(self.G1.Roe**2 - self.G1.Rb**2) - self.G1.Pb    # AGMA C2
+        rho2 = (self.G1.Rb+self.G2.Rb)*tan(self.OPA) - rho1         # AGMA C6 - C2
+
+        self.stressC = Cp * sqrt(_w*( (rho1+rho2)/(rho1*rho2) ))
+
+    def calcBendingStress(self, _w):
+        # Stress concentration factor Kf
+        # from GOIG 11.24 - 11.26
+        # Note that GOIG uses degrees while AGMA 908 uses radians
+        k1 = 0.3054 - 0.00489*self.OPA_deg - 0.000069*self.OPA_deg**2
+        k2 = 0.3620 - 0.01268*self.OPA_deg + 0.000104*self.OPA_deg**2
+        k3 = 0.2934 + 0.00609*self.OPA_deg + 0.000087*self.OPA_deg**2
+
+        for _gear in [self.G1, self.G2]:
+
+            # Lewis parabola key points
+            lewisParams = self.lewisParabola(_gear)
+            Rd, gamma, x_Lewis, y_Lewis, a_Lewis = lewisParams
+
+            # Lewis parabola dimensions
+            tt_LP = 2*x_Lewis       # tooth thickness at critical section
+            h_LP = Rd - y_Lewis     # height of Lewis parabola
+
+            # please don't divide by zero, floor scaled with the module
+            if _gear.Rf < 0.001*self.mod:
+                self.set_Rf(_gear, 0.001*self.mod)
+
+            Kf = k1 + ( (tt_LP/_gear.Rf)**k2 ) * ( (tt_LP/h_LP)**k3 )
+
+            _gear.stressB = (_w/self.mod) * cos(gamma) * (Kf*( ((1.5*self.mod*h_LP)/ x_Lewis**2) -
+                                    (0.5*self.mod*tan(gamma))/x_Lewis ) )
+            _gear.lewisParams = lewisParams
+
+    def lewisParabola(self, _gear):
+        """
+        # Find the intersection point of the Lewis parabola and the root fillet circle
+        #
+        # Parameters:
+        # Fx, Fy - centerpoint of root fillet circle
+        # Rf - root fillet radius
+        # Rd - intersection of tooth centerline and force vector; the top of the Lewis
+        #   parabola
+        #
+        # Output variables:
+        # x, y - point of intersection between the Lewis parabola and the root fillet
+        # a - scale of parabola, => y = ax^2 + bx + c
+        #-------------------------------------------------------------------------------
+
+        # Equation of the fillet circle, bottom left quarter:
+        # [1] x = Fx - Rf*cos(psi), y = Fy - Rf*sin(psi), 0 <= psi <= pi/2
+        # Slope of the circle:
+        # [2] dy/dx = -(x-Fx)/(y-Fy)
+        #
+        # Equation of a parabola: y = ax^2 + bx + c
+        # Substitute values of Lewis parabola, and note that the parabola is
+        # centered on the y-axis, i.e. b=0:
+        # [3] y = ax^2 + Rd
+        # Differentiate [3]:
+        # [4] dy/dx = 2ax = 2(y-Rd)/x
+        #
+        # At the tangent intersection of the parabola and circle, the derivatives
+        # are equal:
+        # [5] 2(y-Rd)(y-Fy) + x(x-Fx) = 0
+        # Substitute [1] into [5] and let u = tan(psi/2):
+        # [6] (Fx+Rf)u^4 - 4(Fy-Rd)u^3 + 6Rf*u^2 - 4(Fy-Rd)u + (Rf-Fx) = 0
+        # The real root of the quartic [6] in [0, 1] gives the tangent point.
+        # See solvers.solveLewisParabola.
+        """
+
+        # Highest point of single tooth contact
+        theta_B = (_gear.tts/(2*_gear.Rs)) + invF(self.PA)
+
+        Rd, gamma, x, y, a, converged = solveLewisParabola(_gear.Rb, _gear.Rhp, theta_B,
+                                                           _gear.Rr, _gear.Rf, _gear.theta_F,
+                                                           polish=quality.setting('lewisPolish'))
+        self.converged['lewis'+str(_gear.ID)] = bool(converged)
+
+        return [float(Rd), float(gamma), float(x), float(y), float(a)]
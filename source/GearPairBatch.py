@@ -0,0 +1,807 @@
+from involute import tau, invF, revInvF
+from DesignCache import DesignCache
+from solvers import solveOPA, solveMaxTipRadius, solveFullFillet, solveLewisParabola
+import quality
+
+import hashlib
+
+import numpy as np
+from numpy import pi, sin, cos, tan, arcsin, arccos, arctan
+from numpy import rad2deg, deg2rad
+from numpy import sqrt, where, minimum, maximum
+
+class GearPairBatch:
+    """Vectorized GearPair for evaluating many designs in one pass.
+
+    Every input is stored as a NumPy array (struct of arrays), broadcast against
+    the others, so a whole design space can be evaluated at once.  The math is
+    the same as GearPair, with the scalar least_squares solves replaced by
+    vectorized bracketed solves.
+
+    Inputs left as None take the same defaults the Gear Designer tab uses:
+    Ro is the standard outer radius and the root clearances are 1/4 of the
+    mating gear's addendum.  If CD is given the center distance is the input
+    and backlash is derived, otherwise bkl is the input.
+
+    Per-gear results are stored with a 1/2 suffix (Rs1, Rs2, ...).  Solves that
+    fail to bracket a root come back as NaN and are flagged in self.converged.
+    """
+
+    def __init__(self, N1, N2, mod, PA_deg=20, x1=0, x2=0,
+                 Ro1=None, Ro2=None, Rtip1=0, Rtip2=0, Rf1=0, Rf2=0,
+                 rtcl1=None, rtcl2=None, bkl=0, CD=None,
+                 torque=1, FW=1, E1=200000, E2=200000, nu1=0.3, nu2=0.3):
+
+        self.CD_bkl = 0 if CD is None else 1
+
+        nan = np.nan
+        inputs = [N1, N2, mod, PA_deg, x1, x2,
+                  nan if Ro1 is None else Ro1, nan if Ro2 is None else Ro2,
+                  Rtip1, Rtip2, Rf1, Rf2,
+                  nan if rtcl1 is None else rtcl1, nan if rtcl2 is None else rtcl2,
+                  bkl, nan if CD is None else CD,
+                  torque, FW, E1, E2, nu1, nu2]
+        inputs = [np.asarray(value, dtype=float) for value in inputs]
+        inputs = [np.array(value) for value in np.broadcast_arrays(*inputs)]
+
+        (self.N1, self.N2, self.mod, self.PA_deg, self.x1, self.x2,
+         self.Ro1_in, self.Ro2_in, self.Rtip1_in, self.Rtip2_in, self.Rf1_in, self.Rf2_in,
+         self.rtcl1_in, self.rtcl2_in, self.bkl_in, self.CD_in,
+         self.torque, self.FW, self.E1, self.E2, self.nu1, self.nu2) = inputs
+
+        self.shape = self.N1.shape
+        self.converged = {}
+
+    def __len__(self):
+        return self.N1.size
+
+    @classmethod
+    def fromJSON(cls, _designs):
+        """Builds a batch from a list of design dicts, as written by GearPair.createJSON()."""
+        def column(_section, _key):
+            return [design[_section][_key] for design in _designs]
+
+        # NaN takes the standard clearance, as GearPair.apply_design() does
+        def rtcl(_key):
+            return [np.nan if design["Mesh"].get("rtclStd", True) else design["Mesh"][_key]
+                    for design in _designs]
+
+        useCD = [design["Mesh"]["set_CD_bkl"] == 1 for design in _designs]
+        if any(useCD) and not all(useCD):
+            raise ValueError("All designs in a batch must use the same backlash / center distance input")
+
+        return cls(column("Gear1", "N"), column("Gear2", "N"),
+                   column("Mesh", "mod"), column("Mesh", "PA_deg"),
+                   column("Gear1", "x"), column("Gear2", "x"),
+                   column("Gear1", "Ro"), column("Gear2", "Ro"),
+                   column("Gear1", "Rtip"), column("Gear2", "Rtip"),
+                   column("Gear1", "Rf"), column("Gear2", "Rf"),
+                   rtcl("rtcl1"), rtcl("rtcl2"),
+                   column("Mesh", "bkl"),
+                   column("Mesh", "CD") if all(useCD) else None,
+                   column("Mesh", "torque"),
+                   np.minimum(column("Gear1", "FW"), column("Gear2", "FW")),
+                   column("Gear1", "E"), column("Gear2", "E"),
+                   column("Gear1", "nu"), column("Gear2", "nu"))
+
+    # constructor arguments, as stored on the batch
+    inputNames = ['N1', 'N2', 'mod', 'PA_deg', 'x1', 'x2',
+                  'Ro1_in', 'Ro2_in', 'Rtip1_in', 'Rtip2_in', 'Rf1_in', 'Rf2_in',
+                  'rtcl1_in', 'rtcl2_in', 'bkl_in', 'CD_in',
+                  'torque', 'FW', 'E1', 'E2', 'nu1', 'nu2']
+
+    def subset(self, _rows):
+        """New, unevaluated batch of the designs at flat indices _rows."""
+        inputs = [getattr(self, name).ravel()[_rows] for name in self.inputNames]
+        if self.CD_bkl == 0:
+            inputs[self.inputNames.index('CD_in')] = None
+        return GearPairBatch(*inputs)
+
+    # inputs and results that are lengths, see evaluateCached
+    lengthInputs = ['Ro1_in', 'Ro2_in', 'Rtip1_in', 'Rtip2_in', 'Rf1_in', 'Rf2_in',
+                    'rtcl1_in', 'rtcl2_in', 'bkl_in', 'CD_in']
+    lengthResults = ['tts', 'tt', 'Rs', 'Rp', 'Rb', 'Pb', 'Ros', 'Ro', 'Romax', 'Rtip',
+                     'Rtip_max', 'Roe', 'Rr', 'Rrs', 'Rf', 'Rff', 'Rhp', 'rtcl', 'bkl', 'CD',
+                     'C1', 'C2', 'C3', 'C4', 'C5', 'C6', 'LoC']
+
+    @classmethod
+    def resultPower(cls, _name):
+        """Power of the module a result scales with, at fixed torque and FW.
+
+        Lengths scale with mod, angles, CR and flags don't, the Lewis bending
+        stress goes as 1/mod^2 and the contact stress as 1/mod.
+        """
+        if _name.startswith('converged.'):
+            return 0
+        if '[' in _name:
+            # lewisParams: Rd, gamma, x, y, a
+            return [1, 0, 1, 1, -1][int(_name[-2])]
+        if _name in cls.lengthResults:
+            return 1
+        if _name == 'stressC':
+            return -1
+        base = _name.rstrip('12')
+        if base in cls.lengthResults:
+            return 1
+        if base == 'stressB':
+            return -2
+        return 0
+
+    def evaluateCached(self, _cache):
+        """evaluate(), with the results of each design kept in a DesignCache.
+
+        Designs are keyed by their input values and the solver settings of
+        the quality profile, so repeated runs over overlapping design sets
+        only evaluate the designs not seen before.  Each design's entry is a
+        row of result values; the names of the results are stored once, in a
+        schema entry.
+
+        Keys and entries are normalized to mod = 1: length inputs are divided
+        by the module (and rounded to 12 decimals) and each result by
+        mod**resultPower(), so the same tooth geometry at another module is a
+        hit and only needs rescaling.
+        """
+        mod = np.ravel(self.mod)
+        rows = np.stack([np.ravel(getattr(self, name)) for name in self.inputNames], axis=-1)
+        for name in self.lengthInputs:
+            k = self.inputNames.index(name)
+            rows[:, k] = np.round(rows[:, k]/mod, 12)
+        rows[:, self.inputNames.index('mod')] = 1
+
+        prefix = ('GearPairBatch' + str(self.CD_bkl) + str(quality.setting('xtol'))
+                  + str(quality.setting('lewisPolish'))).encode('utf-8')
+        keys = [hashlib.sha256(prefix + row.tobytes()).hexdigest() for row in rows]
+        entries = [_cache.get(key) for key in keys]
+
+        missing = [i for i, entry in enumerate(entries) if entry is None]
+        if missing:
+            batch = self.subset(missing).evaluate()
+            for i, entry in zip(missing, batch.cacheResults(_cache, [keys[i] for i in missing])):
+                entries[i] = entry
+
+        schema = _cache.get(entries[0]['schema']) if entries else None
+        if schema is None:
+            # empty batch, or the schema was evicted
+            self.evaluate()
+            self.cacheResults(_cache, keys)
+            return self
+
+        values = np.stack([entry['values'] for entry in entries])
+        self.PA = deg2rad(self.PA_deg)
+        for k, name in enumerate(schema['names']):
+            value = values[:, k]
+            power = self.resultPower(name)
+            if power != 0:
+                value = value*mod**power
+            value = value.reshape(self.shape)
+            if name in schema['bools']:
+                value = value.astype(bool)
+            if name.startswith('converged.'):
+                self.converged[name[len('converged.'):]] = value
+            elif '[' in name:
+                # element of a result tuple, e.g. lewisParams1[2]
+                base, index = name[:-1].split('[')
+                params = list(getattr(self, base, [None]*5))
+                params[int(index)] = value
+                setattr(self, base, tuple(params))
+            else:
+                setattr(self, name, value)
+
+        return self
+
+    def cacheResults(self, _cache, _keys):
+        """Stores the results of each design under _keys, returns the entries.
+
+        Results are stored normalized to mod = 1, see evaluateCached.
+        """
+        mod = np.ravel(self.mod)
+        names = self.resultNames()
+        results = [np.ravel(self.resultValue(name)) for name in names]
+        schema = {'names' : names,
+                  'bools' : [name for name, value in zip(names, results) if value.dtype == bool]}
+        schemaKey = DesignCache.key(schema)
+        _cache.put(schemaKey, schema)
+
+        results = [value/mod**self.resultPower(name) if self.resultPower(name) != 0 else value
+                   for name, value in zip(names, results)]
+
+        entries = []
+        values = np.stack(results, axis=-1).astype(float) if results else np.zeros((len(_keys), 0))
+        for key, row in zip(_keys, values):
+            entries.append({'schema' : schemaKey, 'values' : row.copy()})
+            _cache.put(key, entries[-1])
+
+        return entries
+
+    def resultNames(self):
+        """Names of the per-design results of evaluate(), see evaluateCached."""
+        names = []
+        for name, value in vars(self).items():
+            if name in self.inputNames:
+                continue
+            if isinstance(value, np.ndarray) and value.shape == self.shape and name != 'PA':
+                names.append(name)
+            elif isinstance(value, tuple) and all(np.shape(v) == self.shape for v in value):
+                names.extend(name+'['+str(i)+']' for i in range(len(value)))
+        names.extend('converged.'+name for name in self.converged)
+        return names
+
+    def resultValue(self, _name):
+        if _name.startswith('converged.'):
+            return np.broadcast_to(self.converged[_name[len('converged.'):]], self.shape)
+        if '[' in _name:
+            base, index = _name[:-1].split('[')
+            return getattr(self, base)[int(index)]
+        return getattr(self, _name)
+
+    def evaluate(self):
+        """Computes every derived quantity for the whole batch."""
+        self.evaluateGeometry()
+        self.updateStress()
+
+        return self
+
+    def evaluateGeometry(self):
+        """Computes the geometry and contact ratio, everything but the stresses."""
+        self.PA = deg2rad(self.PA_deg)
+
+        self.updateBaseAndPitch()
+        self.updatePitchRadius()
+        self.updateMaxTipRadius()
+        self.updateContactRatio()
+        self.updateRootRadius()
+        self.updateMaxRootFillet()
+        self.checkUndercut()
+
+        return self
+
+# Prefilter ###################################################################
+    def prefilter(self, minCR=1, minTopLand=0):
+        """Closed form feasibility checks, to prune a design space before evaluate().
+
+        Needs no solves, only the inputs.  Returns {reason: mask} of the
+        designs each check rejects, every mask of self.shape:
+            'undercut'          the generating rack undercuts the tooth,
+                                N < 2*(1 - x)/sin(PA)^2
+            'pointed'           the top land at the outer radius (Ro, or the
+                                standard one) is under minTopLand, i.e. the
+                                outer radius is past Romax for minTopLand = 0
+            'centerDistance'    negative backlash, or a center distance below
+                                the zero backlash one or the sum of the base
+                                radii
+            'contactRatio'      even the upper bound of CR is under minCR
+        The CR bound takes each gear's contact from its outer radius rather
+        than the smaller Roe and the operating pressure angle at its lower
+        bound, zero backlash, so it only rejects designs that the full
+        evaluation would find under minCR too.  Note 'undercut' is the
+        manufacturing criterion, not the undercut flag of checkUndercut(),
+        which marks a root circle below the base circle.
+        """
+        mod = self.mod
+        PA = deg2rad(self.PA_deg)
+        invS = invF(PA)
+        reasons = {}
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            reasons['undercut'] = ((self.N1 < 2*(1 - self.x1)/sin(PA)**2) |
+                                   (self.N2 < 2*(1 - self.x2)/sin(PA)**2))
+
+            pointed = np.zeros(self.shape, dtype=bool)
+            gears = []
+            for N, x, Ro_in in [(self.N1, self.x1, self.Ro1_in), (self.N2, self.x2, self.Ro2_in)]:
+                tts = mod * (pi/2 + 2*x*tan(PA))
+                Rs = 0.5 * N * mod
+                Rb = Rs * cos(PA)
+                theta_B = tts/(2*Rs) + invS
+                Ro = where(np.isnan(Ro_in), mod * (N+2) / 2, Ro_in)
+                # tooth thickness at Ro, from the involute
+                topLand = 2*Ro*(theta_B - invF(arccos(minimum(Rb/Ro, 1))))
+                pointed |= topLand < minTopLand
+                # the tip is clamped to Romax, the involute ends there
+                Ro = minimum(Ro, Rb / cos(revInvF(theta_B)))
+                gears.append((Rb, Ro, tts, Rs))
+            reasons['pointed'] = pointed
+
+            (Rb1, Ro1, tts1, Rs1), (Rb2, Ro2, tts2, Rs2) = gears
+            # zero backlash operating pressure angle, see solvers.solveOPA
+            K = Rb1*(tts1/Rs1 + 2*invS) + Rb2*(tts2/Rs2 + 2*invS) - tau*Rb1/self.N1
+            OPA0 = revInvF(maximum(K / (2*(Rb1 + Rb2)), 1e-12))
+            if self.CD_bkl == 0:
+                reasons['centerDistance'] = self.bkl_in < 0
+                # more backlash only opens the operating pressure angle
+                OPA = OPA0
+            else:
+                CD0 = (Rb1 + Rb2) / cos(OPA0)
+                reasons['centerDistance'] = (self.CD_in < CD0) | (self.CD_in <= Rb1 + Rb2)
+                OPA = arccos(minimum((Rb1 + Rb2) / self.CD_in, 1))
+
+            Pb = tau * Rb1 / self.N1
+            CRmax = (sqrt(maximum(Ro1**2 - Rb1**2, 0)) + sqrt(maximum(Ro2**2 - Rb2**2, 0))
+                     - (Rb1 + Rb2)*tan(OPA)) / Pb
+            reasons['contactRatio'] = ~(CRmax >= minCR)
+
+        return reasons
+
+    def feasible(self, minCR=1, minTopLand=0):
+        """Designs that pass every prefilter() check, e.g. to evaluate only those:
+            rows = np.flatnonzero(batch.feasible())
+            results = batch.subset(rows).evaluate()
+        """
+        reasons = self.prefilter(minCR, minTopLand)
+        return ~np.logical_or.reduce(list(reasons.values()))
+
+# Geometry ####################################################################
+    def updateBaseAndPitch(self):
+        mod = self.mod
+        PA = self.PA
+
+        for ID, N, x, Ro_in in [(1, self.N1, self.x1, self.Ro1_in), (2, self.N2, self.x2, self.Ro2_in)]:
+            # GOIG 6.11
+            tts = mod * (pi/2 + 2*x*tan(PA))
+            Rs = 0.5 * N * mod
+            Rb = Rs * cos(PA)
+            Pb = tau * Rb / N
+            Ros = mod * (N+2) / 2
+
+            # angle between tooth centerline and involute at base circle
+            theta_B = tts/(2*Rs) + invF(PA)
+            # max OD is when the involute hits the tooth centerline
+            Romax = Rb / cos(revInvF(theta_B))
+            Ro = minimum(where(np.isnan(Ro_in), Ros, Ro_in), Romax)
+
+            for name, value in [('tts', tts), ('Rs', Rs), ('Rb', Rb), ('Pb', Pb), ('Ros', Ros),
+                                ('theta_B', theta_B), ('Romax', Romax), ('Ro', Ro)]:
+                setattr(self, name+str(ID), value)
+
+    def updatePitchRadius(self):
+        """Finds operating pressure angle, pitch radius and effective tooth thickness."""
+        invS = invF(self.PA)
+
+        if self.CD_bkl == 0:
+            self.OPA, self.converged['OPA'] = solveOPA(self.N1, self.Rb1, self.Rb2, self.tts1, self.tts2,
+                                                       self.Rs1, self.Rs2, self.PA, bkl=self.bkl_in,
+                                                       xtol=quality.setting('xtol'))
+        else:
+            self.OPA, self.converged['OPA'] = solveOPA(self.N1, self.Rb1, self.Rb2, self.tts1, self.tts2,
+                                                       self.Rs1, self.Rs2, self.PA, CD=self.CD_in)
+
+        self.OPA_deg = rad2deg(self.OPA)
+
+        self.Rp1 = self.Rb1 / cos(self.OPA)
+        self.Rp2 = self.Rb2 / cos(self.OPA)
+        # tooth thickness at new pitch radius
+        self.tt1 = self.Rp1*( (self.tts1/self.Rs1) + 2*(invS - invF(self.OPA)) )
+        self.tt2 = self.Rp2*( (self.tts2/self.Rs2) + 2*(invS - invF(self.OPA)) )
+
+        if self.CD_bkl == 0:
+            self.bkl = self.bkl_in
+            self.CD = self.Rp1 + self.Rp2
+        else:
+            self.CD = self.CD_in
+            self.bkl = (tau*self.Rp1)/self.N1 - self.tt1 - self.tt2
+
+    def updateMaxTipRadius(self):
+        """Max tip radius, see solvers.solveMaxTipRadius"""
+        for ID in [1, 2]:
+            Rb = getattr(self, 'Rb'+str(ID))
+            Ro = getattr(self, 'Ro'+str(ID))
+            theta_B = getattr(self, 'theta_B'+str(ID))
+            Rtip_in = getattr(self, 'Rtip'+str(ID)+'_in')
+
+            Rtip_max, phi_tip, self.converged['Rtip_max'+str(ID)] = solveMaxTipRadius(Rb, Ro, theta_B,
+                                                                                        xtol=quality.setting('xtol'))
+            Rtip = minimum(Rtip_in, Rtip_max)
+            Roe = sqrt( Rb**2 + ( sqrt((Ro-Rtip)**2 - Rb**2) + Rtip )**2 )
+
+            setattr(self, 'Rtip_max'+str(ID), Rtip_max)
+            setattr(self, 'phi_Rtip_max'+str(ID), phi_tip)
+            setattr(self, 'Rtip'+str(ID), Rtip)
+            setattr(self, 'Roe'+str(ID), Roe)
+
+    def updateContactRatio(self):
+        # AGMA-908 Parameters
+        # max line action, Rb to Rb
+        self.C6 = self.CD * sin(self.OPA)
+        # start of line of contact, when G2 is at Roe
+        self.C1 = self.C6 - sqrt(self.Roe2**2 - self.Rb2**2)
+        # end of line of contact, when G1 is at Roe
+        self.C5 = sqrt(self.Roe1**2 - self.Rb1**2)
+        # point where line of contact intersects center line
+        self.C3 = (self.N1/(self.N1+self.N2)) * self.C6
+        # lowest point of single tooth contact for G1
+        self.C2 = self.C5 - self.Pb1
+        # highest point of single tooth contact for G1
+        self.C4 = self.C1 + self.Pb1
+
+        # Line of contact
+        self.LoC = self.C5 - self.C1
+
+        # Contact ratio
+        self.CR = self.LoC / self.Pb1
+
+        # Highest point of single tooth contact
+        self.Rhp1 = sqrt(self.Rb1**2 + self.C4**2)
+        self.Rhp2 = sqrt(self.Rb2**2 + (self.C6-self.C2)**2)
+
+    def updateRootRadius(self):
+        addendum1 = self.Ros1 - self.Rp1
+        addendum2 = self.Ros2 - self.Rp2
+
+        # standard root clearance unless one was given
+        self.rtcl1 = where(np.isnan(self.rtcl1_in), 0.25 * addendum2, self.rtcl1_in)
+        self.rtcl2 = where(np.isnan(self.rtcl2_in), 0.25 * addendum1, self.rtcl2_in)
+
+        self.Rrs1 = self.Rp1 - addendum2 - self.rtcl1
+        self.Rrs2 = self.Rp2 - addendum1 - self.rtcl2
+
+        self.Rr1 = self.CD - self.Ro2 - self.rtcl1
+        self.Rr2 = self.CD - self.Ro1 - self.rtcl2
+
+    def updateMaxRootFillet(self):
+        """Full fillet radius, see solvers.solveFullFillet"""
+        for ID in [1, 2]:
+            N = getattr(self, 'N'+str(ID))
+            Rb = getattr(self, 'Rb'+str(ID))
+            Rr = getattr(self, 'Rr'+str(ID))
+            Ro = getattr(self, 'Ro'+str(ID))
+            theta_B = getattr(self, 'theta_B'+str(ID))
+            Rf_in = getattr(self, 'Rf'+str(ID)+'_in')
+
+            Rff, phi_JFI, self.converged['Rff'+str(ID)] = solveFullFillet(N, Rb, Rr, Ro, theta_B,
+                                                                           xtol=quality.setting('xtol'))
+            Rff = maximum(Rff, 0)
+
+            setattr(self, 'Rff'+str(ID), Rff)
+            setattr(self, 'phi_Rff'+str(ID), phi_JFI)
+            setattr(self, 'Rf'+str(ID), minimum(Rf_in, Rff))
+
+    def checkUndercut(self):
+        for ID in [1, 2]:
+            Rb = getattr(self, 'Rb'+str(ID))
+            Rr = getattr(self, 'Rr'+str(ID))
+            Rf = getattr(self, 'Rf'+str(ID))
+            theta_B = getattr(self, 'theta_B'+str(ID))
+
+            # distance from the gear center to the center point of the root fillet,
+            # assuming the JFI is on the base circle
+            CF = sqrt(Rb**2 + Rf**2)
+            undercut = Rr < CF - Rf
+
+            # undercut - JFI is on the base circle
+            theta_F_uc = theta_B + arcsin(Rf / (Rr + Rf))
+
+            # profile angle through center of fillet circle
+            phi_F = arccos(minimum(Rb / (Rr + Rf), 1))
+            # line tangent to base circle through fillet center point
+            EF = sqrt(maximum((Rr+Rf)**2 - Rb**2, 0))
+            # profile angle at JFI
+            phi_A = arctan((EF - Rf) / Rb)
+            theta_F = phi_F - phi_A + theta_B - invF(phi_A)
+
+            setattr(self, 'undercut'+str(ID), undercut)
+            setattr(self, 'phi_JFI'+str(ID), where(undercut, 0, phi_A))
+            setattr(self, 'theta_F'+str(ID), where(undercut, theta_F_uc, theta_F))
+
+# Stress ######################################################################
+    def lewisParabola(self, _ID, _Rload=None):
+        """Lewis parabola tangent to the root fillet, see solvers.solveLewisParabola.
+
+        The load is at the highest point of single tooth contact unless _Rload
+        gives other load radii.  _Rload broadcasts against the designs, so an
+        array of shape (k, len(self)) evaluates k load positions per design.
+        """
+        ID = str(_ID)
+        Rload = getattr(self, 'Rhp'+ID) if _Rload is None else _Rload
+
+        Rd, gamma, x, y, a, converged = solveLewisParabola(getattr(self, 'Rb'+ID), Rload,
+                                                           getattr(self, 'theta_B'+ID),
+                                                           getattr(self, 'Rr'+ID),
+                                                           getattr(self, 'Rf'+ID),
+                                                           getattr(self, 'theta_F'+ID),
+                                                           polish=quality.setting('lewisPolish'))
+        if _Rload is None:
+            self.converged['lewis'+ID] = converged
+
+        return Rd, gamma, x, y, a
+
+    def updateStress(self):
+        # convert torque to force through HPSTC tangent to base circle
+        w = self.torque / (self.Rb1 * self.FW)
+
+        # contact stress
+        Cp = 1/sqrt( (pi*(1-self.nu1**2)/self.E1) + (pi*(1-self.nu2**2)/self.E2) )
+        rho1 = sqrt(self.Roe1**2 - self.Rb1**2) - self.Pb1              # AGMA C2
+        rho2 = (self.Rb1+self.Rb2)*tan(self.OPA) - rho1                 # AGMA C6 - C2
+        self.stressC = Cp * sqrt(w*( (rho1+rho2)/(rho1*rho2) ))
+
+        # Stress concentration factor Kf
+        # from GOIG 11.24 - 11.26
+        OPA_deg = self.OPA_deg
+        k1 = 0.3054 - 0.00489*OPA_deg - 0.000069*OPA_deg**2
+        k2 = 0.3620 - 0.01268*OPA_deg + 0.000104*OPA_deg**2
+        k3 = 0.2934 + 0.00609*OPA_deg + 0.000087*OPA_deg**2
+
+        for ID in [1, 2]:
+            Rd, gamma, x_Lewis, y_Lewis, a_Lewis = self.lewisParabola(ID)
+            Rf = getattr(self, 'Rf'+str(ID))
+
+            # Lewis parabola dimensions
+            tt_LP = 2*x_Lewis       # tooth thickness at critical section
+            h_LP = Rd - y_Lewis     # height of Lewis parabola
+
+            # please don't divide by zero, floor scaled with the module
+            Kf = k1 + ( (tt_LP/maximum(Rf, 0.001*self.mod))**k2 ) * ( (tt_LP/h_LP)**k3 )
+
+            stressB = (w/self.mod) * cos(gamma) * (Kf*( ((1.5*self.mod*h_LP)/ x_Lewis**2) -
+                                    (0.5*self.mod*tan(gamma))/x_Lewis ) )
+
+            setattr(self, 'lewisParams'+str(ID), (Rd, gamma, x_Lewis, y_Lewis, a_Lewis))
+            setattr(self, 'stressB'+str(ID), stressB)
+
+# Sensitivities ###############################################################
+    def sensitivities(self, _wrt=None):
+        """Analytic derivatives of the main outputs with respect to the design inputs.
+
+        Call after evaluate().  Each input is pushed through a forward (tangent)
+        pass that mirrors evaluate(); the solved quantities (OPA, Rtip_max, Rff
+        and the Lewis parabola) are differentiated implicitly through the
+        equations they solve, dz = -(dF/dp . dp) / (dF/dz), so no extra solves
+        are needed.  Clamps (Ro, Rtip, Rf) follow whichever side is active.
+
+        _wrt is a list of input names, by default x1, x2, Ro1, Ro2, Rf1, Rf2,
+        rtcl1, rtcl2, bkl (or CD when it's the input) and PA_deg.  Returns
+        {output: {input: array}} for CR, Romax1/2, Rtip_max1/2, Rff1/2,
+        stressB1/2 and stressC.
+        """
+        if _wrt is None:
+            _wrt = ['x1', 'x2', 'Ro1', 'Ro2', 'Rf1', 'Rf2', 'rtcl1', 'rtcl2',
+                    'CD' if self.CD_bkl else 'bkl', 'PA_deg']
+
+        inputs = ['x1', 'x2', 'Ro1', 'Ro2', 'Rf1', 'Rf2', 'rtcl1', 'rtcl2', 'bkl', 'CD', 'PA_deg']
+        outputs = ['CR', 'Romax1', 'Romax2', 'Rtip_max1', 'Rtip_max2',
+                   'Rff1', 'Rff2', 'stressB1', 'stressB2', 'stressC']
+
+        sens = {output: {} for output in outputs}
+        for name in _wrt:
+            if name not in inputs:
+                raise ValueError("No sensitivity with respect to '"+name+"'")
+            if (name == 'CD') != (self.CD_bkl == 1) and name in ['bkl', 'CD']:
+                raise ValueError("'"+name+"' is not an input of this batch")
+
+            seed = {key: np.zeros(self.shape) for key in inputs}
+            seed[name] = np.ones(self.shape)
+            d = self.tangent(seed)
+
+            for output in outputs:
+                sens[output][name] = d[output]
+
+        return sens
+
+    def tangent(self, _seed):
+        """Forward derivative of evaluate() along one direction of the inputs.
+
+        _seed holds the input tangents (x1, x2, Ro1, Ro2, Rf1, Rf2, rtcl1,
+        rtcl2, bkl, CD, PA_deg).  Returns a dict of tangents keyed by the
+        attribute names of evaluate().
+        """
+        d = {}
+        dPA = deg2rad(_seed['PA_deg'])
+        PA = self.PA
+        invS = invF(PA)
+        dinvS = tan(PA)**2 * dPA
+
+        # updateBaseAndPitch
+        for ID in ['1', '2']:
+            g = lambda name: getattr(self, name+ID)
+            x = g('x')
+            Rs = g('Rs')
+            Rb = g('Rb')
+
+            d['tts'+ID] = self.mod*2*(_seed['x'+ID]*tan(PA) + x*dPA/cos(PA)**2)
+            d['Rb'+ID] = -Rs*sin(PA)*dPA
+            d['Pb'+ID] = tau*d['Rb'+ID]/g('N')
+            d['theta_B'+ID] = d['tts'+ID]/(2*Rs) + dinvS
+
+            # invF(phi_max) = theta_B
+            phi_max = arccos(Rb/g('Romax'))
+            dphi_max = d['theta_B'+ID] / tan(phi_max)**2
+            d['Romax'+ID] = d['Rb'+ID]/cos(phi_max) + g('Romax')*tan(phi_max)*dphi_max
+
+            Ro_in = getattr(self, 'Ro'+ID+'_in')
+            Ro_in = where(np.isnan(Ro_in), g('Ros'), Ro_in)
+            d['Ro'+ID] = where(Ro_in < g('Romax'), _seed['Ro'+ID], d['Romax'+ID])
+
+        # updatePitchRadius, implicit in OPA
+        OPA = self.OPA
+        if self.CD_bkl == 0:
+            S2 = 2*(self.Rb1 + self.Rb2)
+            dS2 = 2*(d['Rb1'] + d['Rb2'])
+            dK = (d['Rb1']*(self.tts1/self.Rs1 + 2*invS) + self.Rb1*(d['tts1']/self.Rs1 + 2*dinvS) +
+                  d['Rb2']*(self.tts2/self.Rs2 + 2*invS) + self.Rb2*(d['tts2']/self.Rs2 + 2*dinvS) -
+                  tau*d['Rb1']/self.N1)
+            dF = dS2*invF(OPA) - dK - _seed['bkl']*cos(OPA)
+            d['OPA'] = -dF / (S2*tan(OPA)**2 + self.bkl*sin(OPA))
+        else:
+            # cos(OPA) = (Rb1 + Rb2) / CD
+            dcos = (d['Rb1'] + d['Rb2'])/self.CD - (self.Rb1 + self.Rb2)*_seed['CD']/self.CD**2
+            d['OPA'] = -dcos / sin(OPA)
+
+        for ID in ['1', '2']:
+            g = lambda name: getattr(self, name+ID)
+            d['Rp'+ID] = d['Rb'+ID]/cos(OPA) + g('Rp')*tan(OPA)*d['OPA']
+
+        if self.CD_bkl == 0:
+            d['CD'] = d['Rp1'] + d['Rp2']
+        else:
+            d['CD'] = _seed['CD']
+
+        # updateMaxTipRadius, implicit in t = tan(phi_tip)
+        # g(t) = Rb*t - Rb*tan(alpha) + Rb/cos(alpha) - Ro, alpha = t - theta_B
+        for ID in ['1', '2']:
+            g = lambda name: getattr(self, name+ID)
+            Rb = g('Rb')
+            t = tan(g('phi_Rtip_max'))
+            alpha = t - g('theta_B')
+            sec = 1/cos(alpha)
+
+            dg_dt = Rb*tan(alpha)*(sec - tan(alpha))
+            dg = ( d['Rb'+ID]*(t - tan(alpha) + sec) - d['Ro'+ID] +
+                   Rb*sec*(sec - tan(alpha))*d['theta_B'+ID] )
+            with np.errstate(divide='ignore', invalid='ignore'):
+                dt = -dg / dg_dt
+            # a pointed tooth has Rtip_max = 0 whatever the inputs
+            dt = where(g('Rtip_max') > 0, dt, 0)
+            d['Rtip_max'+ID] = where(g('Rtip_max') > 0,
+                                     d['Rb'+ID]*(t - tan(alpha)) + Rb*(dt - sec**2*(dt - d['theta_B'+ID])), 0)
+
+            Rtip_in = getattr(self, 'Rtip'+ID+'_in')
+            d['Rtip'+ID] = where(Rtip_in < g('Rtip_max'), 0, d['Rtip_max'+ID])
+
+            # Roe = sqrt(Rb^2 + (Q + Rtip)^2), Q = sqrt((Ro-Rtip)^2 - Rb^2)
+            Ro = g('Ro')
+            Rtip = g('Rtip')
+            Q = sqrt((Ro-Rtip)**2 - Rb**2)
+            dQ = ((Ro-Rtip)*(d['Ro'+ID] - d['Rtip'+ID]) - Rb*d['Rb'+ID]) / Q
+            d['Roe'+ID] = (Rb*d['Rb'+ID] + (Q + Rtip)*(dQ + d['Rtip'+ID])) / g('Roe')
+
+        # updateContactRatio
+        d['C6'] = d['CD']*sin(OPA) + self.CD*cos(OPA)*d['OPA']
+        d['C1'] = d['C6'] - (self.Roe2*d['Roe2'] - self.Rb2*d['Rb2']) / (self.C6 - self.C1)
+        d['C5'] = (self.Roe1*d['Roe1'] - self.Rb1*d['Rb1']) / self.C5
+        d['C2'] = d['C5'] - d['Pb1']
+        d['C4'] = d['C1'] + d['Pb1']
+        d['LoC'] = d['C5'] - d['C1']
+        d['CR'] = (d['LoC'] - self.CR*d['Pb1']) / self.Pb1
+        d['Rhp1'] = (self.Rb1*d['Rb1'] + self.C4*d['C4']) / self.Rhp1
+        d['Rhp2'] = (self.Rb2*d['Rb2'] + (self.C6-self.C2)*(d['C6']-d['C2'])) / self.Rhp2
+
+        # updateRootRadius, standard clearance is 1/4 of the mate's addendum
+        d['rtcl1'] = _seed['rtcl1'] + where(np.isnan(self.rtcl1_in), -0.25*d['Rp2'], 0)
+        d['rtcl2'] = _seed['rtcl2'] + where(np.isnan(self.rtcl2_in), -0.25*d['Rp1'], 0)
+        d['Rr1'] = d['CD'] - d['Ro2'] - d['rtcl1']
+        d['Rr2'] = d['CD'] - d['Ro1'] - d['rtcl2']
+
+        for ID in ['1', '2']:
+            g = lambda name: getattr(self, name+ID)
+            Rb = g('Rb')
+            Rr = g('Rr')
+            dRb = d['Rb'+ID]
+            dRr = d['Rr'+ID]
+            dtheta_B = d['theta_B'+ID]
+
+            # updateMaxRootFillet, implicit in t = tan(phi_Rff)
+            # h(t) = Rb*(tan(phi_F) - t) - Rb/cos(phi_F) + Rr, phi_F = alpha + t
+            alpha = pi/g('N') - g('theta_B')
+            t = tan(g('phi_Rff'))
+            phi_F = alpha + t
+            sec = 1/cos(phi_F)
+            dh_dt = Rb*tan(phi_F)*(tan(phi_F) - sec)
+            dh = dRb*(tan(phi_F) - t - sec) + dRr - Rb*sec*(sec - tan(phi_F))*dtheta_B
+            with np.errstate(divide='ignore', invalid='ignore'):
+                dt = -dh / dh_dt
+                dRff = dRb*(tan(phi_F) - t) + Rb*(sec**2*(dt - dtheta_B) - dt)
+
+            # undercut, Rff = Rr*sin(alpha) / (1 - sin(alpha))
+            s = sin(alpha)
+            dRff_uc = dRr*s/(1 - s) - Rr*cos(alpha)*dtheta_B/(1 - s)**2
+
+            undercut = Rr < Rb/cos(alpha) - Rb*tan(alpha)
+            d['Rff'+ID] = where(g('Rff') > 0, where(undercut, dRff_uc, dRff), 0)
+
+            Rf_in = getattr(self, 'Rf'+ID+'_in')
+            d['Rf'+ID] = where(Rf_in < g('Rff'), _seed['Rf'+ID], d['Rff'+ID])
+
+            # checkUndercut
+            Rf = g('Rf')
+            dRf = d['Rf'+ID]
+            R = Rr + Rf
+            dR = dRr + dRf
+            with np.errstate(divide='ignore', invalid='ignore'):
+                # JFI on the base circle, theta_F = theta_B + arcsin(Rf/R)
+                dtheta_F_uc = dtheta_B + (dRf/R - Rf*dR/R**2) / sqrt(1 - (Rf/R)**2)
+                # theta_F = phi_F - (EF - Rf)/Rb + theta_B
+                EF = sqrt(R**2 - Rb**2)
+                dphi_F = -(dRb - Rb*dR/R) / EF
+                dEF = (R*dR - Rb*dRb) / EF
+                dtheta_F = dphi_F - (dEF - dRf)/Rb + (EF - Rf)*dRb/Rb**2 + dtheta_B
+            d['theta_F'+ID] = where(g('undercut'), dtheta_F_uc, dtheta_F)
+
+        # updateStress
+        w = self.torque / (self.Rb1 * self.FW)
+        dw = -w*d['Rb1']/self.Rb1
+
+        rho1 = sqrt(self.Roe1**2 - self.Rb1**2) - self.Pb1
+        rho2 = (self.Rb1+self.Rb2)*tan(OPA) - rho1
+        drho1 = d['C5'] - d['Pb1']
+        drho2 = ( (d['Rb1'] + d['Rb2'])*tan(OPA) +
+                  (self.Rb1+self.Rb2)*d['OPA']/cos(OPA)**2 - drho1 )
+        P = 1/rho1 + 1/rho2
+        dP = -drho1/rho1**2 - drho2/rho2**2
+        d['stressC'] = 0.5*self.stressC*(dw/w + dP/P)
+
+        OPA_deg = self.OPA_deg
+        dOPA_deg = rad2deg(d['OPA'])
+        k1 = 0.3054 - 0.00489*OPA_deg - 0.000069*OPA_deg**2
+        k2 = 0.3620 - 0.01268*OPA_deg + 0.000104*OPA_deg**2
+        k3 = 0.2934 + 0.00609*OPA_deg + 0.000087*OPA_deg**2
+        dk1 = (-0.00489 - 2*0.000069*OPA_deg)*dOPA_deg
+        dk2 = (-0.01268 + 2*0.000104*OPA_deg)*dOPA_deg
+        dk3 = (0.00609 + 2*0.000087*OPA_deg)*dOPA_deg
+
+        for ID in ['1', '2']:
+            g = lambda name: getattr(self, name+ID)
+            Rb = g('Rb')
+            Rd, gamma, x, y, a = g('lewisParams')
+
+            # Lewis parabola load point
+            phi_L = arccos(Rb/g('Rhp'))
+            dphi_L = -(d['Rb'+ID] - Rb*d['Rhp'+ID]/g('Rhp')) / sqrt(g('Rhp')**2 - Rb**2)
+            dgamma = dphi_L/cos(phi_L)**2 - d['theta_B'+ID]
+            dRd = d['Rb'+ID]/cos(gamma) + Rd*tan(gamma)*dgamma
+
+            # fillet center
+            Rr = g('Rr')
+            Rf = g('Rf')
+            theta_F = g('theta_F')
+            dR = d['Rr'+ID] + d['Rf'+ID]
+            Fx = (Rr + Rf)*sin(theta_F)
+            Fy = (Rr + Rf)*cos(theta_F)
+            dFx = dR*sin(theta_F) + (Rr + Rf)*cos(theta_F)*d['theta_F'+ID]
+            dFy = dR*cos(theta_F) - (Rr + Rf)*sin(theta_F)*d['theta_F'+ID]
+
+            # tangent point, implicit in psi with x = Fx - Rf*cos(psi), y = Fy - Rf*sin(psi)
+            # G = -2*D*sin(psi) + 2*Rf*sin(psi)^2 - Fx*cos(psi) + Rf*cos(psi)^2, D = Fy - Rd
+            with np.errstate(divide='ignore', invalid='ignore'):
+                c = (Fx - x)/Rf
+                s = (Fy - y)/Rf
+                D = Fy - Rd
+                dG_dpsi = -2*D*c + 2*Rf*s*c + Fx*s
+                dG = -2*s*(dFy - dRd) + (1 + s**2)*d['Rf'+ID] - c*dFx
+                dpsi = -dG / dG_dpsi
+                dx = dFx - d['Rf'+ID]*c + Rf*s*dpsi
+                dy = dFy - d['Rf'+ID]*s - Rf*c*dpsi
+            dx = where(Rf > 0, dx, dFx)
+            dy = where(Rf > 0, dy, dFy)
+
+            # Lewis parabola dimensions
+            tt_LP = 2*x
+            h_LP = Rd - y
+            dtt_LP = 2*dx
+            dh_LP = dRd - dy
+
+            Rfc = maximum(Rf, 0.001*self.mod)
+            dRfc = where(Rf > 0.001*self.mod, d['Rf'+ID], 0)
+            A = tt_LP/Rfc
+            B = tt_LP/h_LP
+            dA = dtt_LP/Rfc - A*dRfc/Rfc
+            dB = dtt_LP/h_LP - B*dh_LP/h_LP
+            Kf = k1 + A**k2 * B**k3
+            dKf = dk1 + A**k2 * B**k3 * (dk2*np.log(A) + k2*dA/A + dk3*np.log(B) + k3*dB/B)
+
+            # stressB = w*cos(gamma)*Kf*M
+            M = 1.5*h_LP/x**2 - 0.5*tan(gamma)/x
+            dM = ( 1.5*dh_LP/x**2 - 3*h_LP*dx/x**3 -
+                   0.5*dgamma/(cos(gamma)**2 * x) + 0.5*tan(gamma)*dx/x**2 )
+            d['stressB'+ID] = g('stressB')*(dw/w - tan(gamma)*dgamma + dKf/Kf + dM/M)
+
+        return d
@@ -0,0 +1,160 @@
+from GearPairBatch import GearPairBatch
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+class PairCatalog:
+    """Precomputed properties of standard gear pairs, for instant lookups.
+
+    Every pair of tooth counts N1, N2 in a range is evaluated with
+    GearPairBatch at each pressure angle and combination of profile shifts
+    on a grid, with zero backlash and otherwise standard dimensions.  The
+    results are stored in arrays of shape (PA, x1, x2, N1, N2), so a pair is
+    found by index arithmetic and a question like "every pair with a ratio
+    and center distance in range and a CR over 1.2" is a boolean mask over
+    one (N1, N2) slice.
+
+    Everything is stored at mod = 1 and scaled on lookup: lengths go with
+    the module, CR and the undercut flags don't depend on it.  So the
+    catalog covers every module, not just the standard ones.
+
+    The catalog is built with the builder command,
+        python3 PairCatalog.py [--min 8] [--max 300] [--workers n]
+    which evaluates the (PA, x1, x2) slices in parallel processes and writes
+    a compressed .npz to resources/.
+    """
+
+    defaultPath = os.path.join(os.path.dirname(__file__), "resources", "pairCatalog.npz")
+
+    # per pair results, see GearPairBatch
+    properties = ['CR', 'CD', 'Romax1', 'Romax2', 'Rff1', 'Rff2', 'undercut1', 'undercut2']
+    lengthProperties = ['CD', 'Romax1', 'Romax2', 'Rff1', 'Rff2']
+
+    def __init__(self, _N, _PA_deg, _shifts, _arrays):
+        self.N = np.asarray(_N)
+        self.PA_deg = np.asarray(_PA_deg, dtype=float)
+        self.shifts = np.asarray(_shifts, dtype=float)
+        self.arrays = _arrays           # property : array of shape (PA, x1, x2, N1, N2)
+
+    @classmethod
+    def build(cls, Nmin=8, Nmax=300, PA_deg=(14.5, 20, 25), shifts=(0, 0.25, 0.5), workers=None):
+        """Evaluates the catalog, one process per (PA, x1, x2) slice."""
+        N = np.arange(Nmin, Nmax+1)
+        slices = [(N, PA, x1, x2) for PA in PA_deg for x1 in shifts for x2 in shifts]
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(buildSlice, slices))
+
+        shape = (len(PA_deg), len(shifts), len(shifts), len(N), len(N))
+        arrays = {name : np.stack([result[name] for result in results]).reshape(shape)
+                  for name in cls.properties}
+        return cls(N, PA_deg, shifts, arrays)
+
+    @classmethod
+    def load(cls, path=None):
+        """Reads a catalog written by save().  Raises OSError if there is none."""
+        with np.load(cls.defaultPath if path is None else path) as data:
+            arrays = {name : data[name] for name in cls.properties}
+            return cls(data['N'], data['PA_deg'], data['shifts'], arrays)
+
+    def save(self, path=None):
+        np.savez_compressed(self.defaultPath if path is None else path,
+                            N=self.N, PA_deg=self.PA_deg, shifts=self.shifts, **self.arrays)
+
+# Lookups #####################################################################
+    def gridIndex(self, _grid, _value, _name):
+        index = int(np.argmin(np.abs(_grid - float(_value))))
+        if not np.isclose(_grid[index], float(_value)):
+            raise KeyError(_name + " " + str(_value) + " is not in the catalog")
+        return index
+
+    def sliceIndex(self, PA_deg=20, x1=0, x2=0):
+        """Index of the (N1, N2) slice for a pressure angle and pair of shifts."""
+        return (self.gridIndex(self.PA_deg, PA_deg, "PA"),
+                self.gridIndex(self.shifts, x1, "x1"),
+                self.gridIndex(self.shifts, x2, "x2"))
+
+    def covers(self, N1, N2, PA_deg=20, x1=0, x2=0):
+        """True if every N1, N2 pair and the PA and shifts are in the catalog."""
+        try:
+            self.sliceIndex(PA_deg, x1, x2)
+        except KeyError:
+            return False
+        return bool(np.all((np.asarray(N1) >= self.N[0]) & (np.asarray(N1) <= self.N[-1]) &
+                           (np.asarray(N2) >= self.N[0]) & (np.asarray(N2) <= self.N[-1])))
+
+    def scaled(self, _name, _values, _mod):
+        return _values*_mod if _name in self.lengthProperties else _values
+
+    def lookup(self, _name, N1, N2, mod=1, PA_deg=20, x1=0, x2=0):
+        """Value of a property for the pairs N1, N2 (broadcast against each other)."""
+        table = self.arrays[_name][self.sliceIndex(PA_deg, x1, x2)]
+        values = table[np.asarray(N1) - self.N[0], np.asarray(N2) - self.N[0]]
+        return self.scaled(_name, values, mod)
+
+    def query(self, mod=1, PA_deg=20, x1=0, x2=0, ratio=None, CD=None, minCR=None, undercut=None):
+        """Every pair meeting the constraints, as a dict of arrays.
+
+        ratio and CD are (low, high) ranges, either end can be None.  minCR is
+        the lowest contact ratio allowed.  undercut=False keeps only pairs
+        where neither gear is undercut.  The result has N1, N2, ratio and every
+        property, lengths scaled to mod.
+        """
+        s = self.sliceIndex(PA_deg, x1, x2)
+        N1, N2 = np.meshgrid(self.N, self.N, indexing='ij')
+        GR = N2 / N1
+        CDs = self.arrays['CD'][s] * mod
+
+        mask = np.isfinite(CDs)
+        for values, limits in [(GR, ratio), (CDs, CD)]:
+            if limits is None:
+                continue
+            low, high = limits
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        if minCR is not None:
+            mask &= self.arrays['CR'][s] >= minCR
+        if undercut is not None:
+            mask &= (self.arrays['undercut1'][s] | self.arrays['undercut2'][s]) == undercut
+
+        result = {'N1' : N1[mask], 'N2' : N2[mask], 'ratio' : GR[mask]}
+        for name in self.properties:
+            result[name] = self.scaled(name, self.arrays[name][s][mask], mod)
+        return result
+
+def buildSlice(_args):
+    """Properties of every N1, N2 pair at one PA and pair of shifts, at mod = 1."""
+    N, PA_deg, x1, x2 = _args
+    N1, N2 = np.meshgrid(N, N, indexing='ij')
+    batch = GearPairBatch(N1, N2, 1, PA_deg, x1, x2).evaluateGeometry()
+
+    result = {}
+    for name in PairCatalog.properties:
+        value = getattr(batch, name)
+        result[name] = value if value.dtype == bool else value.astype(np.float32)
+    # designs the solvers couldn't settle are left out of every query
+    converged = np.logical_and.reduce([np.broadcast_to(c, N1.shape) for c in batch.converged.values()])
+    result['CD'] = np.where(converged, result['CD'], np.nan).astype(np.float32)
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Builds the standard gear pair catalog used by the Layout Helper.")
+    parser.add_argument('--min', type=int, default=8, help="fewest teeth")
+    parser.add_argument('--max', type=int, default=300, help="most teeth")
+    parser.add_argument('--PA', type=float, nargs='+', default=[14.5, 20, 25], help="pressure angles, degrees")
+    parser.add_argument('--shifts', type=float, nargs='+', default=[0, 0.25, 0.5], help="profile shift grid")
+    parser.add_argument('--workers', type=int, default=None, help="processes, defaults to the number of CPUs")
+    parser.add_argument('--out', default=PairCatalog.defaultPath, help="output .npz")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    catalog = PairCatalog.build(args.min, args.max, sorted(args.PA), sorted(args.shifts), args.workers)
+    catalog.save(args.out)
+    print("{} pairs in {:.1f} s, {:.1f} MB written to {}".format(catalog.arrays['CR'].size,
+          time.perf_counter() - start, os.path.getsize(args.out)/2**20, args.out))
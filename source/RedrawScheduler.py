@@ -0,0 +1,74 @@
+from PySide6.QtCore import QTimer
+
+class RedrawScheduler:
+    """Coalesces redraw requests, running each at most once per event loop turn.
+
+    UI signals ask for a redraw with request(key, draw), usually keyed by
+    the canvas being drawn.  The draws run together on the next turn of the
+    event loop, once per key however many times it was requested in the
+    meantime, so a burst of edits, a button wired to several slots or a pair
+    of radio buttons toggling together ends in one paint per canvas.  A
+    request with updateAxes=True keeps that flag until its draw has run.
+
+    Canvas resizes are throttled the same way, see MplCanvas.resizeEvent():
+    while a window is being dragged the figure is resized at most once every
+    resizeInterval ms instead of on every resize event.
+
+    requested counts every request, coalesced the ones that were merged into
+    a draw already pending, and flushes the number of batches of draws run.
+    """
+
+    def __init__(self, resizeInterval=100):
+        self.pending = {}               # key : [draw, updateAxes]
+        self.resizes = {}               # canvas : latest resize event
+        self.requested = 0
+        self.coalesced = 0
+        self.flushes = 0
+
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.flush)
+
+        self.resizeTimer = QTimer()
+        self.resizeTimer.setSingleShot(True)
+        self.resizeTimer.setInterval(resizeInterval)
+        self.resizeTimer.timeout.connect(self.flushResizes)
+
+    def request(self, _key, _draw, _updateAxes=False):
+        """Runs _draw(updateAxes) on the next event loop turn, once per _key."""
+        self.requested += 1
+        if _key in self.pending:
+            self.coalesced += 1
+            self.pending[_key][1] = self.pending[_key][1] or _updateAxes
+        else:
+            self.pending[_key] = [_draw, _updateAxes]
+
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        """Runs the pending draws now."""
+        self.timer.stop()
+        # draws can ask for more draws, those wait for the next turn
+        pending, self.pending = self.pending, {}
+        if pending:
+            self.flushes += 1
+        for draw, updateAxes in pending.values():
+            draw(updateAxes)
+
+    def requestResize(self, _canvas, _event):
+        """Applies the latest resize of _canvas once the throttle interval is up."""
+        self.requested += 1
+        if _canvas in self.resizes:
+            self.coalesced += 1
+        self.resizes[_canvas] = _event
+
+        # not restarted, so a long drag still redraws every interval
+        if not self.resizeTimer.isActive():
+            self.resizeTimer.start()
+
+    def flushResizes(self):
+        resizes, self.resizes = self.resizes, {}
+        for canvas, event in resizes.items():
+            canvas.applyResize(event)
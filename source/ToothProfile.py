@@ -0,0 +1,316 @@
+from involute import tau, invF
+import quality
+
+import numpy as np
+from numpy import pi, sin, cos, arccos, arctan
+from numpy import rad2deg
+from numpy import sqrt, linspace
+
+class ToothProfile:
+    """Outline of the teeth of one gear, shared by everything that draws or uses it.
+
+    Holds the primitives of the right half of a tooth, centered on the +y
+    axis, and tessellates them into a closed polygon of the whole gear.
+    Angles theta are measured from the tooth centerline towards +x, so a
+    point at radius R is (R*sin(theta), R*cos(theta)).
+
+    Primitives are tuples, either
+        ('line', x, y)                              polyline through the points
+        ('arc', (cx, cy), R, theta1, theta2)        counter clockwise, degrees
+    which map directly onto matplotlib patches and ezdxf entities.
+
+    Curves are tessellated to a chord error tolerance in mm, the largest
+    distance between a curve and the straight segments that replace it, by
+    default the chordTolerance of the active quality profile.
+
+    The profile is split into sections that only depend on some of the
+    gear's parameters: the involute of the base tooth, the root (root arc,
+    fillet and undercut line) and the tip (tip arc and outer arc).  update()
+    only recomputes the sections whose parameters changed, and lists them in
+    self.retessellated.  The involute is evaluated once on a fixed grid from
+    the base circle to the sharp tip and only clipped to the JFI and Roe
+    afterwards, so changing the tip or root doesn't touch it.
+    """
+
+    def __init__(self, _tolerance=None):
+        self.tolerance = quality.setting('chordTolerance') if _tolerance is None else _tolerance
+
+        self.keys = {}              # section : parameters it was computed from
+        self.retessellated = []     # sections recomputed by the last update()
+
+        self.theta_B = 0            # half tooth angle at the base circle
+        self.Rjfi = 0               # radius of the JFI
+        self.filletCenter = (0, 0)
+        self.hpstcPoint = (0, 0)    # highest point of single tooth contact
+
+        self.root = []         # in order from the involute to the middle of the gap
+        self.tip = []
+        self.involute = None
+
+        self.halfLine = None
+        self.gearPolygon = None
+
+    def update(self, _pair, _gear):
+        """Brings the profile up to date with an evaluated gear, returns self."""
+        G = _gear
+        self.retessellated = []
+
+        self.theta_B = (G.tts/(2*G.Rs)) + invF(_pair.PA)
+        self.Rb = G.Rb
+        self.N = G.N
+
+        if self.changed('base', (G.Rb, self.theta_B, G.Romax, self.tolerance)):
+            self.updateBase(G)
+        if self.changed('root', (G.N, G.Rb, self.theta_B, G.Rr, G.Rf, G.Rff, G.theta_F, G.phi_JFI, G.undercut)):
+            self.updateRoot(G)
+        if self.changed('tip', (G.Rb, self.theta_B, G.Ro, G.Rtip, G.Rtip_max, G.Roe)):
+            self.updateTip(G)
+        if self.retessellated:
+            self.updateInvolute(G)
+            self.halfLine = None
+            self.gearPolygon = None
+
+        if G.Rhp >= G.Rb:
+            self.hpstcPoint = self.involutePoint(G.Rhp)
+
+        return self
+
+    def sectionKeys(self):
+        return {section : list(key) for section, key in self.keys.items()}
+
+    def sections(self):
+        """The computed sections and tessellation, for a DesignCache entry.
+
+        Made of lists, numbers and arrays so the entry can be stored as JSON,
+        restoreSections() turns it back into a profile that update() finds up
+        to date.
+        """
+        return {
+            'keys' : self.sectionKeys(),
+            'theta_B' : self.theta_B, 'Rb' : self.Rb, 'N' : self.N,
+            'Rjfi' : self.Rjfi, 'filletCenter' : list(self.filletCenter),
+            'gridR' : self.gridR, 'gridTheta' : self.gridTheta,
+            'root' : self.root, 'tip' : self.tip, 'involute' : self.involute,
+            'halfLine' : self.halfLine, 'gearPolygon' : self.gearPolygon,
+        }
+
+    def restoreSections(self, _sections):
+        """Loads sections(), as stored or as read back from JSON."""
+        def primitive(_prim):
+            if _prim[0] == 'line':
+                return ('line', np.asarray(_prim[1]), np.asarray(_prim[2]))
+            kind, center, R, theta1, theta2 = _prim
+            return (kind, tuple(center), R, theta1, theta2)
+
+        def array(_value):
+            return None if _value is None else np.asarray(_value)
+
+        self.keys = {section : tuple(key) for section, key in _sections['keys'].items()}
+        self.theta_B = _sections['theta_B']
+        self.Rb = _sections['Rb']
+        self.N = _sections['N']
+        self.Rjfi = _sections['Rjfi']
+        self.filletCenter = tuple(_sections['filletCenter'])
+        self.gridR = array(_sections['gridR'])
+        self.gridTheta = array(_sections['gridTheta'])
+        self.root = [primitive(prim) for prim in _sections['root']]
+        self.tip = [primitive(prim) for prim in _sections['tip']]
+        self.involute = primitive(_sections['involute'])
+        self.halfLine = array(_sections['halfLine'])
+        self.gearPolygon = array(_sections['gearPolygon'])
+        self.retessellated = []
+
+    def changed(self, _section, _key):
+        old = self.keys.get(_section)
+        if old == _key:
+            return False
+        # a design restored from a DesignCache is rescaled from mod = 1, which
+        # can move its radii by the last bit; that's not a change
+        if old is not None and len(old) == len(_key) and np.allclose(old, _key, rtol=1e-12, atol=0):
+            return False
+        self.keys[_section] = _key
+        self.retessellated.append(_section)
+        return True
+
+    def involuteTheta(self, _R):
+        return self.theta_B - invF(arccos(self.Rb/_R))
+
+    def involutePoint(self, _R):
+        """Point on the right side involute at radius _R."""
+        theta = self.involuteTheta(_R)
+        return (_R*sin(theta), _R*cos(theta))
+
+# Sections ####################################################################
+    def updateBase(self, _gear):
+        """Involute grid from the base circle to the sharp tip.
+
+        With roll angle e = tan(phi), the involute has radius of curvature
+        Rb*e and arc length Rb*e^2/2, so a chord spanning de has a sagitta of
+        about Rb*e*de^2/8.  In u = e^(3/2) that is Rb*du^2/18 everywhere on
+        the curve, so points evenly spaced in u with du = sqrt(18*tol/Rb)
+        keep the whole involute within the tolerance.
+        """
+        Rb = _gear.Rb
+        uMax = sqrt(max((_gear.Romax/Rb)**2 - 1, 0))**1.5
+        du = sqrt(18*self.tolerance/Rb)
+        e = linspace(0, uMax, max(1, int(np.ceil(uMax/du))) + 1)**(2/3)
+
+        self.gridR = Rb*sqrt(1 + e**2)
+        self.gridTheta = self.theta_B - (e - arctan(e))
+
+    def updateInvolute(self, _gear):
+        # grid points between the JFI and Roe, with exact end points
+        inside = (self.gridR > self.Rjfi) & (self.gridR < _gear.Roe)
+        R = np.concatenate([[self.Rjfi], self.gridR[inside], [_gear.Roe]])
+        theta = np.concatenate([[self.involuteTheta(self.Rjfi)], self.gridTheta[inside],
+                                [self.involuteTheta(_gear.Roe)]])
+        self.involute = ('line', R*sin(theta), R*cos(theta))
+
+    def updateRoot(self, _gear):
+        G = _gear
+        self.root = []         # in order from the involute to the middle of the gap
+
+        self.Rjfi = G.Rb/cos(G.phi_JFI)
+        theta_JFI = self.involuteTheta(self.Rjfi)
+
+        # straight line segment from the fillet to the base circle if undercut
+        if G.undercut == True:
+            theta_A = self.theta_B
+            R = (G.Rr + G.Rf) * cos(G.theta_F - theta_A)
+            self.root.append(('line', np.array([R*sin(theta_A), G.Rb*sin(theta_A)]),
+                                      np.array([R*cos(theta_A), G.Rb*cos(theta_A)])))
+
+        # root fillet
+        Fx = (G.Rr + G.Rf)*sin(G.theta_F)
+        Fy = (G.Rr + G.Rf)*cos(G.theta_F)
+        self.filletCenter = (Fx, Fy)
+        if G.Rf > 0:
+            filletStartAngle = 180 + rad2deg(G.phi_JFI - theta_JFI)
+            filletEndAngle = 360 - 90 - rad2deg(G.theta_F)
+            self.root.append(('arc', (Fx, Fy), G.Rf, filletStartAngle, filletEndAngle))
+
+        # root radius
+        if G.Rf < G.Rff:
+            self.root.append(('arc', (0, 0), G.Rr, -rad2deg(pi/G.N) + 90, -rad2deg(G.theta_F) + 90))
+
+    def updateTip(self, _gear):
+        G = _gear
+        self.tip = []
+
+        # tip radius
+        theta_O = None
+        if G.Rtip > 0:
+            # point where tip touches involute
+            phi_Atip = arccos(G.Rb/G.Roe)
+            theta_Atip = self.theta_B - invF(phi_Atip)
+            # point where tip touches OD
+            CF = G.Ro - G.Rtip      # distance from gear center to fillet center
+            phi_Otip = arccos(G.Rb/CF)
+            theta_O = theta_Atip - phi_Atip + phi_Otip
+            tipStartAngle = rad2deg(phi_Atip - theta_Atip)
+            tipEndAngle = 90 - rad2deg(theta_O)
+            self.tip.append(('arc', (CF*sin(theta_O), CF*cos(theta_O)), G.Rtip, tipStartAngle, tipEndAngle))
+
+        # outer radius, the right half up to the centerline
+        if G.Rtip < G.Rtip_max:
+            if theta_O is None:
+                theta_O = self.involuteTheta(G.Roe)
+            self.tip.append(('arc', (0, 0), G.Ro, -rad2deg(theta_O) + 90, 90))
+
+# Primitives ##################################################################
+    def halfPrimitives(self):
+        """Primitives of the right half of a tooth."""
+        return [self.involute] + self.root + self.tip
+
+    def primitives(self):
+        """Primitives of a whole tooth, the left half mirrored from the right.
+
+        The outer arc is one arc across the centerline rather than two halves.
+        """
+        prims = []
+        for prim in self.halfPrimitives():
+            if prim[0] == 'line':
+                prims.append(prim)
+                prims.append(('line', -prim[1], prim[2]))
+            else:
+                kind, (cx, cy), R, theta1, theta2 = prim
+                if cx == 0 and theta2 == 90:
+                    prims.append((kind, (cx, cy), R, theta1, 180 - theta1))
+                else:
+                    prims.append(prim)
+                    prims.append((kind, (-cx, cy), R, 180 - theta2, 180 - theta1))
+        return prims
+
+# Tessellation ################################################################
+    def tessellate(self, _prim):
+        """Points of one primitive as an (n, 2) array, within the tolerance."""
+        if _prim[0] == 'line':
+            return np.column_stack([_prim[1], _prim[2]])
+
+        kind, (cx, cy), R, theta1, theta2 = _prim
+        span = np.deg2rad(theta2 - theta1)
+        # a chord spanning an angle a is R*(1 - cos(a/2)) from the arc
+        step = 2*arccos(max(1 - self.tolerance/R, 0)) if R > 0 else pi
+        n = max(1, int(np.ceil(abs(span)/min(step, pi/2))))
+        angle = np.deg2rad(theta1) + linspace(0, span, n+1)
+        return np.column_stack([cx + R*cos(angle), cy + R*sin(angle)])
+
+    def halfPolyline(self):
+        """Right half of a tooth as an (n, 2) array, from the centerline at the
+        tip down to the middle of the gap between the teeth.
+        """
+        if self.halfLine is not None:
+            return self.halfLine
+
+        # walk from the tip to the root, joining each piece at its nearest end
+        pieces = [self.tessellate(prim) for prim in self.tip[::-1] + [self.involute] + self.root]
+        line = pieces[0] if pieces[0][0, 0] <= pieces[0][-1, 0] else pieces[0][::-1]
+        for piece in pieces[1:]:
+            if np.hypot(*(piece[-1] - line[-1])) < np.hypot(*(piece[0] - line[-1])):
+                piece = piece[::-1]
+            if np.hypot(*(piece[0] - line[-1])) <= 1e-9*self.Rb:
+                piece = piece[1:]
+            line = np.concatenate([line, piece])
+
+        self.halfLine = line
+        return line
+
+    def toothPolyline(self):
+        """One whole tooth, from the middle of the gap on the left to the one on the right."""
+        half = self.halfPolyline()
+        left = half[::-1]*[-1, 1]
+        return np.concatenate([left, half[1:]])
+
+    def polygon(self):
+        """Closed (n, 2) polygon of the whole gear, the first point repeated at the end."""
+        if self.gearPolygon is not None:
+            return self.gearPolygon
+
+        # the last point of each tooth is the first of the next one
+        tooth = self.toothPolyline()[:-1]
+        angle = -tau*np.arange(self.N)/self.N
+        c, s = cos(angle), sin(angle)
+        rotation = np.array([[c, -s], [s, c]]).transpose(2, 0, 1)
+        points = np.einsum('nij,mj->nmi', rotation, tooth).reshape(-1, 2)
+
+        self.gearPolygon = np.concatenate([points, points[:1]])
+        return self.gearPolygon
+
+    def teeth(self, _first, _count):
+        """Open (n, 2) polyline of _count teeth in a row, starting with tooth _first.
+
+        Tooth k is the one polygon() puts at -tau*k/N from the +y axis, and
+        the line runs clockwise from the gap before the first tooth to the
+        gap after the last.  With _count >= N it's the whole polygon().
+        """
+        if _count >= self.N:
+            return self.polygon()
+
+        tooth = self.toothPolyline()
+        angle = -tau*(_first + np.arange(_count))/self.N
+        c, s = cos(angle), sin(angle)
+        rotation = np.array([[c, -s], [s, c]]).transpose(2, 0, 1)
+        points = np.einsum('nij,mj->nmi', rotation, tooth[:-1]).reshape(-1, 2)
+
+        # finish the last tooth, the others end where the next one starts
+        return np.concatenate([points, [rotation[-1] @ tooth[-1]]])
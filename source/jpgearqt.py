@@ -12,80 +12,49 @@
 
 import sys
 import os, tempfile
+import time
 
 from PySide6.QtWidgets import QApplication, QWidget, QVBoxLayout, QLabel
 from PySide6.QtWidgets import QMenuBar, QMenu
 from PySide6.QtWidgets import QFileDialog, QDialog, QDialogButtonBox, QMessageBox
 
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QIcon, QPixmap, QShortcut, QKeySequence, QCloseEvent, QAction
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QIcon, QPixmap, QShortcut, QKeySequence, QCloseEvent, QAction, QActionGroup, QResizeEvent
 
 from ui_form import Ui_jpgearqt
 from ui_popup import Ui_Popup
 
 ###############################################################################
-from Gear import Gear
+from GearPair import GearPair
+from DesignCache import DesignCache
+from DesignHistory import DesignHistory
+from PairCatalog import PairCatalog
+from DesignStore import DesignStore
+from RedrawScheduler import RedrawScheduler
+import quality
+from involute import tau, invF
 
 import numpy as np
-from numpy import pi, sin, cos, tan, arcsin, arccos, arctan
-from numpy import rad2deg, deg2rad
-from numpy import sqrt, zeros, linspace, polyval, real
-
-from scipy.optimize import fsolve, least_squares
+from numpy import pi, sin, cos, arcsin, arctan
+from numpy import deg2rad
+from numpy import sqrt, linspace
 
 from matplotlib.figure import Figure
 import matplotlib.pyplot as pyplot
 import matplotlib.path as mpath
 import matplotlib.patches as mpatch
+import matplotlib.legend as mlegend
 import matplotlib.collections as mcollections
 import matplotlib.transforms as mtransforms
 import matplotlib.animation as manimation
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg, NavigationToolbar2QT
 
-import copy
 import json
 
 import ezdxf
 from ezdxf.math import UCS
 from ezdxf import zoom
 
-###############################################################################
-# why isn't this in numpy???
-tau = 2*pi
-
-def is_number(n):
-    try:
-        float(n)
-    except ValueError:
-        return False
-    return True
-
-# Involute Function
-def invF(angle):
-    """Computes the involute function of a given profile angle.
-
-    All angles in radians.
-    """
-
-    return tan(angle) - angle
-
-# Reverse Involute Function
-def revInvF(angle):
-    """Computes the reverse involute function, returning the profile angle.
-
-    From "The Geometry of Involute Gears" by J.R. Colbourne
-    Eqs. 2.16 - 2.17
-
-    All angles in radians.
-    """
-
-    q = angle**(2/3)
-
-    poly = [-0.00048, 0.00319, -0.00894, -0.00321, 0.32451, 1.04004, 1]
-    x = polyval(poly, q)
-
-    return arccos(1/x)
-
 ###############################################################################
 # Use this code to signal the splash screen removal.
 if "NUITKA_ONEFILE_PARENT" in os.environ:
@@ -99,45 +68,101 @@ if "NUITKA_ONEFILE_PARENT" in os.environ:
 
 ###############################################################################
 class MplCanvas(FigureCanvasQTAgg):
-    def __init__(self, parent=None, _width=5, _height=4, _dpi=100):
+    def __init__(self, parent=None, _width=5, _height=4, _dpi=100, scheduler=None):
         self.fig = Figure(figsize=(_width, _height), dpi=_dpi)
         self.axes = self.fig.add_subplot()
         super().__init__(self.fig)
 
+        # artists kept across redraws, only their data and transforms change
+        self.artists = {}
+        self.keys = {}                  # artist name : geometry it was built for
+        self.limits = None              # view limits last laid out for
+        self.laidOut = False
+
+        self.scheduler = scheduler      # throttles resizes, see RedrawScheduler
+
+        # tooth artists cut down to the view, name : (gear, angle, offset), see jpgearqt.cullTeeth()
+        self.culling = {}
+        self.settingLimits = False      # limits set by the program, not panned or zoomed
+        self.viewMoving = False         # being panned or zoomed, draw coarsely
+        # full detail again once the view stops moving
+        self.settleTimer = QTimer()
+        self.settleTimer.setSingleShot(True)
+        self.settleTimer.setInterval(200)
+
+    def resizeEvent(self, event):
+        if self.scheduler is None:
+            super().resizeEvent(event)
+            return
+        # Qt owns the event, keep a copy until it's applied
+        self.scheduler.requestResize(self, QResizeEvent(event.size(), event.oldSize()))
+
+    def applyResize(self, _event):
+        super().resizeEvent(_event)
+
 class popupWindow(QWidget):
+    """Mesh animation window, made once and reused every time it's opened.
+
+    Only the two gears are redrawn each frame, blitted over a saved
+    background of everything else.  They are turned by the time since the
+    last frame, so the speed is the slider's RPM however long frames take.
+    Closing the window stops the animation timer.
+    """
     def __init__(self, _jpgearqt):
         super().__init__()
         self.jpgearqt = _jpgearqt
         self.ui = Ui_Popup()
         self.ui.setupUi(self)
+        self.setWindowTitle("Mesh Animation")
         self.connectUI()
-        self.canvas = MplCanvas()
+        self.canvas = MplCanvas(scheduler=_jpgearqt.scheduler)
+        self.ui.vLayout_popup.insertWidget(0, self.canvas)
+        self.toolbar = NavigationToolbar2QT(self.canvas, self)
+        self.ui.hLayout_toolbarAnim.insertWidget(0, self.toolbar)
+
+        self.anim = None
+        # turned in place each frame
+        self.rotation1 = mtransforms.Affine2D()
+        self.rotation2 = mtransforms.Affine2D()
+        self.offset2 = mtransforms.Affine2D()
+        self.angle = 0                  # gear 1 rotation, radians
+        self.lastFrame = None           # perf_counter() of the last frame
 
     def connectUI(self):
         self.ui.cb_circlesAnim.checkStateChanged.connect(lambda: self.updateCircles())
         self.ui.cb_singleViewAnim.checkStateChanged.connect(lambda: self.updateAnimAxes())
 
-    def updateCircles(self):
-        if self.ui.cb_circlesAnim.isChecked():
-            circleCol1 = self.jpgearqt.addCircles(self.jpgearqt.G1, self.canvas, collection=True)
-            circleCol2 = self.jpgearqt.addCircles(self.jpgearqt.G2, self.canvas, collection=True)
-            circleCol2.set_transform(mtransforms.Affine2D().translate(self.jpgearqt.CD, 0) + self.canvas.axes.transData)
+    def closeEvent(self, event):
+        self.stopAnimation()
+        super().closeEvent(event)
 
-            circleCol1.set_label('circleCol1')
-            circleCol2.set_label('circleCol2')
+    def start(self):
+        """Lays out the current design and starts turning it."""
+        main = self.jpgearqt
+        canvas = self.canvas
 
-            self.canvas.axes.add_collection(circleCol1)
-            self.canvas.axes.add_collection(circleCol2)
+        # rebuilt only if the design changed since last time
+        teeth1 = main.toothArtist(canvas, 'teeth1', main.G1, 'b', self.rotation1)
+        teeth2 = main.toothArtist(canvas, 'teeth2', main.G2, 'r', self.rotation2)
+        teeth1.set_animated(True)
+        teeth2.set_animated(True)
 
-        else:
-            collectionList = self.canvas.axes.collections
-            for collection in collectionList:
-                if collection.get_label() == 'circleCol1' or collection.get_label() == 'circleCol2':
-                    collection.remove()
+        self.offset2.clear().translate(main.pair.CD, 0)
+        circles = (main.circleArtists(canvas, 'circles1', main.G1) +
+                   main.circleArtists(canvas, 'circles2', main.G2, self.offset2))
+        for circle in circles:
+            circle.set_visible(self.ui.cb_circlesAnim.isChecked())
 
-    def updateAnimAxes(self):
-        canvas = self.canvas
+        # sets the view and starts the animation
+        self.updateAnimAxes()
 
+    def updateCircles(self):
+        visible = self.ui.cb_circlesAnim.isChecked()
+        for circle in self.canvas.artists.get('circles1', []) + self.canvas.artists.get('circles2', []):
+            circle.set_visible(visible)
+        self.restartAnimation()
+
+    def updateAnimAxes(self):
         # tight view
         if self.ui.cb_singleViewAnim.isChecked():
             topLimit = self.jpgearqt.G1.Rp*sin(tau/self.jpgearqt.G1.N)
@@ -148,12 +173,50 @@ class popupWindow(QWidget):
         else:
             sizeBuffer = 1.1
             leftLimit = -self.jpgearqt.G1.Ro * sizeBuffer
-            rightLimit = self.jpgearqt.CD + self.jpgearqt.G2.Ro * sizeBuffer
+            rightLimit = self.jpgearqt.pair.CD + self.jpgearqt.G2.Ro * sizeBuffer
             topLimit = max(self.jpgearqt.G1.Ro, self.jpgearqt.G2.Ro) * sizeBuffer
             bottomLimit = -topLimit
 
-        canvas.axes.set_xlim(left=leftLimit, right=rightLimit)
-        canvas.axes.set_ylim(bottom=bottomLimit, top=topLimit)
+        self.jpgearqt.setupAxes(self.canvas, (leftLimit, rightLimit, bottomLimit, topLimit))
+        self.restartAnimation()
+
+    def restartAnimation(self):
+        """Starts a new animation, so the blit background is taken again from a full draw."""
+        if 'teeth1' not in self.canvas.artists:
+            return
+        self.stopAnimation()
+        self.lastFrame = None
+        # frames count forever, don't keep them
+        self.anim = manimation.FuncAnimation(self.canvas.fig, self.animFunc, init_func=self.animInit,
+                                             interval=quality.setting('frameInterval'), blit=True,
+                                             cache_frame_data=False)
+        self.canvas.draw_idle()
+
+    def stopAnimation(self):
+        if self.anim is not None:
+            self.anim.event_source.stop()
+            self.anim = None
+
+    def animInit(self):
+        return self.animFunc(None)
+
+    def animFunc(self, _frame):
+        main = self.jpgearqt
+
+        now = time.perf_counter()
+        if self.lastFrame is not None:
+            speed = float(self.ui.hSlider_Speed.value())       # RPM
+            # the mesh looks the same after every tooth
+            self.angle = (self.angle + speed/60 * tau*(now - self.lastFrame)) % (tau/main.G1.N)
+        self.lastFrame = now
+
+        ratio = main.G1.N / main.G2.N
+        angle1 = (-pi/2) - self.angle
+        angle2 = pi/2 + pi/main.G2.N - 0.5*main.pair.bkl/main.G2.Rs + ratio*self.angle
+
+        self.rotation1.clear().rotate(angle1)
+        self.rotation2.clear().rotate(angle2).translate(main.pair.CD, 0)
+        return self.canvas.artists['teeth1'], self.canvas.artists['teeth2']
 
 class jpgearqt(QWidget):
     def __init__(self, parent=None):
@@ -166,32 +229,38 @@ class jpgearqt(QWidget):
         self.good_pixmap = QPixmap(os.path.join(os.path.dirname(__file__), "resources/icon_good.png"))
         self.bad_pixmap = QPixmap(os.path.join(os.path.dirname(__file__), "resources/icon_bad.png"))
 
+        # redraws asked for in one event loop turn are run once, see RedrawScheduler.py
+        self.scheduler = RedrawScheduler()
+
         self.createMenu()
         self.connectUI()
         self.setupShortcuts()
         self.setupCanvases()
 
-        # gear objects
-        self.G1 = Gear(1)
-        self.G2 = Gear(2)
-
-        # mesh parameters
-        self.mod = -1                   # module
-        self.PA_deg = 20                # pressure angle, degrees
-        self.PA = deg2rad(self.PA_deg)  # pressure angle, radians
-        self.OPA_deg = -1               # operating pressure angle, degrees
-        self.OPA = -1                   # operating pressure angle, radians
-        self.bkl = 0                    # backlash
-        self.rtcl1 = 0                  # root clearances
-        self.rtcl2 = 0
-        self.CD = -1                    # center distance
-        self.CR = 0                     # contact ratio
-        self.speed = 1                    # pinion speed
-        self.torque = 1                 # pinion torque
+        # gear mesh engine, holds the gears and all of the geometry math
+        self.pair = GearPair()
+        # switching between designs or reopening one restores it instead of re-solving
+        self.pair.cache = DesignCache()
+        self.G1 = self.pair.G1
+        self.G2 = self.pair.G2
 
         self.savePath = ''              # for saving JSON
 
+        # precomputed standard pairs for the Layout Helper, loaded on first use
+        self.catalog = None
+        self.minCR = 1.2                # lowest contact ratio the helper suggests
+
+        # SQLite store of many designs, opened on first use
+        self.store = None
+
+        # mesh animation, made on first use
+        self.animWindow = None
+
+        # undo / redo of design edits, snapshots of the engine inputs
+        self.history = DesignHistory()
+
         self.initGearDesignFields()
+        self.recordHistory()
 
 # Setup #######################################################################
     def createMenu(self):
@@ -218,10 +287,47 @@ class jpgearqt(QWidget):
 
         menuFile.addSeparator()
 
+        # many designs and their results in one database, see DesignStore.py
+        menuStore = menuFile.addMenu('Design Store')
+
+        actStoreAdd = menuStore.addAction('Add Current Design')
+        actStoreAdd.triggered.connect(lambda: self.addToStore())
+
+        actStoreImport = menuStore.addAction('Import Folder')
+        actStoreImport.triggered.connect(lambda: self.importFolderToStore())
+
+        actStoreSimilar = menuStore.addAction('Similar Designs')
+        actStoreSimilar.triggered.connect(lambda: self.showSimilarDesigns())
+
+        menuFile.addSeparator()
+
         actExit = menuFile.addAction('Exit')
         actExit.setShortcut(QKeySequence("Ctrl+Q"))
         actExit.triggered.connect(lambda: sys.exit())
 
+        # Edit Menu
+        menuEdit = menuBar.addMenu('&Edit')
+
+        actUndo = menuEdit.addAction('Undo')
+        actUndo.setShortcut(QKeySequence("Ctrl+Z"))
+        actUndo.triggered.connect(lambda: self.restoreHistory(self.history.undo()))
+
+        actRedo = menuEdit.addAction('Redo')
+        actRedo.setShortcut(QKeySequence("Ctrl+Y"))
+        actRedo.triggered.connect(lambda: self.restoreHistory(self.history.redo()))
+
+        menuEdit.addSeparator()
+
+        # speed / accuracy of the solvers and drawings, see quality.py
+        menuQuality = menuEdit.addMenu('Quality')
+        groupQuality = QActionGroup(self)
+        for name in quality.profiles:
+            actQuality = menuQuality.addAction(name.capitalize())
+            actQuality.setCheckable(True)
+            actQuality.setChecked(name == quality.active)
+            actQuality.triggered.connect(lambda checked, name=name: self.setQuality(name))
+            groupQuality.addAction(actQuality)
+
         # Help Menu
         # menuHelp = menuBar.addMenu('&Help')
         # actHelp = menuHelp.addAction('Help Menu')
@@ -238,9 +344,7 @@ class jpgearqt(QWidget):
         self.SC_cycleTabRV.activated.connect(lambda: self.cycleTab(dir='backward'))
         # draw gears
         self.SC_drawGear = QShortcut(QKeySequence("Ctrl+D"), self)
-        self.SC_drawGear.activated.connect(lambda: self.drawGear(self.G1, _updateAxes=True))
-        self.SC_drawGear.activated.connect(lambda: self.drawGear(self.G2, _updateAxes=True))
-        self.SC_drawGear.activated.connect(lambda: self.drawMesh(_updateAxes=True))
+        self.SC_drawGear.activated.connect(lambda: self.requestDrawAll(_updateAxes=True))
 
     def connectUI(self):
         # First tab
@@ -249,94 +353,95 @@ class jpgearqt(QWidget):
 
         rb_list = self.ui.buttonGroup.buttons()
         for button in rb_list:
-            button.toggled.connect(lambda: self.drawLayout())
+            button.toggled.connect(lambda: self.requestDrawLayout())
         # use layout button
         self.ui.pb_useLayout.clicked.connect(lambda: self.useLayout())
 
         # Second tab
-        self.ui.le_mod.editingFinished.connect(lambda: self.set_mod(self.ui.le_mod.text()))
+        self.ui.le_mod.editingFinished.connect(lambda: self.applyEdit(self.pair.set_mod, self.ui.le_mod.text()))
 
-        self.ui.le_PA_deg.editingFinished.connect(lambda: self.set_PA_deg(self.ui.le_PA_deg.text()))
+        self.ui.le_PA_deg.editingFinished.connect(lambda: self.applyEdit(self.pair.set_PA_deg, self.ui.le_PA_deg.text()))
 
         self.ui.cb_CD_bkl.currentIndexChanged.connect(lambda: self.swapBklandCD())
         self.ui.le_CD_bkl.editingFinished.connect(lambda: self.updateBklandCD())
 
-        self.ui.le_N1.editingFinished.connect(lambda: self.set_N(self.G1, self.ui.le_N1.text()))
-        self.ui.le_N2.editingFinished.connect(lambda: self.set_N(self.G2, self.ui.le_N2.text()))
+        self.ui.le_N1.editingFinished.connect(lambda: self.applyEdit(self.pair.set_N, self.G1, self.ui.le_N1.text()))
+        self.ui.le_N2.editingFinished.connect(lambda: self.applyEdit(self.pair.set_N, self.G2, self.ui.le_N2.text()))
 
-        self.ui.le_x1.editingFinished.connect(lambda: self.set_x(self.G1, self.ui.le_x1.text()))
-        self.ui.le_x2.editingFinished.connect(lambda: self.set_x(self.G2, self.ui.le_x2.text()))
+        self.ui.le_x1.editingFinished.connect(lambda: self.applyEdit(self.pair.set_x, self.G1, self.ui.le_x1.text()))
+        self.ui.le_x2.editingFinished.connect(lambda: self.applyEdit(self.pair.set_x, self.G2, self.ui.le_x2.text()))
 
-        self.ui.le_Ro1.editingFinished.connect(lambda: self.set_Ro(self.G1, self.ui.le_Ro1.text()))
-        self.ui.le_Ro2.editingFinished.connect(lambda: self.set_Ro(self.G2, self.ui.le_Ro2.text()))
+        self.ui.le_Ro1.editingFinished.connect(lambda: self.applyEdit(self.pair.set_Ro, self.G1, self.ui.le_Ro1.text()))
+        self.ui.le_Ro2.editingFinished.connect(lambda: self.applyEdit(self.pair.set_Ro, self.G2, self.ui.le_Ro2.text()))
 
-        self.ui.le_Rtip1.editingFinished.connect(lambda: self.set_Rtip(self.G1, self.ui.le_Rtip1.text()))
-        self.ui.le_Rtip2.editingFinished.connect(lambda: self.set_Rtip(self.G2, self.ui.le_Rtip2.text()))
+        self.ui.le_Rtip1.editingFinished.connect(lambda: self.applyEdit(self.pair.set_Rtip, self.G1, self.ui.le_Rtip1.text()))
+        self.ui.le_Rtip2.editingFinished.connect(lambda: self.applyEdit(self.pair.set_Rtip, self.G2, self.ui.le_Rtip2.text()))
 
-        self.ui.le_rtcl1.editingFinished.connect(lambda: self.set_rtcl(self.G1, self.ui.le_rtcl1.text()))
-        self.ui.le_rtcl2.editingFinished.connect(lambda: self.set_rtcl(self.G2, self.ui.le_rtcl2.text()))
+        self.ui.le_rtcl1.editingFinished.connect(lambda: self.applyEdit(self.pair.set_rtcl, self.G1, self.ui.le_rtcl1.text()))
+        self.ui.le_rtcl2.editingFinished.connect(lambda: self.applyEdit(self.pair.set_rtcl, self.G2, self.ui.le_rtcl2.text()))
 
-        self.ui.le_Rf1.editingFinished.connect(lambda: self.set_Rf(self.G1, self.ui.le_Rf1.text()))
-        self.ui.le_Rf2.editingFinished.connect(lambda: self.set_Rf(self.G2, self.ui.le_Rf2.text()))
+        self.ui.le_Rf1.editingFinished.connect(lambda: self.applyEdit(self.pair.set_Rf, self.G1, self.ui.le_Rf1.text()))
+        self.ui.le_Rf2.editingFinished.connect(lambda: self.applyEdit(self.pair.set_Rf, self.G2, self.ui.le_Rf2.text()))
 
-        self.ui.le_FW1.editingFinished.connect(lambda: self.set_FW(self.G1, self.ui.le_FW1.text()))
-        self.ui.le_FW2.editingFinished.connect(lambda: self.set_FW(self.G2, self.ui.le_FW2.text()))
+        self.ui.le_FW1.editingFinished.connect(lambda: self.applyEdit(self.pair.set_FW, self.G1, self.ui.le_FW1.text()))
+        self.ui.le_FW2.editingFinished.connect(lambda: self.applyEdit(self.pair.set_FW, self.G2, self.ui.le_FW2.text()))
 
         # draw gear button
-        self.ui.pb_drawGear.clicked.connect(lambda: self.drawGear(self.G1, _updateAxes=True))
-        self.ui.pb_drawGear.clicked.connect(lambda: self.drawGear(self.G2, _updateAxes=True))
-        self.ui.pb_drawGear.clicked.connect(lambda: self.drawMesh(_updateAxes=True))
+        self.ui.pb_drawGear.clicked.connect(lambda: self.requestDrawAll(_updateAxes=True))
         # single tooth view checkboxes
-        self.ui.cb_singleViewG1.checkStateChanged.connect(lambda: self.drawGear(self.G1, _updateAxes=True))
-        self.ui.cb_singleViewG2.checkStateChanged.connect(lambda: self.drawGear(self.G2, _updateAxes=True))
-        self.ui.cb_singleViewMesh.checkStateChanged.connect(lambda: self.drawMesh(_updateAxes=True))
+        self.ui.cb_singleViewG1.checkStateChanged.connect(lambda: self.requestDrawGear(self.G1, _updateAxes=True))
+        self.ui.cb_singleViewG2.checkStateChanged.connect(lambda: self.requestDrawGear(self.G2, _updateAxes=True))
+        self.ui.cb_singleViewMesh.checkStateChanged.connect(lambda: self.requestDrawMesh(_updateAxes=True))
         # circles checkboxes
-        self.ui.cb_circlesG1.checkStateChanged.connect(lambda: self.drawGear(self.G1, _updateAxes=False))
-        self.ui.cb_circlesG2.checkStateChanged.connect(lambda: self.drawGear(self.G2, _updateAxes=False))
-        self.ui.cb_circlesMesh.checkStateChanged.connect(lambda: self.drawMesh(_updateAxes=False))
+        self.ui.cb_circlesG1.checkStateChanged.connect(lambda: self.requestDrawGear(self.G1, _updateAxes=False))
+        self.ui.cb_circlesG2.checkStateChanged.connect(lambda: self.requestDrawGear(self.G2, _updateAxes=False))
+        self.ui.cb_circlesMesh.checkStateChanged.connect(lambda: self.requestDrawMesh(_updateAxes=False))
         # LoC checkbox
-        self.ui.cb_LoC.checkStateChanged.connect(lambda: self.drawMesh(_updateAxes=False))
+        self.ui.cb_LoC.checkStateChanged.connect(lambda: self.requestDrawMesh(_updateAxes=False))
         # mesh slider
-        self.ui.hSlider_Mesh.valueChanged.connect(lambda: self.drawMesh(_updateAxes=False))
+        self.ui.hSlider_Mesh.valueChanged.connect(lambda: self.requestDrawMesh(_updateAxes=False))
         # animate button
         self.ui.pb_animate.clicked.connect(lambda: self.createAnimWindow())
 
         # Stress tab
-        self.ui.le_speed.editingFinished.connect(lambda: self.set_speed(self.ui.le_speed.text()))
-        self.ui.le_torque.editingFinished.connect(lambda: self.set_torque(self.ui.le_torque.text()))
-        self.ui.le_E1.editingFinished.connect(lambda: self.set_E(self.G1, self.ui.le_E1.text()))
-        self.ui.le_E2.editingFinished.connect(lambda: self.set_E(self.G2, self.ui.le_E2.text()))
-        self.ui.le_nu1.editingFinished.connect(lambda: self.set_nu(self.G1, self.ui.le_nu1.text()))
-        self.ui.le_nu2.editingFinished.connect(lambda: self.set_nu(self.G2, self.ui.le_nu2.text()))
+        self.ui.le_speed.editingFinished.connect(lambda: self.applyEdit(self.pair.set_speed, self.ui.le_speed.text()))
+        self.ui.le_torque.editingFinished.connect(lambda: self.applyEdit(self.pair.set_torque, self.ui.le_torque.text()))
+        self.ui.le_E1.editingFinished.connect(lambda: self.applyEdit(self.pair.set_E, self.G1, self.ui.le_E1.text()))
+        self.ui.le_E2.editingFinished.connect(lambda: self.applyEdit(self.pair.set_E, self.G2, self.ui.le_E2.text()))
+        self.ui.le_nu1.editingFinished.connect(lambda: self.applyEdit(self.pair.set_nu, self.G1, self.ui.le_nu1.text()))
+        self.ui.le_nu2.editingFinished.connect(lambda: self.applyEdit(self.pair.set_nu, self.G2, self.ui.le_nu2.text()))
 
         # stress button
         self.ui.pb_stress.clicked.connect(lambda: self.updateStress())
 
 
     def swapBklandCD(self):
+        self.pair.CD_bkl = self.ui.cb_CD_bkl.currentIndex()
+        self.recordHistory()
+
         # input backlash
         if self.ui.cb_CD_bkl.currentIndex() == 0:
             self.ui.lb_bkl_text.hide()
             self.ui.lb_bkl_units.hide()
             self.ui.lb_bkl_value.hide()
-            self.ui.le_CD_bkl.setText(str("{:.3f}".format(self.bkl)))
+            self.ui.le_CD_bkl.setText(str("{:.3f}".format(self.pair.bkl)))
 
             self.ui.lb_CD_text.show()
             self.ui.lb_CD_units.show()
             self.ui.lb_CD_value.show()
-            self.ui.lb_CD_value.setText(str("{:.3f}".format(self.CD)))
+            self.ui.lb_CD_value.setText(str("{:.3f}".format(self.pair.CD)))
 
         # input center distance
         elif self.ui.cb_CD_bkl.currentIndex() == 1:
             self.ui.lb_CD_text.hide()
             self.ui.lb_CD_units.hide()
             self.ui.lb_CD_value.hide()
-            self.ui.le_CD_bkl.setText(str("{:.3f}".format(self.CD)))
+            self.ui.le_CD_bkl.setText(str("{:.3f}".format(self.pair.CD)))
 
             self.ui.lb_bkl_text.show()
             self.ui.lb_bkl_units.show()
             self.ui.lb_bkl_value.show()
-            self.ui.lb_bkl_value.setText(str("{:.3f}".format(self.bkl)))
+            self.ui.lb_bkl_value.setText(str("{:.3f}".format(self.pair.bkl)))
 
     def cycleTab(self, dir='forward'):
         tabs = self.ui.tabW_main
@@ -350,23 +455,23 @@ class jpgearqt(QWidget):
 
     def setupCanvases(self):
         # layout helper tab
-        self.canvasHelper = MplCanvas(self)
+        self.canvasHelper = MplCanvas(self, scheduler=self.scheduler)
         helper_layout = QVBoxLayout(self.ui.f_helper_layout)
         helper_layout.addWidget(self.canvasHelper)
 
         # gear designer tabs
         # gear 1
-        self.canvasG1 = MplCanvas(self)
+        self.canvasG1 = MplCanvas(self, scheduler=self.scheduler)
         self.ui.vLayout_canvasG1.insertWidget(0,self.canvasG1)
         toolbarG1 = NavigationToolbar2QT(self.canvasG1, self)
         self.ui.hLayout_toolbarG1.insertWidget(0, toolbarG1)
         # gear 2
-        self.canvasG2 = MplCanvas(self)
+        self.canvasG2 = MplCanvas(self, scheduler=self.scheduler)
         self.ui.vLayout_canvasG2.insertWidget(0,self.canvasG2)
         toolbarG2 = NavigationToolbar2QT(self.canvasG2, self)
         self.ui.hLayout_toolbarG2.insertWidget(0, toolbarG2)
         # mesh
-        self.canvasMesh = MplCanvas(self)
+        self.canvasMesh = MplCanvas(self, scheduler=self.scheduler)
         self.ui.vLayout_canvasMesh.insertWidget(0,self.canvasMesh)
         toolbarMesh = NavigationToolbar2QT(self.canvasMesh, self)
         self.ui.hLayout_toolbarMesh.insertWidget(0, toolbarMesh)
@@ -375,37 +480,40 @@ class jpgearqt(QWidget):
 
         # stress
         stress_layout1 = QVBoxLayout(self.ui.tab_stress1)
-        self.canvasStress1 = MplCanvas(self)
+        self.canvasStress1 = MplCanvas(self, scheduler=self.scheduler)
         stress_layout1.addWidget(self.canvasStress1)
         toolbarStress1 = NavigationToolbar2QT(self.canvasStress1, self)
         stress_layout1.insertWidget(1, toolbarStress1)
 
         stress_layout2 = QVBoxLayout(self.ui.tab_stress2)
-        self.canvasStress2 = MplCanvas(self)
+        self.canvasStress2 = MplCanvas(self, scheduler=self.scheduler)
         stress_layout2.addWidget(self.canvasStress2)
         toolbarStress2 = NavigationToolbar2QT(self.canvasStress2, self)
         stress_layout2.insertWidget(1, toolbarStress2)
 
+        for canvas in [self.canvasG1, self.canvasG2, self.canvasMesh, self.canvasStress1, self.canvasStress2]:
+            self.watchView(canvas)
+
     def initGearDesignFields(self):
         # gear design tab
-        if self.mod > 0:
-            self.ui.le_mod.setText(str("{:.2f}".format((self.mod))))
+        if self.pair.mod > 0:
+            self.ui.le_mod.setText(str("{:.2f}".format((self.pair.mod))))
 
-        self.ui.le_PA_deg.setText(str("{:.1f}".format((self.PA_deg))))
+        self.ui.le_PA_deg.setText(str("{:.1f}".format((self.pair.PA_deg))))
 
         if self.ui.cb_CD_bkl.currentIndex() == 0:
-            self.ui.le_CD_bkl.setText(str("{:.3f}".format(self.bkl)))
+            self.ui.le_CD_bkl.setText(str("{:.3f}".format(self.pair.bkl)))
             self.ui.lb_CD_text.hide()
             self.ui.lb_CD_units.hide()
             self.ui.lb_CD_value.hide()
         else:
-            self.ui.le_CD_bkl.setText(str("{:.3f}".format(self.CD)))
+            self.ui.le_CD_bkl.setText(str("{:.3f}".format(self.pair.CD)))
             self.ui.lb_bkl_text.hide()
             self.ui.lb_bkl_units.hide()
             self.ui.lb_bkl_value.hide()
 
-        self.ui.le_rtcl1.setText(str("{:.3f}".format(self.rtcl1)))
-        self.ui.le_rtcl2.setText(str("{:.3f}".format(self.rtcl2)))
+        self.ui.le_rtcl1.setText(str("{:.3f}".format(self.pair.rtcl1)))
+        self.ui.le_rtcl2.setText(str("{:.3f}".format(self.pair.rtcl2)))
 
         if self.G1.N > 0:
             self.ui.le_N1.setText(str(self.G1.N))
@@ -444,15 +552,21 @@ class jpgearqt(QWidget):
         self.ui.le_E2.setText(str("{:.0f}".format(self.G2.E)))
         self.ui.le_nu1.setText(str("{:.2f}".format(self.G1.nu)))
         self.ui.le_nu2.setText(str("{:.2f}".format(self.G2.nu)))
-        self.ui.le_speed.setText(str("{:.0f}".format(self.speed)))
-        self.ui.le_torque.setText(str("{:.0f}".format(self.torque)))
+        self.ui.le_speed.setText(str("{:.0f}".format(self.pair.speed)))
+        self.ui.le_torque.setText(str("{:.0f}".format(self.pair.torque)))
 
     def exportDXF(self):
-        for gear in [self.G1, self.G2]:
-            if gear.Rb < 0 :
-                messageBox = QMessageBox.critical(self, "Error exporting", "Could not export geometry for gear "+str(gear.ID))
-            else:
-                self.layoutGear(gear, save=True)
+        failed = [name for name, converged in self.pair.converged.items() if not converged]
+        if failed:
+            QMessageBox.critical(self, "Error exporting", "Could not export geometry, the "+", ".join(failed)+" solve did not converge")
+            return
+
+        with self.pair.useQuality('export'):
+            for gear in [self.G1, self.G2]:
+                if gear.Rb < 0 :
+                    messageBox = QMessageBox.critical(self, "Error exporting", "Could not export geometry for gear "+str(gear.ID))
+                else:
+                    self.layoutGear(gear, save=True)
 
 
     def openJSON(self):
@@ -464,43 +578,12 @@ class jpgearqt(QWidget):
             with open(loadPath, 'r', encoding='utf-8') as f:
                 dictFull = json.load(f)
 
-            dictG1 = dictFull["Gear1"]
-            dictG2 = dictFull["Gear2"]
-            dictM = dictFull["Mesh"]
-
-            # set mesh parameters
-            self.set_mod(dictM["mod"])
-            self.set_PA_deg(dictM["PA_deg"])
-
-            if dictM["set_CD_bkl"] == 0:
-                # use backlash
-                self.ui.cb_CD_bkl.setCurrentIndex(0)
-                self.set_bkl(dictM["bkl"])
-            else:
-                # use center distance
-                self.ui.cb_CD_bkl.setCurrentIndex(1)
-                self.set_CD(dictM["CD"])
-
-            self.set_rtcl(self.G1, dictM["rtcl1"])
-            self.set_rtcl(self.G2, dictM["rtcl2"])
-
-            self.set_speed(dictM["speed"])
-            self.set_torque(dictM["torque"])
-
-            # set gear parameters
-            for gear, dict in zip([self.G1, self.G2], [dictG1, dictG2]):
-                self.set_N(gear, dict["N"])
-                self.set_x(gear, dict["x"])
-                self.set_Ro(gear, dict["Ro"])
-                self.set_Rtip(gear, dict["Rtip"])
-            # split it up so that both N's are set before Rf
-            for gear, dict in zip([self.G1, self.G2], [dictG1, dictG2]):
-                self.set_Rf(gear, dict["Rf"])
-                self.set_FW(gear, dict["FW"])
-                self.set_E(gear, dict["E"])
-                self.set_nu(gear, dict["nu"])
+            self.pair.apply_design(dictFull)
+            self.ui.cb_CD_bkl.setCurrentIndex(self.pair.CD_bkl)
 
             self.initGearDesignFields()
+            self.updateDesignFields()
+            self.recordHistory()
 
     def saveAsJSON(self):
         defaultName = 'gear_design.json'
@@ -516,38 +599,39 @@ class jpgearqt(QWidget):
         if self.savePath == '':
             self.saveAsJSON()
         else:
-            dictFull = {
-                        "Gear1" : self.createJSONGear(self.G1),
-                        "Gear2" : self.createJSONGear(self.G2),
-                        "Mesh" : self.createJSONMesh()
-                    }
+            dictFull = self.pair.createJSON()
 
             with open(_path, 'w', encoding='utf-8') as f:
                 json.dump(dictFull, f, ensure_ascii=False, indent=4)
 
-    def createJSONGear(self, _gear):
-        return {
-            "N" : _gear.N,
-            "x" : _gear.x,
-            "Ro" : _gear.Ro,
-            "Rtip" : _gear.Rtip,
-            "Rf" : _gear.Rf,
-            "FW" : _gear.FW,
-            "E" : _gear.E,
-            "nu" : _gear.nu,
-        }
-    def createJSONMesh(self):
-        return {
-            "mod" : self.mod,
-            "PA_deg" : self.PA_deg,
-            "set_CD_bkl" : self.ui.cb_CD_bkl.currentIndex(),
-            "bkl" : self.bkl,
-            "CD" : self.CD,
-            "rtcl1" : self.rtcl1,
-            "rtcl2" : self.rtcl2,
-            "speed" : self.speed,
-            "torque" : self.torque
-        }
+    def designStore(self):
+        if self.store is None:
+            self.store = DesignStore()
+        return self.store
+
+    def addToStore(self):
+        self.designStore().add(self.pair.createJSON(), name=self.savePath or None)
+
+    def importFolderToStore(self):
+        folder = QFileDialog.getExistingDirectory(self, 'Import Designs')
+
+        if folder == '':
+            return
+        else:
+            ids, skipped = self.designStore().importFolder(folder)
+            message = str(len(ids))+" designs imported"
+            if skipped:
+                message += ", could not read:\n"+"\n".join(skipped)
+            QMessageBox.information(self, "Import Designs", message)
+
+    def showSimilarDesigns(self):
+        lines = []
+        for row in self.designStore().nearest(self.pair.createJSON(), k=10):
+            lines.append("{}  N {:.0f}/{:.0f}  mod {:g}  PA {:g}  x {:g}/{:g}  CR {:.2f}".format(
+                         row['name'] or "#"+str(row['id']), row['N1'], row['N2'], row['mod'],
+                         row['PA_deg'], row['x1'], row['x2'], row['CR'] or 0))
+        QMessageBox.information(self, "Similar Designs", "\n".join(lines) if lines else "The design store is empty")
+
 # Helper Tab ##################################################################
     def findGearSizes(self):
         type = self.ui.cb_CD_width.currentIndex()
@@ -572,8 +656,7 @@ class jpgearqt(QWidget):
             matB = np.array([ [CD], [0] ])
             matX = np.matmul(np.linalg.inv(matA), matB)
 
-            N1 = round(float(matX[0, 0]))
-            N2 = round(N1*GR)
+            N1, N2 = self.nearestPair(mod, GR, CD, float(matX[0, 0]))
             # N2 = round(float(matX[1, 0]))
 
             self.ui.le_pN.setText(str("{:.0f}".format(N1)))
@@ -600,8 +683,7 @@ class jpgearqt(QWidget):
             matB = np.array([ [width - 2*mod], [0] ])
             matX = np.matmul(np.linalg.inv(matA), matB)
 
-            N1 = round(float(matX[0, 0]))
-            N2 = round(N1*GR)
+            N1, N2 = self.nearestPair(mod, GR, (width - 2*mod)/2, float(matX[0, 0]))
             # N2 = round(float(matX[1, 0]))
 
             self.ui.le_pN.setText(str("{:.0f}".format(N1)))
@@ -609,6 +691,40 @@ class jpgearqt(QWidget):
 
             self.populateChart(N2)
 
+    def pairCatalog(self):
+        """The standard pair catalog, or None if it hasn't been built, see PairCatalog."""
+        if self.catalog is None:
+            try:
+                self.catalog = PairCatalog.load()
+            except OSError:
+                self.catalog = False
+        return self.catalog or None
+
+    def nearestPair(self, _mod, _GR, _CD, _N1):
+        """Tooth counts closest to a target ratio and center distance.
+
+        _N1 is the exact solution for the pinion.  With the pair catalog,
+        every pair within 5% of the ratio and two modules of the center
+        distance that has at least the minimum contact ratio is looked up at
+        once, and the closest one is used.  Otherwise, or if no pair
+        qualifies, _N1 is rounded.
+        """
+        N1 = round(_N1)
+        N2 = round(N1*_GR)
+
+        catalog = self.pairCatalog()
+        if catalog is None or not catalog.covers(N1, N2, self.pair.PA_deg):
+            return N1, N2
+
+        pairs = catalog.query(_mod, self.pair.PA_deg, ratio=(0.95*_GR, 1.05*_GR),
+                              CD=(_CD - 2*_mod, _CD + 2*_mod), minCR=self.minCR)
+        if len(pairs['N1']) == 0:
+            return N1, N2
+
+        error = abs(pairs['ratio'] - _GR)/_GR + abs(pairs['CD'] - _CD)/_CD
+        best = np.argmin(error)
+        return int(pairs['N1'][best]), int(pairs['N2'][best])
+
     def updatePinionN(self):
         try:
             GR = float(self.ui.le_targetGR.text())
@@ -653,6 +769,25 @@ class jpgearqt(QWidget):
             else:
                 icon.setPixmap(self.bad_pixmap)
 
+        # contact ratio and undercut of the options, from the pair catalog
+        catalog = self.pairCatalog()
+        if catalog is not None and catalog.covers(N1, N2_list, self.pair.PA_deg):
+            CR = catalog.lookup('CR', N1, N2_list, mod, self.pair.PA_deg)
+            undercut1 = catalog.lookup('undercut1', N1, N2_list, mod, self.pair.PA_deg)
+            undercut2 = catalog.lookup('undercut2', N1, N2_list, mod, self.pair.PA_deg)
+            for k, icon in enumerate(icon_label_list):
+                tip = "CR {:.2f}".format(CR[k])
+                if CR[k] < self.minCR:
+                    tip += ", low contact ratio"
+                if undercut1[k]:
+                    tip += ", pinion undercut"
+                if undercut2[k]:
+                    tip += ", gear undercut"
+                icon.setToolTip(tip)
+        else:
+            for icon in icon_label_list:
+                icon.setToolTip("")
+
         GR_label_list = [
                         self.ui.lb_GR1,
                         self.ui.lb_GR2,
@@ -692,7 +827,7 @@ class jpgearqt(QWidget):
             width = Ros1 + CD + Ros2
             label.setText(str("{:.2f}".format(width)))
 
-        self.drawLayout()
+        self.requestDrawLayout()
 
     def useLayout(self):
         if self.ui.le_pN.text() == "":
@@ -720,14 +855,19 @@ class jpgearqt(QWidget):
                 N2 = int(N.text())
                 break
 
-        self.ui.le_mod.setText(self.ui.le_targetMod.text())
-        self.set_mod(self.ui.le_targetMod.text())
+        # one evaluation for the whole layout
+        with self.pair.batch():
+            self.ui.le_mod.setText(self.ui.le_targetMod.text())
+            self.pair.set_mod(self.ui.le_targetMod.text())
+
+            self.ui.le_N1.setText(self.ui.le_pN.text())
+            self.pair.set_N(self.G1, self.ui.le_pN.text())
 
-        self.ui.le_N1.setText(self.ui.le_pN.text())
-        self.set_N(self.G1, self.ui.le_pN.text())
+            self.ui.le_N2.setText(str(N2))
+            self.pair.set_N(self.G2, N2)
 
-        self.ui.le_N2.setText(str(N2))
-        self.set_N(self.G2, N2)
+        self.updateDesignFields()
+        self.recordHistory()
 
         self.ui.tabW_main.setCurrentIndex(1)
 
@@ -787,771 +927,342 @@ class jpgearqt(QWidget):
         self.canvasHelper.axes.set_aspect('equal')
         self.canvasHelper.axes.add_collection(circleCol)
 
-        self.canvasHelper.draw()
+        self.canvasHelper.draw_idle()
 
 # Gear Design Tab #############################################################
-    def set_mod(self, _mod):
-        if is_number(_mod):
-            self.mod = float(_mod)
-            self.updateStandardToothThickness(self.G1)
-            self.updateStandardToothThickness(self.G2)
-
-    def set_PA_deg(self, _PA_deg):
-        if is_number(_PA_deg):
-            self.PA_deg = float(_PA_deg)
-            self.PA = deg2rad(self.PA_deg)
-            self.updateStandardToothThickness(self.G1)
-            self.updateStandardToothThickness(self.G2)
-
-    def set_bkl(self, _bkl):
-        if is_number(_bkl):
-            self.bkl = float(_bkl)
-            self.updateCenterDistance()
-
-    def set_CD(self, _CD):
-        if is_number(_CD):
-            self.CD = float(_CD)
-            self.updateCenterDistance()
-
-    def set_N(self, _gear, _N):
-        if is_number(_N):
-            _gear.N = int(_N)
-            self.set_x(_gear, _gear.x)
-
-            if self.G1.N > 1 and self.G2.N > 1:
-                self.ui.lb_GR.setText(str("{:.3f}".format(self.G2.N / self.G1.N)))
-
-    def set_x(self, _gear, _x):
-        if is_number(_x):
-            _gear.x = float(_x)
-            self.updateStandardToothThickness(_gear)
-
-    def set_Ro(self, _gear, _Ro):
-        if _gear.Romax < 0:
+    def applyEdit(self, _setter, *_args):
+        """Passes a user edit through to the engine, then refreshes the fields."""
+        _setter(*_args)
+        self.updateDesignFields()
+        self.recordHistory()
+
+    def recordHistory(self):
+        """Adds the current design to the undo history, if it changed."""
+        self.history.push(self.pair.snapshot(self.history.current()))
+
+    def restoreHistory(self, _snapshot):
+        """Shows a design from the undo history, see DesignHistory."""
+        if _snapshot is None:
             return
 
-        if is_number(_Ro):
-            if float(_Ro) > _gear.Romax:
-                _gear.Ro = _gear.Romax
-                if _gear.ID == 1:
-                    self.ui.le_Ro1.setText(str("{:.3f}".format(self.G1.Ro)))
-                else:
-                    self.ui.le_Ro2.setText(str("{:.3f}".format(self.G2.Ro)))
-            else:
-                _gear.Ro = float(_Ro)
-            # check that Rtip is still valid, shrink if necessary
-            self.updateMaxTipRadius(_gear)
-            self.set_Rtip(_gear, _gear.Rtip)
-            self.updateCenterDistance()
-
-    def set_Rtip(self, _gear, _Rtip):
-        if is_number(_Rtip):
-            if float(_Rtip) > _gear.Rtip_max:
-                _gear.Rtip = _gear.Rtip_max
-                if _gear.ID == 1:
-                    self.ui.le_Rtip1.setText(str("{:.3f}".format(_gear.Rtip)))
-                else:
-                    self.ui.le_Rtip2.setText(str("{:.3f}".format(_gear.Rtip)))
-            else:
-                _gear.Rtip = float(_Rtip)
-
-            self.updateRoe(_gear)
-
-
-    def set_rtcl(self, _gear, _rtcl):
-        if is_number(_rtcl):
-            if _gear.ID == 1:
-                self.rtcl1 = float(_rtcl)
-                self.updateRootRadius(self.G1)
-            else:
-                self.rtcl2 = float(_rtcl)
-                self.updateRootRadius(self.G2)
-
-    def set_Rf(self, _gear, _Rf):
-        if is_number(_Rf):
-            if float(_Rf) > _gear.Rff:
-                _gear.Rf = _gear.Rff
-                if _gear.ID == 1:
-                    self.ui.le_Rf1.setText(str("{:.3f}".format(_gear.Rf)))
-                else:
-                    self.ui.le_Rf2.setText(str("{:.3f}".format(_gear.Rf)))
-            else:
-                _gear.Rf = float(_Rf)
-
-            self.checkUndercut(_gear)
-
-    def set_FW(self, _gear, _FW):
-        if is_number(_FW):
-            _gear.FW = float(_FW)
+        self.pair.restoreSnapshot(_snapshot)
+        self.ui.cb_CD_bkl.setCurrentIndex(self.pair.CD_bkl)
 
+        self.initGearDesignFields()
+        self.updateDesignFields()
 
     def updateBklandCD(self):
         # backlash
         if self.ui.cb_CD_bkl.currentIndex() == 0:
-            self.set_bkl(float(self.ui.le_CD_bkl.text()))
+            self.applyEdit(self.pair.set_bkl, self.ui.le_CD_bkl.text())
         # center distance
         elif self.ui.cb_CD_bkl.currentIndex() == 1:
-            self.set_CD(float(self.ui.le_CD_bkl.text()))
-
-    def updateStandardToothThickness(self, _gear):
-        if self.mod > 0 and self.PA > 0:
-            # GOIG 6.11
-            _gear.tts = self.mod * (pi/2 + 2*_gear.x*tan(self.PA))
-            if _gear.ID == 1:
-                self.ui.lb_tts1.setText(str("{:.3f}".format(self.G1.tts)))
-            else:
-                self.ui.lb_tts2.setText(str("{:.3f}".format(self.G2.tts)))
+            self.applyEdit(self.pair.set_CD, self.ui.le_CD_bkl.text())
 
-            self.updateBaseAndPitch(_gear)
+    def updateDesignFields(self):
+        """Copies the engine results into the Gear Designer fields."""
+        pair = self.pair
 
-    def updateBaseAndPitch(self, _gear):
-        if _gear.N > 0 and self.mod > 0:
-            _gear.Rs = 0.5 * _gear.N * self.mod
-            _gear.Rb = _gear.Rs * cos(self.PA)
-            _gear.Pb = tau * _gear.Rb / _gear.N
-            _gear.Ros = (self.mod * (_gear.N+2) / 2)
+        def fmt(_value):
+            return str("{:.3f}".format(_value))
 
-            self.updateRomax(_gear)
-            if _gear.Ro < _gear.Rp:
-                self.set_Ro(_gear, _gear.Ros)
-            else:
-                self.set_Ro(_gear, _gear.Ro)
-
-            self.calcStandardRtcl()
+        for gear in [self.G1, self.G2]:
+            ID = str(gear.ID)
+
+            if pair.mod > 0 and pair.PA > 0:
+                getattr(self.ui, 'lb_tts'+ID).setText(fmt(gear.tts))
+
+            if gear.Rs > 0:
+                getattr(self.ui, 'lb_Rs'+ID).setText(fmt(gear.Rs))
+                getattr(self.ui, 'lb_Ros'+ID).setText(fmt(gear.Ros))
+                getattr(self.ui, 'lb_Romax'+ID).setText(fmt(gear.Romax))
+                getattr(self.ui, 'le_Ro'+ID).setText(fmt(gear.Ro))
+                getattr(self.ui, 'lb_Roe'+ID).setText(fmt(gear.Roe))
+                getattr(self.ui, 'lb_Rtipmax'+ID).setText(fmt(gear.Rtip_max))
+
+            getattr(self.ui, 'le_Rtip'+ID).setText(fmt(gear.Rtip))
+            getattr(self.ui, 'le_Rf'+ID).setText(fmt(gear.Rf))
+
+            if self.G1.Rs > 0 and self.G2.Rs > 0:
+                getattr(self.ui, 'lb_Rp'+ID).setText(fmt(gear.Rp))
+                getattr(self.ui, 'lb_tt'+ID).setText(fmt(gear.tt))
+                getattr(self.ui, 'lb_Rrs'+ID).setText(fmt(gear.Rrs))
+
+            if gear.Rr > 0:
+                getattr(self.ui, 'lb_Rr'+ID).setText(fmt(gear.Rr))
+                getattr(self.ui, 'lb_Rff'+ID).setText(fmt(gear.Rff))
+                if gear.undercut == True:
+                    getattr(self.ui, 'lb_undercut'+ID).setText("<font color=\"Red\">Undercut</font>")
+                else:
+                    getattr(self.ui, 'lb_undercut'+ID).setText("")
 
-            if _gear.ID == 1:
-                self.ui.lb_Rs1.setText(str("{:.3f}".format(self.G1.Rs)))
-                self.ui.le_Ro1.setText(str("{:.3f}".format(self.G1.Ro)))
-                self.ui.lb_Ros1.setText(str("{:.3f}".format(self.G1.Ros)))
-            else:
-                self.ui.lb_Rs2.setText(str("{:.3f}".format(self.G2.Rs)))
-                self.ui.le_Ro2.setText(str("{:.3f}".format(self.G2.Ro)))
-                self.ui.lb_Ros2.setText(str("{:.3f}".format(self.G2.Ros)))
-
-    def updateRomax(self, _gear):
-        if _gear.Rs > 0:
-            # max OD is when theta_A is 0, i.e. the involute hits the tooth centerline
-            # theta_A = (gear.tts / (2*gear.Rs)) + invF(gear.PA) - invF(phi_A)
-            # 0 = (gear.tts / (2*gear.Rs)) + invF(gear.PA) - invF(phi_A)
-            # invF(phi_A) = (gear.tts / (2*gear.Rs)) + invF(gear.PA)
-            phi_A = revInvF((_gear.tts / (2*_gear.Rs)) + invF(self.PA))
-            _gear.Romax = _gear.Rb / cos(phi_A)
-
-            if _gear.ID == 1:
-                self.ui.le_Ro1.setText(str("{:.3f}".format(self.G1.Ro)))
-                self.ui.lb_Romax1.setText(str("{:.3f}".format(self.G1.Romax)))
-            else:
-                self.ui.le_Ro2.setText(str("{:.3f}".format(self.G2.Ro)))
-                self.ui.lb_Romax2.setText(str("{:.3f}".format(self.G2.Romax)))
+        self.ui.le_rtcl1.setText(fmt(pair.rtcl1))
+        self.ui.le_rtcl2.setText(fmt(pair.rtcl2))
 
-    def updateRoe(self, _gear):
-        if _gear.Rb < 0:
-            return
+        if self.G1.N > 1 and self.G2.N > 1:
+            self.ui.lb_GR.setText(fmt(self.G2.N / self.G1.N))
 
-        if _gear.Ro < 0 and _gear.Ros > 0:
-            _gear.Ro = _gear.Ros
-            if _gear.ID == 1:
-                self.ui.le_Ro1.setText(str("{:.3f}".format(_gear.Ro)))
+        if self.G1.Rs > 0 and self.G2.Rs > 0:
+            if pair.CD_bkl == 0:
+                self.ui.lb_CD_value.setText(fmt(pair.CD))
             else:
-                self.ui.le_Ro2.setText(str("{:.3f}".format(_gear.Ro)))
+                self.ui.lb_bkl_value.setText(fmt(pair.bkl))
+            self.ui.lb_CR.setText(fmt(pair.CR))
 
-        _gear.Roe = sqrt( _gear.Rb**2 + ( sqrt((_gear.Ro-_gear.Rtip)**2 - _gear.Rb**2) + _gear.Rtip )**2 )
+        self.updateQualityTitle()
 
-        if _gear.ID == 1:
-            self.ui.lb_Roe1.setText(str("{:.3f}".format(_gear.Roe)))
-        else:
-            self.ui.lb_Roe2.setText(str("{:.3f}".format(_gear.Roe)))
+    def setQuality(self, _name):
+        """Switches the quality profile, re-evaluating the design at its tolerances."""
+        self.pair.set_quality(_name)
+        self.updateDesignFields()
 
-        self.updateContactRatio()
+    def updateQualityTitle(self):
+        """Shows the active quality profile and its estimated error in the title bar."""
+        error = max(self.pair.estimatedError().values())
+        self.setWindowTitle("jpGear - "+quality.active+" quality, est. error "+str("{:.1g}".format(error))+" mm")
 
+# Drawing #####################################################################
+    def layoutGear(self, _gear, save=False, fill=False):
+        """Outline of a whole gear as one PathPatch, or saved as a DXF file with save=True.
 
-    def updateMaxTipRadius(self, _gear):
-        """
-        ##########################################
-        A : point on involute where fillet starts
-        E : tangent point on base circle, determined by A and phi_A
-        C : center point of gear
-        F : center point of fillet
-
-        ##########################################
-        # angle between A and tooth centerline
-        theta_A = (tts/(2*Rs)) + invF(PA) - invF(phi_A)
-
-        # angle between line CE and tooth centerline
-        alpha = phi_A - theta_A
-
-        # length of line from E to A
-        EA = Rb*tan(phi_A)
-
-        # length of line from E to F
-        EF = Rb*tan(alpha)
-
-        # the tip fillet radius is the difference between EA and EF
-        RTip1 = EA - EF
-        Rtip = Rb*tan(phi_A) - Rb*tan(alpha)
-        Rtip = Rb*tan(phi_A) - Rb*tan(phi_A - theta_A)
-        Rtip = Rb*tan(phi_A) - Rb*tan(phi_A - (tts/(2*Rs)) - invF(PA) + invF(phi_A))
-
-        # length of line from C to F
-        CF = Rb / cos(alpha)
-
-        # the tip fillet radius is the difference between Ro and CF
-        Rtip2 = Ro - CF
-        Rtip2 = Ro - (Rb / cos(alpha))
-        Rtip2 = Ro - (Rb / cos(phi_A - theta_A))
-        Rtip2 = Ro - (Rb / cos(phi_A - (tts/(2*Rs)) - invF(PA) + invF(phi_A)))
-
+        The teeth are rotated copies of one tooth's vertices, made in one
+        array operation by ToothProfile.polygon(), so drawing cost goes with
+        the number of vertices and not with the number of teeth.
         """
+        G = _gear
 
-        if _gear.N <= 1:
-            return
-
-        Ro = _gear.Ro
-        Rb = _gear.Rb
-        Rs = _gear.Rs
-        tts = _gear.tts
-        PA = self.PA
-
-        def RTip1(phi_A):
-            return Rb*tan(phi_A) - Rb*tan(phi_A - (tts/(2*Rs)) - invF(PA) + invF(phi_A))
-
-        def RTip2(phi_A):
-             return Ro - (Rb / (cos(phi_A - (tts/(2*Rs)) - invF(PA) + invF(phi_A))))
-
-        # RTip1 and RTip2 are equal, so this should be zero
-        def func(phi_A):
-            return RTip1(phi_A) - RTip2(phi_A)
-
-        # initial guess is at standard pitch radius
-        initialGuess = arccos(Rb/Rs)
-        phi_A_solved = least_squares(func, x0=initialGuess).x.item()
-        _gear.Rtip_max = float(RTip1(phi_A_solved))
-        if _gear.ID == 1:
-            self.ui.lb_Rtipmax1.setText(str("{:.3f}".format(self.G1.Rtip_max)))
-        else:
-            self.ui.lb_Rtipmax2.setText(str("{:.3f}".format(self.G2.Rtip_max)))
-
-
-    def calcStandardRtcl(self):
-        if self.G1.Ros < 0 or self.G2.Ros < 0:
+        if G.N < 1:
             return
 
-        addendum1 = self.G1.Ros - self.G1.Rp
-        addendum2 = self.G2.Ros - self.G2.Rp
-
-        rtcl1 = 0.25 * addendum2
-        rtcl2 = 0.25 * addendum1
+        curveColor = 'b'
+        curveWidth = 2
+        fillColor = 'lightsteelblue'
 
-        self.set_rtcl(self.G1, rtcl1)
-        self.set_rtcl(self.G2, rtcl2)
+        # one tooth, centered on the y axis
+        profile = self.pair.toothProfile(G)
+        primitives = profile.primitives()
 
-        self.ui.le_rtcl1.setText(str("{:.3f}".format(self.rtcl1)))
-        self.ui.le_rtcl2.setText(str("{:.3f}".format(self.rtcl2)))
+        if save == True:
+            if G.ID == 1:
+                defaultName = 'gear1.dxf'
+            else:
+                defaultName = 'gear2.dxf'
 
-        self.G1.Rrs = self.G1.Rp - addendum2 - self.rtcl1
-        self.G2.Rrs = self.G2.Rp - addendum1 - self.rtcl2
+            savePath, selectedFilter = QFileDialog.getSaveFileName(self, 'Save Gear'+str(G.ID), defaultName)
 
-        self.ui.lb_Rrs1.setText(str("{:.3f}".format(self.G1.Rrs)))
-        self.ui.lb_Rrs2.setText(str("{:.3f}".format(self.G2.Rrs)))
+            if savePath == '':
+                return
 
-    def updateMaxRootFillet(self, _gear):
-        if _gear.N < 0 or _gear.Rr < 0:
-            return
+            doc = ezdxf.new()
+            msp = doc.modelspace()
 
-        ###########################################################################
-        #   Calculate fillet radius. This function computes two separate distances:
-        #   1.) the distance from the fillet center to the involute curve, and
-        #   2.) the distance from the fillet center to the root circle
-        #   The function then finds the condition where these two distances are the
-        #   same.
+            for n in range(G.N):
+                    angle = (n/G.N)*tau
+                    ucs = UCS(origin=(0,0,0)).rotate_local_z(angle)
 
-        N = _gear.N
-        tts = _gear.tts
-        Rs = _gear.Rs
-        Rb = _gear.Rb
-        Rr = _gear.Rr
-        PA = self.PA
-
-        # phi_A - profile angle at some point A on the involute
-        # theta_A - angle between tooth centerline and some point A on the involute
-        # phi_F - profile angle between fillet centerline and Rb, where a line tangent to
-        #   the base circle goes through some point A on the involute
-        # Rf_1 - distance between fillet centerline and some point A on the
-        #   involute, along a line tangent to the base circle
-        # Rf_2 - distance between the fillet center and the root circle
-        # JFI - junction of fillet and involute
-        ###########################################################################
-
-        # angle between tooth centerline and involute at base circle (phi_A = 0)
-        theta_A = tts/(2*Rs) + invF(PA)
-        # angle between involute at base circle and center of tooth gap
-        alpha = pi/N - theta_A
-        # full fillet radius assuming the JFI is on the base circle
-        Rfu = Rb * tan(alpha)
-        Rrmin = Rb - Rfu
-
-        # Undercut
-        if Rr < Rrmin:
-            _gear.Rff = -(Rr*sin(alpha))/(sin(alpha) - 1)
-        else:
-            # angle between tooth centerline and fillet centerline = pi/N
-            # phi_F = pi/N - theta_A + phi_A
-            # where: theta_A = tts/(2*Rs) + invF(PA) - invF(phi_A)
-            # where: invF(phi_A) = tan(phi_A) - phi_A
-            # => phi_F = pi/N - (tts/(2*Rs) + invF(PA) - (tan(phi_A) - phi_A)) + phi_A
-            def phi_F(phi_A):
-                  return pi/N - tts/(2*Rs) - invF(PA) + tan(phi_A)
-
-            def Rf1(phi_A):
-                  return Rb*(tan(phi_F(phi_A)) - tan(phi_A))
-
-            def Rf2(phi_A):
-                return Rb/cos(phi_F(phi_A)) - Rr
-
-            # Rf1 and Rf2 are equal, so this should be zero
-            def func(phi_A):
-                return Rf1(phi_A) - Rf2(phi_A)
-
-            # initial guess is at standard pitch radius
-            initialGuess = arccos(Rb/Rs)
-            phi_JFI = least_squares(func, x0=initialGuess).x.item()
-
-            # _gear.phi_JFI = phi_JFI
-            newRff = Rf1(phi_JFI)
-            if newRff < 0:
-                _gear.Rff = 0
-            else:
-                _gear.Rff = newRff
+                    for prim in primitives:
+                            if prim[0] == 'line' and len(prim[1]) == 2:
+                                    msp.add_line(*zip(*prim[1:])).transform(ucs.matrix)
+                            elif prim[0] == 'line':
+                                    msp.add_lwpolyline(list(zip(*prim[1:]))).transform(ucs.matrix)
+                            else:
+                                    kind, center, R, theta1, theta2 = prim
+                                    msp.add_arc(center, radius=R, start_angle=theta1, end_angle=theta2).transform(ucs.matrix)
 
-        if _gear.Rf > _gear.Rff:
-            self.set_Rf(_gear, _gear.Rff)
+            zoom.extents(msp)
+            doc.saveas(str(savePath))
 
-        # update UI
-        if _gear.ID == 1:
-            self.ui.le_Rf1.setText(str("{:.3f}".format(_gear.Rf)))
-            self.ui.lb_Rff1.setText(str("{:.3f}".format(_gear.Rff)))
+        # save == False
         else:
-            self.ui.le_Rf2.setText(str("{:.3f}".format(_gear.Rf)))
-            self.ui.lb_Rff2.setText(str("{:.3f}".format(_gear.Rff)))
+            path = mpath.Path(profile.polygon(), closed=True)
+            return mpatch.PathPatch(path, edgecolor=curveColor, facecolor=fillColor, linewidth=curveWidth, fill=fill)
 
-    def updateCenterDistance(self):
-        if self.G1.Rs < 0 or self.G2.Rs < 0:
-            return
+    # UI signals ask for redraws through these, so a canvas is drawn once per event loop turn
+    def requestDrawGear(self, _gear, _updateAxes=False):
+        canvas = self.canvasG1 if _gear.ID == 1 else self.canvasG2
+        self.scheduler.request(canvas, lambda updateAxes: self.drawGear(_gear, updateAxes), _updateAxes)
 
-        Rp1, Rp2, tt1, tt2 = self.updatePitchRadius()
-        # update pitch radius
-        self.G1.Rp = Rp1.item()
-        self.G2.Rp = Rp2.item()
-        # update tooth thickness at new pitch radius
-        self.G1.tt = tt1.item()
-        self.G2.tt = tt2.item()
+    def requestDrawMesh(self, _updateAxes=False):
+        self.scheduler.request(self.canvasMesh, self.drawMesh, _updateAxes)
 
-        self.ui.lb_Rp1.setText(str("{:.3f}".format(self.G1.Rp)))
-        self.ui.lb_Rp2.setText(str("{:.3f}".format(self.G2.Rp)))
-        self.ui.lb_tt1.setText(str("{:.3f}".format(self.G1.tt)))
-        self.ui.lb_tt2.setText(str("{:.3f}".format(self.G2.tt)))
+    def requestDrawAll(self, _updateAxes=False):
+        self.requestDrawGear(self.G1, _updateAxes)
+        self.requestDrawGear(self.G2, _updateAxes)
+        self.requestDrawMesh(_updateAxes)
 
-        if self.ui.cb_CD_bkl.currentIndex() == 0:
-            # update center distance
-            self.CD = self.G1.Rp + self.G2.Rp
-            self.ui.lb_CD_value.setText(str("{:.3f}".format(self.CD)))
-        elif self.ui.cb_CD_bkl.currentIndex() == 1:
-            # update backlash
-            self.bkl = (tau*self.G1.Rp)/self.G1.N - self.G1.tt - self.G2.tt
-            self.ui.lb_bkl_value.setText(str("{:.3f}".format(self.bkl)))
-
-        # Operating pressure angle at updated center distance
-        self.OPA = arccos((self.G1.Rb+self.G2.Rb) / self.CD)
-        self.OPA_deg = rad2deg(self.OPA)
-
-        self.updateContactRatio()
-        self.updateRootRadius(self.G1)
-        self.updateRootRadius(self.G2)
-
-    def updatePitchRadius(self):
-        """Finds pitch radius and effective tooth thickness"""
-        N1 = self.G1.N
-        N2 = self.G2.N
-        # Precalculate involute function at standard pitch / PA
-        invS = invF(self.PA)
-        # Standard pitch radius
-        Rs1 = self.G1.Rs
-        Rs2 = self.G2.Rs
-        # Base circle radius
-        Rb1 = self.G1.Rb
-        Rb2 = self.G2.Rb
-        # Standard tooth thickness with profile shift
-        mod = self.mod
-        tts1 = self.G1.tts
-        tts2 = self.G2.tts
-        bkl = self.bkl
-        CD = self.CD
-
-        def func(x):
-            # variables for function: Rp1, Rp2, tt1, tt2
-            F = zeros(4)
-
-            # pitch circle is determined by mod and number of teeth => mod = Rp/N
-            # both pinion and gear must have same mod, so Rp1/N1 = Rp2/N2
-            # => N2*Rp1 - N1*Rp2 = 0
-            F[0] = N2*x[0] - N1*x[1]
-            # calculate tooth thickness at new pitch radius
-            # tt = Rp*( (tts/Rs) + 2*(invF(PA) - invF(acos(Rb/Rp)) ) )
-            # => Rp*( (tts/Rs) + 2*(invF(PA) - invF(acos(Rb/Rp)) ) ) - tt = 0
-            F[1] = x[0]*( (tts1/Rs1) + 2*(invS - invF(arccos(Rb1/x[0])) ) ) - x[2]
-            F[2] = x[1]*( (tts2/Rs2) + 2*(invS - invF(arccos(Rb2/x[1])) ) ) - x[3]
-
-            # use backlash
-            if self.ui.cb_CD_bkl.currentIndex() == 0:
-                # circular pitch is sum of each tooth thickness and backlash
-                # (tau*Rp1)/N1 = tt1 + tt2 + bkl [equivalently, (tau*Rp2)/N2 = tt1 + tt2 + bkl]
-                # => (tau*Rp1)/N1 - tt1 - tt2 - bkl = 0
-                F[3] = (tau*x[0])/N1 - x[2] - x[3] - bkl
-            # use center distance
-            elif self.ui.cb_CD_bkl.currentIndex() == 1:
-                # CD = Rp1 + Rp2
-                # => Rp1 + Rp2 - CD = 0
-                F[3] = x[0] + x[1] - CD
-
-            return F
-
-        #   For initial guess, use standard values
-        initialGuess = [Rs1, Rs2, tts1, tts2]
-        root = least_squares(func, x0=initialGuess).x
-
-        return root
-
-    def updateContactRatio(self):
-        if self.G1.Rs < 0 or self.G2.Rs < 0:
-            return
+    def requestDrawLayout(self):
+        self.scheduler.request(self.canvasHelper, lambda updateAxes: self.drawLayout())
 
-        # AGMA-908 Parameters
-        # max line action, Rb to Rb
-        self.C6 = self.CD * sin(self.OPA)
-        # start of line of contact, when G2 is at Roe
-        self.C1 = self.C6 - sqrt(self.G2.Roe**2 - self.G2.Rb**2)
-        # end of line of contact, when G1 is at Roe
-        self.C5 = sqrt(self.G1.Roe**2 - self.G1.Rb**2)
-        # point where line of contact intersects center line
-        self.C3 = (self.G1.N/(self.G1.N+self.G2.N)) * self.C6
-        # lowest point of single tooth contact for G1
-        self.C2 = self.C5 - self.G1.Pb
-        # highest point of single tooth contact for G1
-        self.C4 = self.C1 + self.G1.Pb
-
-        # Line of contact
-        self.LoC = self.C5 - self.C1;
-
-        # Contact ratio
-        self.CR = self.LoC / self.G1.Pb;
-        self.ui.lb_CR.setText(str("{:.3f}".format(self.CR)))
-
-        # Highest point of single tooth contact
-        self.G1.Rhp = sqrt(self.G1.Rb**2 + self.C4**2);
-        self.G2.Rhp = sqrt(self.G2.Rb**2 + (self.C6-self.C2)**2);
-
-
-    def updateRootRadius(self, _gear):
-        if self.CD < 0:
-            return
+    def geometryKey(self):
+        """What the drawn geometry depends on: the design inputs and the chord tolerance."""
+        return (self.pair.snapshot(), quality.setting('chordTolerance'))
 
-        if _gear.ID == 1:
-            self.G1.Rr = self.CD - self.G2.Ro - self.rtcl1
-            self.ui.lb_Rr1.setText(str("{:.3f}".format(_gear.Rr)))
-        else:
-            self.G2.Rr = self.CD - self.G1.Ro - self.rtcl2
-            self.ui.lb_Rr2.setText(str("{:.3f}".format(_gear.Rr)))
+    def setupAxes(self, _canvas, _limits=None):
+        """Sets the view limits, laying out the figure again only when they changed.
 
-        self.updateMaxRootFillet(_gear)
-        self.checkUndercut(_gear)
+        The aspect is set once, the first time a canvas is drawn.
+        """
+        if not _canvas.laidOut:
+            _canvas.axes.set_aspect('equal')
+            _canvas.axes.set_box_aspect(1)
+            _canvas.fig.tight_layout()
+            _canvas.laidOut = True
 
-    def checkUndercut(self, _gear):
-        if _gear.Rr < 0:
+        if _limits is None or _limits == _canvas.limits:
             return
 
-        # get correct ui element
-        if _gear.ID == 1:
-            label = self.ui.lb_undercut1
-        else:
-            label = self.ui.lb_undercut2
-
-        # distance from the gear center to the center point of the root fillet,
-        # assuming the JFI is on the base circle
-        # this forms a right triangle with Rb and Rf
-        CF = sqrt(_gear.Rb**2 + _gear.Rf**2)
-        # CF sets the minimum Rr for a given Rf
-        Rrmin = CF - _gear.Rf
-
-        # Undercut check
-        if _gear.Rr < Rrmin:
-            _gear.undercut = True
-            label.setText("<font color=\"Red\">Undercut</font>")
-        else:
-            _gear.undercut = False
-            label.setText("")
+        leftLimit, rightLimit, bottomLimit, topLimit = _limits
+        _canvas.settingLimits = True
+        _canvas.axes.set_xlim(left=leftLimit, right=rightLimit)
+        _canvas.axes.set_ylim(bottom=bottomLimit, top=topLimit)
+        _canvas.settingLimits = False
+        _canvas.fig.tight_layout()
+        _canvas.limits = _limits
 
+    def toothArtist(self, _canvas, _name, _gear, _color='b', _transform=None):
+        """Tooth outlines of a gear kept on a canvas, rebuilt only when the geometry changed.
 
-        self.updateJFI(_gear)
+        _transform goes in front of the data transform, and is usually an
+        Affine2D that the caller rotates in place.
+        """
+        key = self.geometryKey()
+        artist = _canvas.artists.get(_name)
+        if artist is not None and _canvas.keys.get(_name) == key:
+            return artist
+
+        if artist is not None:
+            artist.remove()
+        artist = self.layoutGear(_gear)
+        artist.set_edgecolor(_color)
+        if _transform is not None:
+            artist.set_transform(_transform + _canvas.axes.transData)
+        _canvas.axes.add_patch(artist)
+
+        _canvas.artists[_name] = artist
+        _canvas.keys[_name] = key
+        return artist
+
+    def teethInView(self, _limits, _gear, _angle=0, _offset=0):
+        """First tooth and number of teeth of a gear that can be in a view.
+
+        The gear is drawn turned by _angle and then moved _offset along x, so
+        tooth k is centered at pi/2 - tau*k/N + _angle.  Returns (0, N) when
+        the center of the gear is in view, and (0, 0) when the view misses
+        the ring between the root and outer circles.
+        """
+        x0, x1, y0, y1 = _limits
+        xMin, xMax = sorted([x0 - _offset, x1 - _offset])
+        yMin, yMax = sorted([y0, y1])
+        N = _gear.N
 
-    def updateJFI(self, _gear):
-        if _gear.Rr < 0:
+        # closest and farthest points of the view from the center
+        xs = np.array([xMin, xMax, xMax, xMin])
+        ys = np.array([yMin, yMin, yMax, yMax])
+        near = sqrt(np.clip(0, xMin, xMax)**2 + np.clip(0, yMin, yMax)**2)
+        far = sqrt(xs**2 + ys**2).max()
+        if near > _gear.Ro or far < _gear.Rr:
+            return 0, 0
+        if near == 0:
+            return 0, N
+
+        # with the center outside the view, the corners span less than pi
+        angles = np.arctan2(ys, xs) - _angle
+        spread = (angles - angles[0] + pi) % tau - pi
+        low = angles[0] + spread.min()
+        high = angles[0] + spread.max()
+
+        # teeth centered within a pitch of the span
+        pitch = tau/N
+        first = int(np.floor((pi/2 - high - pitch)/pitch))
+        last = int(np.ceil((pi/2 - low + pitch)/pitch))
+        count = last - first + 1
+        if count >= N:
+            return 0, N
+        return first % N, count
+
+    def cullTeeth(self, _canvas, _name, _gear, _angle=0, _offset=0):
+        """Cuts a tooth artist down to the teeth in view, tessellated for the pixel size.
+
+        _angle and _offset are the turn and then x move the artist is drawn
+        with.  The chord tolerance is about half a pixel, rounded down to a
+        power of two so only a few ToothProfiles are ever made and no finer
+        than the export profile, and 8x coarser while the view is moving.
+        The path is only rebuilt when the teeth in view or the tolerance
+        change.
+        """
+        artist = _canvas.artists.get(_name)
+        if artist is None:
             return
+        _canvas.culling[_name] = (_gear, _angle, _offset)
 
-        if _gear.undercut == True:
-            _gear.phi_JFI = 0
-
-            theta_A = (_gear.tts/(2*_gear.Rs)) + invF(self.PA)
-            # angle between JFI and center of fillet circle
-            alpha_F = arcsin(_gear.Rf / (_gear.Rr + _gear.Rf))
-            _gear.theta_F = theta_A + alpha_F
-        else:
-            # profile angle through center of fillet circle
-            phi_F = arccos(_gear.Rb / (_gear.Rr + _gear.Rf))
-            # line tangent to base circle through fillet center point
-            EF = sqrt((_gear.Rr+_gear.Rf)**2 - _gear.Rb**2)
-            # line tangent to base circle to involute
-            EA = EF - _gear.Rf
-            # profile angle at JFI
-            phi_A = arctan(EA / _gear.Rb)
-            theta_A = (_gear.tts/(2*_gear.Rs)) + invF(self.PA) - invF(phi_A)
-            theta_F = phi_F - phi_A + theta_A
-
-            _gear.phi_JFI = phi_A
-            _gear.theta_F = theta_F
+        axes = _canvas.axes
+        (x0, x1), (y0, y1) = axes.get_xlim(), axes.get_ylim()
+        pixel = max(abs(x1 - x0)/max(axes.bbox.width, 1), abs(y1 - y0)/max(axes.bbox.height, 1))
+        tolerance = max(2.0**np.floor(np.log2(max(pixel, 1e-300)/2)), quality.profiles['export']['chordTolerance'])
+        if _canvas.viewMoving:
+            tolerance *= 8
 
+        first, count = self.teethInView((x0, x1, y0, y1), _gear, _angle, _offset)
 
-# Drawing #####################################################################
-    def layoutGear(self, _gear, save=False):
-        G = _gear
-
-        if G.N < 1:
+        key = (self.geometryKey(), first, count, tolerance)
+        if _canvas.keys.get(_name+'View') == key:
             return
+        _canvas.keys[_name+'View'] = key
 
-        curveList = []
-        curveColor = 'b'
-        curveWidth = 2
-
-        # Involute
-        # find staring point of involute
-        Rjfi = G.Rb/(cos(G.phi_JFI))
-        theta_JFI = G.tts/(2*G.Rs) + invF(self.PA) - invF(G.phi_JFI)
-        Rjfi_x = Rjfi*sin(theta_JFI)
-        Rjfi_y = Rjfi*cos(theta_JFI)
-        # create vectors of points along the involute
-        RA = linspace(Rjfi, G.Roe, 20)
-        phi_A = arccos(G.Rb/RA)
-        theta_A = (G.tts/(2*G.Rs)) + invF(self.PA) - invF(phi_A)
-        RAx = RA*sin(theta_A)
-        RAy = RA*cos(theta_A)
-        # add right side
-        invPath = mpath.Path( list(map(list, zip(*[RAx, RAy]))) )
-        invPatch = mpatch.PathPatch(invPath, color=curveColor, linewidth=curveWidth, fill=False)
-        curveList.append(invPatch)
-        # add left side
-        invPath = mpath.Path( list(map(list, zip(*[-RAx, RAy]))) )
-        invPatch = mpatch.PathPatch(invPath, color=curveColor, linewidth=curveWidth, fill=False)
-        curveList.append(invPatch)
-
-        # Root fillet radius
-        if G.Rf > 0:
-            # find center of fillet circle
-            Fx = (G.Rr + G.Rf)*sin(G.theta_F)
-            Fy = (G.Rr + G.Rf)*cos(G.theta_F)
-            # find arc angles
-            filletStartAngle = 180 + rad2deg(G.phi_JFI - theta_JFI);
-            filletEndAngle = 360 - 90 - rad2deg(G.theta_F);
-            curveList.append(mpatch.Arc(
-                                        (Fx,Fy),
-                                        G.Rf*2, G.Rf*2,
-                                        theta1=filletStartAngle, theta2=filletEndAngle,
-                                        color=curveColor,
-                                        linewidth=curveWidth
-                                        )
-                            )
-            curveList.append(mpatch.Arc(
-                                        (-Fx,Fy),
-                                        G.Rf*2, G.Rf*2,
-                                        theta1=180-filletEndAngle, theta2=180-filletStartAngle,
-                                        color=curveColor,
-                                        linewidth=curveWidth
-                                        )
-                            )
-
-        # add straight line segment if undercut
-        if G.undercut == True:
-            theta_A = G.tts/(2*G.Rs) + invF(self.PA)
-            Rjfi = (G.Rr + G.Rf) * cos(G.theta_F - theta_A)
-            Rjfi_x = Rjfi*sin(theta_A)
-            Rjfi_y = Rjfi*cos(theta_A)
-
-            Rb_x = G.Rb*sin(theta_A)
-            Rb_y = G.Rb*cos(theta_A)
-
-            line = mpath.Path([[Rjfi_x, Rjfi_y], [Rb_x, Rb_y]])
-            linePatch = mpatch.PathPatch(line, color=curveColor, linewidth=curveWidth, fill=False)
-            curveList.append(linePatch)
-            line = mpath.Path([[-Rjfi_x, Rjfi_y], [-Rb_x, Rb_y]])
-            linePatch = mpatch.PathPatch(line, color=curveColor, linewidth=curveWidth, fill=False)
-            curveList.append(linePatch)
-
-        # Root Radius
-        if G.Rf < G.Rff:
-            RRStartAngle1 = rad2deg(G.theta_F) + 90
-            RREndAngle1 = rad2deg(pi/G.N) + 90
-            RRStartAngle2 = -rad2deg(pi/G.N) + 90
-            RREndAngle2 = -rad2deg(G.theta_F) + 90
-            curveList.append(mpatch.Arc(
-                                        (0, 0),
-                                        G.Rr*2, G.Rr*2,
-                                        theta1=RRStartAngle1, theta2=RREndAngle1,
-                                        color=curveColor,
-                                        linewidth=curveWidth
-                                        )
-                            )
-            curveList.append(mpatch.Arc(
-                                        (0, 0),
-                                        G.Rr*2, G.Rr*2,
-                                        theta1=RRStartAngle2, theta2=RREndAngle2,
-                                        color=curveColor,
-                                        linewidth=curveWidth
-                                        )
-                            )
-
-        # Tip Radius
-        if G.Rtip > 0:
-            # point where tip touches involute
-            phi_Atip = arccos(G.Rb/G.Roe);
-            theta_Atip = (G.tts/(2*G.Rs)) + invF(self.PA) - invF(phi_Atip);
-            # point where tip touches OD
-            CF = G.Ro - G.Rtip; # distance from gear center to fillet center
-            phi_Otip = arccos(G.Rb/CF);
-            theta_Otip = theta_Atip - phi_Atip + phi_Otip;
-            # Center point
-            Rtip_x = CF*sin(theta_Otip);
-            Rtip_y = CF*cos(theta_Otip);
-            # find arc angles
-            tipStartAngle = rad2deg(phi_Atip - theta_Atip);
-            tipEndAngle = 90 - rad2deg(theta_Otip);
-            curveList.append(mpatch.Arc(
-                                        (Rtip_x,Rtip_y),
-                                        G.Rtip*2, G.Rtip*2,
-                                        theta1=tipStartAngle, theta2=tipEndAngle,
-                                        color=curveColor,
-                                        linewidth=curveWidth
-                                        )
-                            )
-            curveList.append(mpatch.Arc(
-                                        (-Rtip_x,Rtip_y),
-                                        G.Rtip*2, G.Rtip*2,
-                                        theta1=180-tipEndAngle, theta2=180-tipStartAngle,
-                                        color=curveColor,
-                                        linewidth=curveWidth
-                                        )
-                            )
-
-        # Outer Radius
-        if G.Rtip < G.Rtip_max:
-            if 'theta_Otip' in locals():
-                    theta_O = theta_Otip
-            else:
-                    phi_O = arccos(G.Rb/G.Roe);
-                    theta_O = (G.tts/(2*G.Rs)) + invF(self.PA) - invF(phi_O);
-            ODStartAngle = -rad2deg(theta_O) + 90
-            ODEndAngle = rad2deg(theta_O) + 90
-            curveList.append(mpatch.Arc(
-                                        (0,0),
-                                        G.Ro*2, G.Ro*2,
-                                        #angle=90,
-                                        theta1=ODStartAngle, theta2=ODEndAngle,
-                                        color=curveColor,
-                                        linewidth=curveWidth
-                                        )
-                            )
-
-        if save == True:
-            if G.ID == 1:
-                defaultName = 'gear1.dxf'
-            else:
-                defaultName = 'gear2.dxf'
-
-            savePath, selectedFilter = QFileDialog.getSaveFileName(self, 'Save Gear'+str(G.ID), defaultName)
-
-            if savePath == '':
-                return
-
-            doc = ezdxf.new()
-            msp = doc.modelspace()
-
-            for n in range(G.N):
-                    angle = (n/G.N)*tau
-                    ucs = UCS(origin=(0,0,0)).rotate_local_z(angle)
-
-                    # involute
-                    msp.add_lwpolyline(list(zip(RAx, RAy))).transform(ucs.matrix)
-                    msp.add_lwpolyline(list(zip(-RAx, RAy))).transform(ucs.matrix)
-
-                    # root fillet
-                    if G.Rf > 0:
-                            msp.add_arc((Fx, Fy), radius=G.Rf, start_angle=filletStartAngle, end_angle=filletEndAngle).transform(ucs.matrix)
-                            msp.add_arc((-Fx, Fy), radius=G.Rf, start_angle=180-filletEndAngle, end_angle=180-filletStartAngle).transform(ucs.matrix)
-
-                    # add straight line segment if undercut
-                    if G.undercut == True:
-                            msp.add_line((Rjfi_x, Rjfi_y), (Rb_x, Rb_y)).transform(ucs.matrix)
-                            msp.add_line((-Rjfi_x, Rjfi_y), (-Rb_x, Rb_y)).transform(ucs.matrix)
+        artist.set_visible(count > 0)
+        if count > 0:
+            profile = self.pair.toothProfile(_gear, tolerance)
+            artist.set_path(mpath.Path(profile.teeth(first, count), closed=count >= _gear.N))
 
-                    # root radius
-                    if G.Rf < G.Rff :
-                            msp.add_arc((0, 0), radius=G.Rr, start_angle=RRStartAngle1, end_angle=RREndAngle1).transform(ucs.matrix)
-                            msp.add_arc((0, 0), radius=G.Rr, start_angle=RRStartAngle2, end_angle=RREndAngle2).transform(ucs.matrix)
+    def watchView(self, _canvas):
+        """Culls a canvas' teeth again when the toolbar pans or zooms it."""
+        _canvas.axes.callbacks.connect('xlim_changed', lambda axes: self.viewChanged(_canvas))
+        _canvas.axes.callbacks.connect('ylim_changed', lambda axes: self.viewChanged(_canvas))
+        _canvas.settleTimer.timeout.connect(lambda: self.viewSettled(_canvas))
 
-                    # tip radius
-                    if G.Rtip > 0:
-                            msp.add_arc((Rtip_x,Rtip_y), radius=G.Rtip, start_angle=tipStartAngle, end_angle=tipEndAngle).transform(ucs.matrix)
-                            msp.add_arc((-Rtip_x,Rtip_y), radius=G.Rtip, start_angle=180-tipEndAngle, end_angle=180-tipStartAngle).transform(ucs.matrix)
+    def viewChanged(self, _canvas):
+        if _canvas.settingLimits:
+            return
+        _canvas.viewMoving = True
+        _canvas.settleTimer.start()
+        self.scheduler.request((_canvas, 'view'), lambda updateAxes: self.refreshView(_canvas))
 
-                    # outer radius
-                    if G.Rtip < G.Rtip_max:
-                            msp.add_arc((0, 0), radius=G.Ro, start_angle=ODStartAngle, end_angle=ODEndAngle).transform(ucs.matrix)
+    def viewSettled(self, _canvas):
+        _canvas.viewMoving = False
+        self.scheduler.request((_canvas, 'view'), lambda updateAxes: self.refreshView(_canvas))
 
-            zoom.extents(msp)
-            doc.saveas(str(savePath))
+    def refreshView(self, _canvas):
+        for name, (gear, angle, offset) in _canvas.culling.items():
+            self.cullTeeth(_canvas, name, gear, angle, offset)
+        _canvas.draw_idle()
 
-        # save == False
-        else:
-            # make copies of all the teeth
-            fullList = []
-            for n in range(G.N):
-                angle = (n/G.N)*tau
-                for curve in curveList:
-                    newCurve = copy.copy(curve)
-                    newCurve.set_transform(mtransforms.Affine2D().rotate(angle))
-                    fullList.append(newCurve)
+    def circleArtists(self, _canvas, _name, _gear, _transform=None, _legendLoc=None):
+        """Base, pitch, outer and root circles of a gear kept on a canvas, resized in place.
 
-            curveCollection = mcollections.PatchCollection(fullList, match_original=True)
-            return curveCollection
+        With _legendLoc, a legend of the circles is added with them, as
+        _name+'Legend'.
+        """
+        circles = _canvas.artists.get(_name)
+        if circles is None:
+            circles = [pyplot.Circle((0, 0), 1, color='c', ls='--', fill=False, label='Base Circle'),
+                       pyplot.Circle((0, 0), 1, color='y', ls='--', fill=False, label='Pitch Circle'),
+                       pyplot.Circle((0, 0), 1, color='g', ls='--', fill=False, label='Outer Circle'),
+                       pyplot.Circle((0, 0), 1, color='r', ls='--', fill=False, label='Root Circle')]
+            for circle in circles:
+                if _transform is not None:
+                    circle.set_transform(_transform + _canvas.axes.transData)
+                _canvas.axes.add_patch(circle)
+            _canvas.artists[_name] = circles
 
-    def addCircles(self, _gear, _canvas, collection=False):
-        if _gear.Rb < 0:
-            return None
+            if _legendLoc is not None:
+                legend = mlegend.Legend(_canvas.axes, circles, [circle.get_label() for circle in circles],
+                                        loc=_legendLoc, framealpha=1.0)
+                _canvas.axes.add_artist(legend)
+                _canvas.artists[_name+'Legend'] = legend
 
-        circleList = []
-        # base circle
-        circleList.append(pyplot.Circle((0, 0), _gear.Rb, color='c', ls='--', fill=False, label='Base Circle'))
-        # # pitch circle
-        circleList.append(pyplot.Circle((0, 0), _gear.Rp, color='y', ls='--', fill=False, label='Pitch Circle'))
-        # # outer circle
-        circleList.append(pyplot.Circle((0, 0), _gear.Roe, color='g', ls='--', fill=False, label='Outer Circle'))
-        # # root cirlce
-        circleList.append(pyplot.Circle((0, 0), _gear.Rr, color='r', ls='--', fill=False, label='Root Circle'))
-
-        if collection == False:
-            for circle in circleList:
-                _canvas.axes.add_patch(circle)
-            legendCircle = _canvas.axes.legend(loc='upper right', framealpha=1.0)
-            _canvas.axes.add_artist(legendCircle)
-        else:
-            return mcollections.PatchCollection(circleList, match_original=True)
+        for circle, R in zip(circles, [_gear.Rb, _gear.Rp, _gear.Roe, _gear.Rr]):
+            circle.set_radius(R)
+        return circles
 
     def drawGear(self, _gear, _updateAxes = False):
         if _gear.Rb < 0:
@@ -1566,9 +1277,8 @@ class jpgearqt(QWidget):
             cb_singleTooth = self.ui.cb_singleViewG2
             cb_circles = self.ui.cb_circlesG2
 
-        if _updateAxes == False:
-            leftLimit, rightLimit, bottomLimit, topLimit = canvas.axes.axis()
-        else:
+        limits = None
+        if _updateAxes == True:
             if cb_singleTooth.isChecked():
                 rightLimit = _gear.Rp*sin(tau/_gear.N)
                 leftLimit = -rightLimit
@@ -1579,23 +1289,17 @@ class jpgearqt(QWidget):
                 leftLimit = -rightLimit
                 topLimit = rightLimit
                 bottomLimit = leftLimit
+            limits = (leftLimit, rightLimit, bottomLimit, topLimit)
+        self.setupAxes(canvas, limits)
 
-        canvas.axes.cla()
-
-        canvas.axes.set_aspect('equal')
-        canvas.axes.set_box_aspect(1)
-        canvas.fig.tight_layout()
-
-        canvas.axes.set_xlim(left=leftLimit, right=rightLimit)
-        canvas.axes.set_ylim(bottom=bottomLimit, top=topLimit)
+        self.toothArtist(canvas, 'teeth', _gear)
+        self.cullTeeth(canvas, 'teeth', _gear)
 
-        curveCol = self.layoutGear(_gear)
-        canvas.axes.add_collection(curveCol)
+        circles = self.circleArtists(canvas, 'circles', _gear, _legendLoc='upper right')
+        for artist in circles + [canvas.artists['circlesLegend']]:
+            artist.set_visible(cb_circles.isChecked())
 
-        if cb_circles.isChecked():
-            self.addCircles(_gear, canvas)
-
-        canvas.draw()
+        canvas.draw_idle()
 
     def drawStress(self, _gear, _canvas, _lewisParams):
         # setup canvas
@@ -1603,43 +1307,40 @@ class jpgearqt(QWidget):
         leftLimit = -rightLimit
         topLimit = _gear.Rp + rightLimit
         bottomLimit = _gear.Rp - rightLimit
-
-        _canvas.axes.cla()
-
-        _canvas.axes.set_aspect('equal')
-        _canvas.axes.set_box_aspect(1)
-        _canvas.fig.tight_layout()
-
-        _canvas.axes.set_xlim(left=leftLimit, right=rightLimit)
-        _canvas.axes.set_ylim(bottom=bottomLimit, top=topLimit)
+        self.setupAxes(_canvas, (leftLimit, rightLimit, bottomLimit, topLimit))
 
         # add teeth
-        curveCol = self.layoutGear(_gear)
-        if _gear.ID == 2:
-            curveCol.set_edgecolor('r')
-        _canvas.axes.add_collection(curveCol)
-        # add parabola
+        self.toothArtist(_canvas, 'teeth', _gear, 'r' if _gear.ID == 2 else 'b')
+        self.cullTeeth(_canvas, 'teeth', _gear)
+
+        artists = _canvas.artists
+        if 'parabola' not in artists:
+            artists['parabola'] = mpatch.PathPatch(mpath.Path([[0, 0], [0, 0]]), color='g', linestyle='--',
+                                                   linewidth=1, fill=False, label='Lewis Parabola')
+            _canvas.axes.add_patch(artists['parabola'])
+            # intersection points
+            artists['points'], = _canvas.axes.plot([], [], color='tab:orange', marker='o', linestyle='')
+            # Highest point of single tooth contact
+            artists['hpstc'], = _canvas.axes.plot([], [], color='k', linestyle='--', linewidth=1)
+            # force vector arrow
+            artists['arrow'] = mpatch.FancyArrow(0, 0, 0, 0, width=0, length_includes_head=True, color='k')
+            _canvas.axes.add_patch(artists['arrow'])
+            legend = mlegend.Legend(_canvas.axes, [artists['parabola']], ['Lewis Parabola'],
+                                    loc='upper right', framealpha=1.0)
+            _canvas.axes.add_artist(legend)
+
+        # parabola
         Rd, gamma, x_Lewis, y_Lewis, a_Lewis = _lewisParams
-        x_span = linspace(-x_Lewis*1.1, x_Lewis*1.1, 25)
+        x_span = linspace(-x_Lewis*1.1, x_Lewis*1.1, quality.setting('parabolaSamples'))
         y_span = a_Lewis*x_span**2 + Rd
-
-        paraPath = mpath.Path( list(map(list, zip(*[x_span, y_span]))) )
-        paraPatch = mpatch.PathPatch(paraPath, color='g', linestyle='--', linewidth=1, fill=False, label='Lewis Parabola')
-        _canvas.axes.add_patch(paraPatch)
+        artists['parabola'].set_path(mpath.Path(np.column_stack([x_span, y_span])))
         # add fillet circle
         # Fx = (_gear.Rr + _gear.Rf)*sin(_gear.theta_F)   # center of fillet circle
         # Fy = (_gear.Rr + _gear.Rf)*cos(_gear.theta_F)
         # _canvas.axes.add_patch(pyplot.Circle((Fx, Fy), _gear.Rf, color='c', ls='--', fill=False))
-        # add intersection points
-        _canvas.axes.plot([x_Lewis], [y_Lewis], color='tab:orange', marker='o', linewidth=2)
-        _canvas.axes.plot([-x_Lewis], [y_Lewis], color='tab:orange', marker='o', linewidth=2)
-        # Highest point of single tooth contact
-        phi_hp = arccos(_gear.Rb/_gear.Rhp)
-        theta_hp = (_gear.tts/(2*_gear.Rs)) + invF(self.PA) - invF(phi_hp)
-        Rhp_x = _gear.Rhp*sin(theta_hp)
-        Rhp_y = _gear.Rhp*cos(theta_hp)
-        _canvas.axes.plot([Rhp_x, 0], [Rhp_y, Rd], color='k', linestyle='--', linewidth=1)
-        # _canvas.axes.plot([Rhp_x], [Rhp_y], color='r', marker='*', markersize=10, linestyle='', linewidth=3)
+        artists['points'].set_data([x_Lewis, -x_Lewis], [y_Lewis, y_Lewis])
+        Rhp_x, Rhp_y = self.pair.toothProfile(_gear).hpstcPoint
+        artists['hpstc'].set_data([Rhp_x, 0], [Rhp_y, Rd])
         # force vector arrow
         arrowSlope = (Rhp_y - Rd)/Rhp_x                 # rise over run
         tail_y = Rhp_y + (Rhp_y - Rd)*2                   # pick an arbitrary tail height
@@ -1648,82 +1349,44 @@ class jpgearqt(QWidget):
         dy = Rhp_y - tail_y
         arrowLength = sqrt(dx**2 + dy**2)
         tailWidth = arrowLength / 50
-        arrow = mpatch.FancyArrow(tail_x, tail_y, dx, dy, width=tailWidth, length_includes_head=True, color='k')
-        _canvas.axes.add_patch(arrow)
-
-        _canvas.axes.legend(loc='upper right', framealpha=1.0)
-        _canvas.draw()
-
-    def drawMesh(self, _updateAxes = False):
-        if self.G1.Rb < 0 or self.G2.Rb < 0:
-            return
-
-        canvas = self.canvasMesh
-        cb_singleTooth = self.ui.cb_singleViewMesh
-        cb_circles = self.ui.cb_circlesMesh
-
-        if _updateAxes == False:
-            leftLimit, rightLimit, bottomLimit, topLimit = canvas.axes.axis()
-        else:
-            if cb_singleTooth.isChecked():
-                topLimit = self.G1.Rp*sin(tau/self.G1.N)
-                bottomLimit = -topLimit
-                leftLimit = self.G1.Rp - topLimit
-                rightLimit = self.G1.Rp + topLimit
-            else:
-                sizeBuffer = 1.1
-                leftLimit = -self.G1.Ro * sizeBuffer
-                rightLimit = self.CD + self.G2.Ro * sizeBuffer
-                topLimit = max(self.G1.Ro, self.G2.Ro) * sizeBuffer
-                bottomLimit = -topLimit
-
-        canvas.axes.cla()
+        artists['arrow'].set_data(x=tail_x, y=tail_y, dx=dx, dy=dy, width=tailWidth)
 
-        canvas.axes.set_aspect('equal')
-        canvas.axes.set_box_aspect(1)
-        canvas.fig.tight_layout()
+        _canvas.draw_idle()
 
-        canvas.axes.set_xlim(left=leftLimit, right=rightLimit)
-        canvas.axes.set_ylim(bottom=bottomLimit, top=topLimit)
+    def updateMeshGeometry(self):
+        """Line of contact, slider range and starting angles of the mesh view.
 
+        Only depends on the design, so it's worked out once per design and
+        the slider only turns the gears.
+        """
         # Points for line of contact
         # pitch point
         x0 = self.G1.Rp
         y0 = 0
         # tangent to gear 1
-        x1 = self.G1.Rb*cos(self.OPA)
-        y1 = self.G1.Rb*sin(self.OPA)
+        x1 = self.G1.Rb*cos(self.pair.OPA)
+        y1 = self.G1.Rb*sin(self.pair.OPA)
         # tangent to gear 2
-        x2 = self.CD - self.G2.Rb*cos(self.OPA)
-        y2 = -self.G2.Rb*sin(self.OPA)
+        x2 = self.pair.CD - self.G2.Rb*cos(self.pair.OPA)
+        y2 = -self.G2.Rb*sin(self.pair.OPA)
         # on LoC at Roe2
         # law of sines - A/sin(a) = B/sin(b)
-        b = arcsin( (self.G2.Rp/self.G2.Roe) * sin(self.OPA + deg2rad(90)) )
-        c = pi - b - self.OPA - deg2rad(90)
-        x3 = self.CD - (self.G2.Roe * cos(c))
+        b = arcsin( (self.G2.Rp/self.G2.Roe) * sin(self.pair.OPA + deg2rad(90)) )
+        c = pi - b - self.pair.OPA - deg2rad(90)
+        x3 = self.pair.CD - (self.G2.Roe * cos(c))
         y3 = self.G2.Roe * sin(c)
-        b = arcsin( (self.G1.Rp/self.G1.Roe) * sin(self.OPA + deg2rad(90)) )
-        c = pi - b - self.OPA - deg2rad(90)
+        b = arcsin( (self.G1.Rp/self.G1.Roe) * sin(self.pair.OPA + deg2rad(90)) )
+        c = pi - b - self.pair.OPA - deg2rad(90)
         x4 = (self.G1.Roe * cos(c))
         y4 = -(self.G1.Roe * sin(c))
 
-        # config slider
-        slider = self.ui.hSlider_Mesh
-        sliderMin = 0
-        # pitch point happens at slider=1
+        # slider range, the pitch point happens at slider=1
         # find overshoot for gear two
         a = arctan(-y2/x2)
-        overshoot = a / self.OPA
-        sliderMax = 1 + overshoot
-
-        slider.setMinimum(int(sliderMin * self.sliderScale))
-        slider.setMaximum(int(sliderMax * self.sliderScale))
+        overshoot = a / self.pair.OPA
 
         # make the teeth mesh nicely
         ratio = self.G1.N / self.G2.N
-        # profile angle at pitch circle
-        phi_P1 = arccos(self.G1.Rb/self.G1.Rp)
-        phi_P2 = arccos(self.G2.Rb/self.G2.Rp)
         # tooth thickness at pitch circle
         theta_P1 = self.G1.tt/(2*self.G1.Rp)
         theta_P2 = self.G2.tt/(2*self.G2.Rp)
@@ -1731,283 +1394,138 @@ class jpgearqt(QWidget):
         startAngle1 = -pi/2 + theta_P1
         startAngle2 = pi/2 + theta_P2
 
-        curveStartAngle1 = startAngle1 + self.OPA + invF(self.OPA)
-        curveStartAngle2 = startAngle2 - ratio * (self.OPA + invF(self.OPA))
-
-        phi_A = float(slider.value() / self.sliderScale) * self.OPA
-        updateAngle = phi_A + invF(phi_A)
+        self.meshGeometry = {
+            'actionLine' : ([x1, x2], [y1, y2]),
+            'contactLine' : ([x3, x4], [y3, y4]),
+            'sliderMax' : 1 + overshoot,
+            'ratio' : ratio,
+            'curveStartAngle1' : startAngle1 + self.pair.OPA + invF(self.pair.OPA),
+            'curveStartAngle2' : startAngle2 - ratio * (self.pair.OPA + invF(self.pair.OPA)),
+        }
 
-        angle1 = curveStartAngle1 - (updateAngle)
-        angle2 = curveStartAngle2 + (updateAngle * ratio)
+    def drawMesh(self, _updateAxes = False):
+        if self.G1.Rb < 0 or self.G2.Rb < 0:
+            return
 
-        # draw everything
-        curveCol1 = self.layoutGear(self.G1)
-        curveCol2 = self.layoutGear(self.G2)
-        curveCol2.set_edgecolor('r')
+        canvas = self.canvasMesh
+        cb_singleTooth = self.ui.cb_singleViewMesh
+        cb_circles = self.ui.cb_circlesMesh
+        artists = canvas.artists
 
-        curveCol1.set_transform(mtransforms.Affine2D().rotate(angle1) + canvas.axes.transData)
-        curveCol2.set_transform(mtransforms.Affine2D().rotate(angle2).translate(self.CD, 0) + canvas.axes.transData)
+        limits = None
+        if _updateAxes == True:
+            if cb_singleTooth.isChecked():
+                topLimit = self.G1.Rp*sin(tau/self.G1.N)
+                bottomLimit = -topLimit
+                leftLimit = self.G1.Rp - topLimit
+                rightLimit = self.G1.Rp + topLimit
+            else:
+                sizeBuffer = 1.1
+                leftLimit = -self.G1.Ro * sizeBuffer
+                rightLimit = self.pair.CD + self.G2.Ro * sizeBuffer
+                topLimit = max(self.G1.Ro, self.G2.Ro) * sizeBuffer
+                bottomLimit = -topLimit
+            limits = (leftLimit, rightLimit, bottomLimit, topLimit)
+        self.setupAxes(canvas, limits)
+
+        if 'rotation1' not in artists:
+            # rotated in place by the slider
+            artists['rotation1'] = mtransforms.Affine2D()
+            artists['rotation2'] = mtransforms.Affine2D()
+            artists['offset2'] = mtransforms.Affine2D()
+            # line of contact
+            artists['actionLine'], = canvas.axes.plot([], [], color='k', marker='x', linestyle='--', linewidth=1)
+            artists['contactLine'], = canvas.axes.plot([], [], color='k', marker='x', linewidth=2, label='Line of Contact')
+            # contact point
+            artists['tracePoint'], = canvas.axes.plot([], [], color='tab:orange', marker='o', linestyle='', linewidth=2, label='Point of Contact')
+            legend = mlegend.Legend(canvas.axes, [artists['contactLine'], artists['tracePoint']],
+                                    ['Line of Contact', 'Point of Contact'], loc='lower left', framealpha=1.0)
+            canvas.axes.add_artist(legend)
+            artists['LoCLegend'] = legend
+
+        # anything that only changes with the design
+        key = self.geometryKey()
+        if canvas.keys.get('mesh') != key:
+            self.updateMeshGeometry()
+            canvas.keys['mesh'] = key
+
+            artists['offset2'].clear().translate(self.pair.CD, 0)
+            artists['actionLine'].set_data(*self.meshGeometry['actionLine'])
+            artists['contactLine'].set_data(*self.meshGeometry['contactLine'])
+
+            # config slider, last since it can call back in here
+            slider = self.ui.hSlider_Mesh
+            sliderMin = 0
+            slider.setMinimum(int(sliderMin * self.sliderScale))
+            slider.setMaximum(int(self.meshGeometry['sliderMax'] * self.sliderScale))
+
+        self.toothArtist(canvas, 'teeth1', self.G1, 'b', artists['rotation1'])
+        self.toothArtist(canvas, 'teeth2', self.G2, 'r', artists['rotation2'])
+
+        circles = (self.circleArtists(canvas, 'circles1', self.G1, _legendLoc='upper right') +
+                   self.circleArtists(canvas, 'circles2', self.G2, artists['offset2']))
+        for artist in circles + [artists['circles1Legend']]:
+            artist.set_visible(cb_circles.isChecked())
+
+        # turn the gears to the slider position
+        phi_A = float(self.ui.hSlider_Mesh.value() / self.sliderScale) * self.pair.OPA
+        updateAngle = phi_A + invF(phi_A)
 
-        canvas.axes.add_collection(curveCol1)
-        canvas.axes.add_collection(curveCol2)
+        angle1 = self.meshGeometry['curveStartAngle1'] - (updateAngle)
+        angle2 = self.meshGeometry['curveStartAngle2'] + (updateAngle * self.meshGeometry['ratio'])
 
-        if cb_circles.isChecked():
-            self.addCircles(self.G1, canvas, collection=False)
+        artists['rotation1'].clear().rotate(angle1)
+        artists['rotation2'].clear().rotate(angle2).translate(self.pair.CD, 0)
+        self.cullTeeth(canvas, 'teeth1', self.G1, angle1)
+        self.cullTeeth(canvas, 'teeth2', self.G2, angle2, self.pair.CD)
 
-            circleCol2 = self.addCircles(self.G2, canvas, collection=True)
-            circleCol2.set_transform(mtransforms.Affine2D().translate(self.CD, 0) + canvas.axes.transData)
-            canvas.axes.add_collection(circleCol2)
+        # contact point
+        traceAngle = self.pair.OPA - phi_A
+        R = self.G1.Rb/cos(phi_A)
+        artists['tracePoint'].set_data([R*cos(traceAngle)], [R*sin(traceAngle)])
 
-        if self.ui.cb_LoC.isChecked():
-            # line of contact
-            canvas.axes.plot([x1,x2],[y1,y2], color='k', marker='x', linestyle='--', linewidth=1)
-            loc, = canvas.axes.plot([x3,x4],[y3,y4], color='k', marker='x', linewidth=2, label='Line of Contact')
-            # contact point
-            traceAngle = self.OPA - phi_A
-            R = self.G1.Rb/cos(phi_A)
-            traceX = R*cos(traceAngle)
-            traceY = R*sin(traceAngle)
-            tracePoint, = canvas.axes.plot([traceX], [traceY], color='tab:orange', marker='o', linestyle='', linewidth=2, label='Point of Contact')
-            legendPoint = canvas.axes.legend(handles=[loc, tracePoint], loc='lower left', framealpha=1.0)
-            canvas.axes.add_artist(legendPoint)
+        for artist in [artists['actionLine'], artists['contactLine'], artists['tracePoint'], artists['LoCLegend']]:
+            artist.set_visible(self.ui.cb_LoC.isChecked())
 
-        canvas.draw()
+        canvas.draw_idle()
 
     def createAnimWindow(self):
         if self.G1.Rb < 0 or self.G2.Rb < 0:
             return
 
-        window = popupWindow(self)
-        window.setWindowTitle("Mesh Animation")
-
-        window.ui.vLayout_popup.insertWidget(0, window.canvas)
-        toolbar = NavigationToolbar2QT(window.canvas, self)
-        window.ui.hLayout_toolbarAnim.insertWidget(0, toolbar)
-
-        sizeBuffer = 1.1
-        leftLimit = -self.G1.Ro * sizeBuffer
-        rightLimit = self.CD + self.G2.Ro * sizeBuffer
-        topLimit = max(self.G1.Ro, self.G2.Ro) * sizeBuffer
-        bottomLimit = -topLimit
-
-        window.canvas.axes.set_aspect('equal')
-        window.canvas.axes.set_box_aspect(1)
-        window.canvas.fig.tight_layout()
-
-        window.canvas.axes.set_xlim(left=leftLimit, right=rightLimit)
-        window.canvas.axes.set_ylim(bottom=bottomLimit, top=topLimit)
-
-        curveCol1 = self.layoutGear(self.G1)
-        curveCol2 = self.layoutGear(self.G2)
-        curveCol2.set_edgecolor('r')
-
-        window.canvas.axes.add_collection(curveCol1)
-        curveCol2.set_transform(mtransforms.Affine2D().translate(self.CD, 0) + window.canvas.axes.transData)
-        window.canvas.axes.add_collection(curveCol2)
-
-        # animation specs
-        slider = window.ui.hSlider_Speed
-        maxSpeed = slider.maximum()             # RPM
-        msPerRev = (60*1000)/maxSpeed           # milliseconds per revolution
-        interval = 30                           # ms per frame
-        framesPerRev = int(msPerRev / interval)	# frames for one rev
-        ratio = self.G1.N / self.G2.N
-
-        def animFunc(frame, _maxSpeed, _slider):
-            speed = float(_slider.value())
-            updateAngle = (speed/_maxSpeed) * (tau*frame)/framesPerRev
-
-            angle1 = (-pi/2) - updateAngle
-            angle2 = pi/2 + pi/self.G2.N - 0.5*self.bkl/self.G2.Rs + ratio*updateAngle
+        if self.animWindow is None:
+            self.animWindow = popupWindow(self)
 
-            curveCol1.set_transform(mtransforms.Affine2D().rotate(angle1) + window.canvas.axes.transData)
-            curveCol2.set_transform(mtransforms.Affine2D().rotate((angle2)).translate(self.CD, 0) + window.canvas.axes.transData)
-
-        self.anim = manimation.FuncAnimation(window.canvas.fig, animFunc, fargs=[maxSpeed, slider], frames=framesPerRev, interval=interval)
-
-        window.canvas.draw()
-
-        window.show()
+        self.animWindow.start()
+        self.animWindow.show()
+        self.animWindow.raise_()
+        self.animWindow.activateWindow()
 
 # Stress ######################################################################
-    def set_speed(self, _speed):
-        if is_number(_speed):
-            self.speed = float(_speed)
-
-    def set_torque(self, _torque):
-        if is_number(_torque):
-            self.torque = float(_torque)
-
-    def set_E(self, _gear, _E):
-        if is_number(_E):
-            _gear.E = float(_E)
-
-    def set_nu(self, _gear, _nu):
-        if is_number(_nu):
-            _gear.nu = float(_nu)
-
     def updateStress(self):
-        if self.G1.N < 1 or self.G2.N < 1:
-            return
-        if self.G1.FW < 0 or self.G2.FW < 0:
-            return
-
-        # use smallest face width
-        FW = min(self.G1.FW, self.G2.FW)
-
-        # convert torque to force through HPSTC tangent to base circle
-        w = self.torque / (self.G1.Rb * FW)
-
-        self.calcPitchLineVelocity()
-        self.calcContactStress(w)
-        self.calcBendingStress(w)
-
-    def calcPitchLineVelocity(self):
-        velocity = (tau * self.G1.Rp * (float(self.ui.le_speed.text()) / 60)) / 1000
-        self.ui.lb_pitchLineVel.setText(str("{:.3f}".format(velocity)))
-
-    def calcContactStress(self, _w):
-        # elastic coefficient
-        E1 = float(self.ui.le_E1.text())
-        E2 = float(self.ui.le_E2.text())
-        nu1 = float(self.ui.le_nu1.text())
-        nu2 = float(self.ui.le_nu2.text())
-
-        Cp = 1/sqrt( (pi*(1-nu1**2)/E1) + (pi*(1-nu2**2)/E2) )
-
-        # max contact stress occurs at lowest point of single tooth contact
-        rho1 = sqrt(self.G1.Roe**2 - self.G1.Rb**2) - self.G1.Pb    # AGMA C2
-        rho2 = self.G1.Rb*self.G2.Rb*tan(self.OPA) - rho1           # AGMA C6 - C2
+        # stress results are reported at the tight tolerances
+        with self.pair.useQuality('export'):
+            if not self.pair.updateStress():
+                return
+            # read before leaving the block re-evaluates at the active quality
+            failed = [name for name in ['lewis1', 'lewis2'] if not self.pair.converged[name]]
 
-        stress = Cp * sqrt(_w*( (rho1+rho2)/(rho1*rho2) ))
+        if failed:
+            QMessageBox.critical(self, "Error computing stress", "Could not find the Lewis parabola, the "+", ".join(failed)+" solve did not converge")
+            return
 
-        self.ui.lb_stressC1.setText(str("{:.3f}".format(stress)))
-        self.ui.lb_stressC2.setText(str("{:.3f}".format(stress)))
+        self.ui.lb_pitchLineVel.setText(str("{:.3f}".format(self.pair.velocity)))
+        self.ui.lb_stressC1.setText(str("{:.3f}".format(self.pair.stressC)))
+        self.ui.lb_stressC2.setText(str("{:.3f}".format(self.pair.stressC)))
+        self.ui.lb_stressB1.setText(str("{:.3f}".format(self.G1.stressB)))
+        self.ui.lb_stressB2.setText(str("{:.3f}".format(self.G2.stressB)))
 
-    def calcBendingStress(self, _w):
-        # Stress concentration factor Kf
-        # from GOIG 11.24 - 11.26
-        # Note that GOIG uses degrees while AGMA 908 uses radians
-        k1 = 0.3054 - 0.00489*self.OPA_deg - 0.000069*self.OPA_deg**2
-        k2 = 0.3620 - 0.01268*self.OPA_deg + 0.000104*self.OPA_deg**2
-        k3 = 0.2934 + 0.00609*self.OPA_deg + 0.000087*self.OPA_deg**2
+        # the bending stress calc may have bumped a zero fillet radius
+        self.updateDesignFields()
 
+        # draw teeth
         for _gear, _canvas in zip([self.G1, self.G2], [self.canvasStress1, self.canvasStress2]):
-
-            # Lewis parabola key points
-            lewisParams = self.lewisParabola(_gear)
-            Rd, gamma, x_Lewis, y_Lewis, a_Lewis = lewisParams
-
-            # Lewis parabola dimensions
-            tt_LP = 2*x_Lewis       # tooth thickness at critical section
-            h_LP = Rd - y_Lewis     # height of Lewis parabola
-
-            # please don't divide by zero
-            if _gear.Rf < 0.001:
-                self.set_Rf(_gear, 0.001)
-
-            Kf = k1 + ( (tt_LP/_gear.Rf)**k2 ) * ( (tt_LP/h_LP)**k3 )
-
-            stress = (_w/self.mod) * cos(gamma) * (Kf*( ((1.5*self.mod*h_LP)/ x_Lewis**2) -
-                                    (0.5*self.mod*tan(gamma))/x_Lewis ) )
-
-            if _gear.ID == 1:
-                self.ui.lb_stressB1.setText(str("{:.3f}".format(stress)))
-            else:
-                self.ui.lb_stressB2.setText(str("{:.3f}".format(stress)))
-
-            # draw tooth
-            self.drawStress(_gear, _canvas, lewisParams)
-
-    def lewisParabola(self, _gear):
-        """
-        # Find the intersection point of the Lewis parabola and the root fillet circle
-        #
-        # Parameters:
-        # Fx, Fy - centerpoint of root fillet circle
-        # Rf - root fillet radius
-        # Rd - intersection of tooth centerline and force vector; the top of the Lewis
-        #   parabola
-        #
-        # Output variables:
-        # x, y - point of intersection between the Lewis parabola and the root fillet
-        # a - scale of parabola, => y = ax^2 + bx + c
-        #-------------------------------------------------------------------------------
-
-        # Equation of a circle: (y-v)^2 + (x-h)^2 = r^2
-        # Substitute values for fillet circle: (y-Fy)^2 + (x-Fx)^2 = Rf^2
-        # Rearrange: y = +/-sqrt(Rf^2 - (x-Fx)^2) + Fy
-        # We are only interested in the bottom half of the circle:
-        # [1] y = -sqrt(Rf^2 - (x-Fx)^2) + Fy
-        # Implicit differentiation of [1]:
-        # [2] dy/dx = -(x-Fx)/(y-Fy)
-        #
-        # Equation of a parabola: y = ax^2 + bx + c
-        # Substitute values of Lewis parabola, and note that the parabola is
-        # centered on the y-axis, i.e. b=0:
-        # [3] y = ax^2 + Rd
-        # Differentiate [3]:
-        # [4] dy/dx = 2ax
-        #
-        # At the tangent intersection of the parabola and circle, the derivatives
-        # are equal:
-        # [5] -(x-Fx)/(y-Fy) = 2ax
-        # Rearrange [5]:
-        # [6] a = -(x-Fx)/(2x)(y-Fy)
-        # Substitute [6] into [3]:
-        # y = -(x)(x-Fx)/(2)(y-Fy) + Rd
-        # y^2 - Fy*y - Rd*y = (-x^2 + Fx*x)/2 - Rd*Fy
-        # Complete the square:
-        # [y^2 -(Fy+Rd)*y + (Fy+Rd)^2/4] - (Fy+Rd)^2/4 = (-x^2 + Fx*x)/2 - Rd*Fy
-        # [y - (Fy+Rd)/2]^2  = (-x^2 + Fx*x)/2 - Rd*Fy + (Fy+Rd)^2/4
-        # y - (Fy+Rd)/2 = +/-sqrt[(-x^2 + Fx*x)/2 - Rd*Fy + (Fy+Rd)^2/4]
-        # [7] y = +/-sqrt[(-x^2 + Fx*x)/2 - Rd*Fy + (Fy+Rd)^2/4] + (Fy+Rd)/2
-        # We are only interested in the bottom half of the circle:
-        # [8] y = -sqrt[(-x^2 + Fx*x)/2 - Rd*Fy + (Fy+Rd)^2/4] + (Fy+Rd)/2
-        # Eq [8] must intersect Eq [1]:
-        # -sqrt[(-x^2 + Fx*x)/2 - Rd*Fy + (Fy+Rd)^2/4] + (Fy+Rd)/2 = -sqrt(Rf^2 - (x-Fx)^2) + Fy
-        # Rearrange to find the zero:
-        # [9] -sqrt[(-x^2 + Fx*x)/2 - Rd*Fy + (Fy+Rd)^2/4] + (Fy+Rd)/2 +
-        #   sqrt(Rf^2 - (x-Fx)^2) - Fy = 0
-        """
-
-        # Highest point of single tooth contact
-        phi_hp = arccos(_gear.Rb/_gear.Rhp)
-        theta_hp = (_gear.tts/(2*_gear.Rs)) + invF(self.PA) - invF(phi_hp)
-        Rhp_x = _gear.Rhp*sin(theta_hp)
-        Rhp_y = _gear.Rhp*cos(theta_hp)
-
-        # angle between force normal direction and
-        # perpendicular to tooth centerline
-        gamma = phi_hp - theta_hp
-
-        # top of Lewis parabola
-        Rd = _gear.Rb / cos(gamma)
-        # alternately, Rd = Rhp_y - Rhp_x*tan(gamma) (GOIG 11.22)
-
-        # find center of fillet circle
-        Fx = (_gear.Rr + _gear.Rf)*sin(_gear.theta_F)
-        Fy = (_gear.Rr + _gear.Rf)*cos(_gear.theta_F)
-
-        if _gear.Rf == 0:
-            x = Fx
-            y = Fy
-            a = (y-Rd)/(x**2)
-        else:
-            # Eq [9] above
-            def func(x):
-                return real(-sqrt( (-(x**2) + Fx*x)/2 - Rd*Fy + ((Fy+Rd)**2)/4) + (Fy+Rd)/2 +
-                        sqrt(_gear.Rf**2 - (x-Fx)**2) - Fy)
-
-            # starting point is between the JFI and fillet center
-            initialGuess = Fx - _gear.Rf/2
-
-            sol = least_squares(func, x0=initialGuess)
-            x = sol.x.item()
-            y = -sqrt(_gear.Rf**2 - (x-Fx)**2) + Fy 	# Eq [1] above
-            a = (y-Rd)/(x**2)                               # Eq [3] above
-
-        return [Rd, gamma, x, y, a]
+            self.drawStress(_gear, _canvas, _gear.lewisParams)
 
 # Main ########################################################################
 if __name__ == "__main__":
@@ -0,0 +1,43 @@
+# Speed / accuracy profiles
+#
+# xtol              Newton step tolerance of the geometry solves, relative
+# lewisPolish       Newton steps polishing the Lewis parabola quartic root
+# chordTolerance    chord error of tessellated tooth profiles, mm
+# parabolaSamples   points of the Lewis parabola drawn on the stress tab
+# frameInterval     ms between frames of the mesh animation
+profiles = {
+    'draft' : {
+        'xtol' : 1e-7,
+        'lewisPolish' : 0,
+        'chordTolerance' : 5e-2,
+        'parabolaSamples' : 9,
+        'frameInterval' : 60,
+    },
+    'interactive' : {
+        'xtol' : 1e-10,
+        'lewisPolish' : 1,
+        'chordTolerance' : 1e-2,
+        'parabolaSamples' : 25,
+        'frameInterval' : 30,
+    },
+    'export' : {
+        'xtol' : 1e-13,
+        'lewisPolish' : 2,
+        'chordTolerance' : 1e-4,
+        'parabolaSamples' : 101,
+        'frameInterval' : 15,
+    },
+}
+
+active = 'interactive'
+
+def setQuality(name):
+    """Makes one of the profiles the active one, for everything that reads setting()."""
+    global active
+    if name not in profiles:
+        raise ValueError("Unknown quality profile '"+str(name)+"', use one of "+", ".join(profiles))
+    active = name
+
+def setting(key):
+    """Value of a setting in the active profile."""
+    return profiles[active][key]
@@ -0,0 +1,329 @@
+from involute import tau, invF, revInvF
+
+import math
+
+import numpy as np
+from numpy import pi, sin, cos, tan, arccos
+from numpy import where, isfinite
+
+def newtonSafe(func, dfunc, x0, lo, hi, xtol=1e-13, maxiter=50, warm=False):
+    """Vectorized safeguarded Newton for a bracketed root of func.
+
+    Newton steps use the analytic derivative dfunc, and the bracket [lo, hi]
+    shrinks around the sign change on every iteration.  Any step that leaves
+    the bracket (or is not finite) is replaced by a bisection step, so the
+    solve converges whenever the root is bracketed.  Works on scalars and
+    arrays; scalar inputs skip the array bookkeeping.
+
+    warm says x0 is already close to the root, e.g. from continuation along a
+    sweep.  Scalar solves then try a few plain Newton steps before evaluating
+    the bracket, which is only safe for functions with a single root in it.
+
+    Returns (root, converged).  Elements without a sign change in [lo, hi]
+    come back as NaN.
+    """
+    if np.ndim(x0) == 0 and np.ndim(lo) == 0 and np.ndim(hi) == 0:
+        return _newtonSafeScalar(func, dfunc, float(x0), float(lo), float(hi), xtol, maxiter, warm)
+
+    x, lo, hi = np.broadcast_arrays(np.asarray(x0, dtype=float),
+                                    np.asarray(lo, dtype=float),
+                                    np.asarray(hi, dtype=float))
+    x = x.copy()
+
+    # orient the bracket so that func(lo) <= 0 <= func(hi)
+    f_lo = func(lo)
+    f_hi = func(hi)
+    bracketed = isfinite(f_lo) & isfinite(f_hi) & (f_lo*f_hi <= 0)
+    lo, hi = where(f_lo > 0, hi, lo), where(f_lo > 0, lo, hi)
+
+    # start inside the bracket
+    outside = ~isfinite(x) | ((x - lo)*(x - hi) > 0)
+    x = where(outside, 0.5*(lo + hi), x)
+
+    done = ~bracketed
+    for i in range(maxiter):
+        f = func(x)
+        df = dfunc(x)
+
+        # shrink the bracket
+        lo = where(f < 0, x, lo)
+        hi = where(f < 0, hi, x)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_new = x - f/df
+        # bisect when the Newton step leaves the bracket
+        bad = ~isfinite(x_new) | ((x_new - lo)*(x_new - hi) > 0)
+        x_new = where(bad, 0.5*(lo + hi), x_new)
+
+        done = done | (f == 0) | (abs(x_new - x) <= xtol*(1 + abs(x)))
+        x = where(done, x, x_new)
+        if np.all(done):
+            break
+
+    converged = bracketed & done
+    root = where(bracketed, x, np.nan)
+
+    return root, converged
+
+def _newtonSafeScalar(func, dfunc, x, lo, hi, xtol, maxiter, warm):
+    # plain Newton first, a good starting point converges without evaluating
+    # the bracket
+    if warm and math.isfinite(x) and (x - lo)*(x - hi) <= 0:
+        x_start = x
+        for i in range(3):
+            f = func(x)
+            df = dfunc(x)
+            if f == 0:
+                return x, True
+            x_new = x - f/df if df != 0 else np.nan
+            if not math.isfinite(x_new) or (x_new - lo)*(x_new - hi) > 0:
+                break
+            if abs(x_new - x) <= xtol*(1 + abs(x)):
+                return x_new, True
+            x = x_new
+        x = x_start
+
+    f_lo = func(lo)
+    f_hi = func(hi)
+    if not (math.isfinite(f_lo) and math.isfinite(f_hi) and f_lo*f_hi <= 0):
+        return np.nan, False
+    if f_lo > 0:
+        lo, hi = hi, lo
+
+    if not math.isfinite(x) or (x - lo)*(x - hi) > 0:
+        x = 0.5*(lo + hi)
+
+    for i in range(maxiter):
+        f = func(x)
+        if f == 0:
+            return x, True
+        if f < 0:
+            lo = x
+        else:
+            hi = x
+
+        df = dfunc(x)
+        x_new = x - f/df if df != 0 else np.nan
+        if not math.isfinite(x_new) or (x_new - lo)*(x_new - hi) > 0:
+            x_new = 0.5*(lo + hi)
+
+        if abs(x_new - x) <= xtol*(1 + abs(x)):
+            return x_new, True
+        x = x_new
+
+    return x, False
+
+# Gear specific solvers #######################################################
+def solveOPA(N1, Rb1, Rb2, tts1, tts2, Rs1, Rs2, PA, bkl=0, CD=None, x0=None, xtol=1e-13):
+    """Finds the operating pressure angle of a gear mesh.
+
+    Both pitch circles share the operating pressure angle, Rp = Rb/cos(OPA),
+    so the mesh reduces to one equation in OPA.  With the center distance as
+    the input it's closed form, CD = (Rb1+Rb2)/cos(OPA).  With backlash as the
+    input, the circular pitch must hold both tooth thicknesses plus backlash:
+        (tau*Rp1)/N1 = tt1 + tt2 + bkl
+        tt = Rp*( (tts/Rs) + 2*(invF(PA) - invF(OPA)) )
+    Multiplying through by cos(OPA):
+        2*(Rb1+Rb2)*invF(OPA) - K - bkl*cos(OPA) = 0
+        K = Rb1*(tts1/Rs1 + 2*invF(PA)) + Rb2*(tts2/Rs2 + 2*invF(PA)) - tau*Rb1/N1
+    which is solved by safeguarded Newton to xtol, starting from the zero
+    backlash closed form invF(OPA) = K / (2*(Rb1+Rb2)) unless x0 is given.
+
+    Works on scalars and arrays.  Returns (OPA, converged).
+    """
+    if CD is not None:
+        with np.errstate(invalid='ignore'):
+            OPA = arccos((Rb1 + Rb2) / CD)
+        return OPA, isfinite(OPA)
+
+    invS = invF(PA)
+    S2 = 2*(Rb1 + Rb2)
+    K = Rb1*(tts1/Rs1 + 2*invS) + Rb2*(tts2/Rs2 + 2*invS) - tau*Rb1/N1
+
+    def func(OPA):
+        return S2*invF(OPA) - K - bkl*cos(OPA)
+
+    def dfunc(OPA):
+        return S2*tan(OPA)**2 + bkl*sin(OPA)
+
+    if x0 is None:
+        # initial guess ignores the change of cos(OPA) in the backlash term
+        with np.errstate(invalid='ignore'):
+            x0 = revInvF(np.maximum((K + bkl*cos(PA)) / S2, 1e-12))
+
+    # the closed form guess is close, so it's a warm start either way
+    return newtonSafe(func, dfunc, x0, 0, pi/2 - 1e-9, xtol=xtol, warm=True)
+
+def solveMaxTipRadius(Rb, Ro, theta_B, x0=None, xtol=1e-13):
+    """Finds the max tip radius, where the tip fillet center sits on the tooth centerline.
+
+    theta_B is the angle between the tooth centerline and the involute at the
+    base circle, tts/(2*Rs) + invF(PA).  See GearPair.updateMaxTipRadius for
+    the geometry.  With t = tan(phi_A) the angle between line CE and the tooth
+    centerline is alpha = t - theta_B, and RTip1 = RTip2 becomes
+        g(t) = Rb*t - Rb*tan(alpha) + Rb/cos(alpha) - Ro = 0
+        g'(t) = Rb*tan(alpha)*(1/cos(alpha) - tan(alpha))
+    g increases monotonically from alpha = 0 (fillet center on the base
+    circle) to the point where the involute reaches Ro, which brackets the
+    root.  A pointed tooth, Ro = Romax, puts the root on the end of the
+    bracket where rounding can hide the sign change, so it is returned
+    directly as Rtip_max = 0.  x0 is an optional starting t, e.g. from a
+    neighbouring design, and xtol the Newton step tolerance.
+
+    Works on scalars and arrays.  Returns (Rtip_max, phi_tip, converged),
+    where phi_tip is the profile angle where the tip radius meets the
+    involute; failed solves return NaN.
+    """
+    def func(t):
+        alpha = t - theta_B
+        return Rb*t - Rb*tan(alpha) + Rb/cos(alpha) - Ro
+
+    def dfunc(t):
+        alpha = t - theta_B
+        return Rb*tan(alpha)*(1/cos(alpha) - tan(alpha))
+
+    with np.errstate(invalid='ignore'):
+        t_O = np.sqrt(Ro**2 - Rb**2) / Rb
+    warm = x0 is not None
+    if not warm:
+        x0 = 0.5*(theta_B + t_O)
+
+    with np.errstate(invalid='ignore'):
+        pointed = abs(func(t_O)) <= 1e-12*Ro
+
+    t, converged = newtonSafe(func, dfunc, x0, theta_B, t_O, xtol=xtol, warm=warm)
+
+    t = where(pointed, t_O, t)
+    Rtip_max = where(pointed, 0, Rb*t - Rb*tan(t - theta_B))
+    converged = pointed | converged
+
+    return Rtip_max[()], np.arctan(t)[()], converged[()]
+
+def solveFullFillet(N, Rb, Rr, Ro, theta_B, x0=None, xtol=1e-13):
+    """Finds the full root fillet radius, a fillet that fills the whole tooth gap.
+
+    theta_B is the angle between the tooth centerline and the involute at the
+    base circle, tts/(2*Rs) + invF(PA).  See GearPair.updateMaxRootFillet for
+    the geometry.  The fillet center sits on the center of the tooth gap, at
+    alpha = pi/N - theta_B from the involute's base circle point.  With
+    t = tan(phi_A), phi_F = alpha + t and Rf1 = Rf2 becomes
+        h(t) = Rb*(tan(phi_F) - t) - Rb/cos(phi_F) + Rr = 0
+        h'(t) = Rb*tan(phi_F)*(tan(phi_F) - 1/cos(phi_F))
+    h decreases monotonically from the base circle to Ro, which brackets the
+    root.  When h is already negative at the base circle the root circle is
+    too small for the fillet to reach the involute, the tooth is undercut and
+    the fillet meets the base circle instead:
+        Rff = Rr*sin(alpha) / (1 - sin(alpha))
+    x0 is an optional starting t, e.g. from a neighbouring design, and xtol
+    the Newton step tolerance.
+
+    Works on scalars and arrays.  Returns (Rff, phi_JFI, converged), where
+    phi_JFI is the profile angle where the full fillet meets the involute.
+    """
+    # angle between involute at base circle and center of tooth gap
+    alpha = pi/N - theta_B
+
+    def func(t):
+        phi_F = alpha + t
+        return Rb*(tan(phi_F) - t) - Rb/cos(phi_F) + Rr
+
+    def dfunc(t):
+        phi_F = alpha + t
+        return Rb*tan(phi_F)*(tan(phi_F) - 1/cos(phi_F))
+
+    with np.errstate(invalid='ignore'):
+        t_O = np.sqrt(Ro**2 - Rb**2) / Rb
+    warm = x0 is not None
+    if not warm:
+        x0 = 0.5*t_O
+
+    # full fillet radius with the JFI on the base circle sets the smallest
+    # root radius that avoids undercut
+    undercut = Rr < Rb/cos(alpha) - Rb*tan(alpha)
+
+    t, converged = newtonSafe(func, dfunc, x0, 0, t_O, xtol=xtol, warm=warm)
+
+    Rff = where(undercut, Rr*sin(alpha) / (1 - sin(alpha)), Rb*(tan(alpha + t) - t))
+    phi_JFI = where(undercut, 0, np.arctan(t))
+    converged = undercut | converged
+
+    return Rff[()], phi_JFI[()], converged[()]
+
+def _quarticRoots(coef):
+    """Roots of a stack of quartics, coefficients lowest degree first as in numpy.polynomial.
+
+    Uses the same companion matrix as numpy.polynomial.polynomial.polyroots,
+    built for the whole stack so the eigenvalue solve is one batched call.
+    Rows with non-finite coefficients come back as NaN.
+    """
+    ok = np.all(isfinite(coef), axis=-1) & (coef[..., -1] != 0)
+    coef = where(ok[..., None], coef, [-1, 0, 0, 0, 1])
+
+    mat = np.zeros(coef.shape[:-1] + (4, 4))
+    mat[..., 1:, :-1] = np.eye(3)
+    mat[..., :, -1] = -coef[..., :-1] / coef[..., -1:]
+
+    roots = np.linalg.eigvals(mat)
+    return where(ok[..., None], roots, np.nan)
+
+def solveLewisParabola(Rb, Rload, theta_B, Rr, Rf, theta_F, polish=2):
+    """Finds the Lewis parabola tangent to the root fillet circle.
+
+    Rload is the radius of the load point on the involute, e.g. the highest
+    point of single tooth contact; theta_B is tts/(2*Rs) + invF(PA) and
+    theta_F the angle of the fillet center from the tooth centerline.  The
+    top of the parabola, Rd, is where the force line crosses the tooth
+    centerline.  See GearPair.lewisParabola.
+
+    The tangent point is parametrized on the lower left quarter of the fillet
+    circle, P = F - Rf*(cos(psi), sin(psi)) with psi in [0, pi/2].  Tangency
+    of y = a*x^2 + Rd at P, 2*(y-Rd)*(y-Fy) + x*(x-Fx) = 0, becomes a quartic
+    in u = tan(psi/2):
+        (Fx+Rf)*u^4 - 4*D*u^3 + 6*Rf*u^2 - 4*D*u + (Rf-Fx) = 0,  D = Fy-Rd
+    which is solved for its real root in [0, 1] and polished with the given
+    number of Newton steps.
+
+    Inputs broadcast, so arrays of gears and arrays of load positions are
+    evaluated in one call.  Returns (Rd, gamma, x, y, a, converged); solves
+    without a tangent point return NaN.
+    """
+    Rb, Rload, theta_B, Rr, Rf, theta_F = np.broadcast_arrays(
+        *[np.asarray(v, dtype=float) for v in (Rb, Rload, theta_B, Rr, Rf, theta_F)])
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # angle between force normal direction and
+        # perpendicular to tooth centerline
+        phi_L = arccos(Rb/Rload)
+        gamma = phi_L - theta_B + invF(phi_L)
+        # top of Lewis parabola
+        Rd = Rb / cos(gamma)
+
+        # center of fillet circle
+        Fx = (Rr + Rf)*sin(theta_F)
+        Fy = (Rr + Rf)*cos(theta_F)
+        D = Fy - Rd
+
+        coef = np.stack([Rf - Fx, -4*D, 6*Rf, -4*D, Fx + Rf], axis=-1)
+        roots = _quarticRoots(coef)
+
+        # real roots on the quarter circle, take the one nearest the JFI
+        u = roots.real
+        valid = (abs(roots.imag) <= 1e-7*(1 + abs(u))) & (u >= -1e-9) & (u <= 1 + 1e-9)
+        u = np.min(where(valid, u, np.inf), axis=-1)
+        solved = isfinite(u)
+        u = np.clip(where(solved, u, np.nan), 0, 1)
+
+        # polish the eigenvalue root
+        for i in range(polish):
+            f = (((coef[..., 4]*u + coef[..., 3])*u + coef[..., 2])*u + coef[..., 1])*u + coef[..., 0]
+            df = ((4*coef[..., 4]*u + 3*coef[..., 3])*u + 2*coef[..., 2])*u + coef[..., 1]
+            u = where(df != 0, np.clip(u - f/df, 0, 1), u)
+
+        psi = 2*np.arctan(u)
+        x = where(Rf == 0, Fx, Fx - Rf*cos(psi))
+        y = where(Rf == 0, Fy, Fy - Rf*sin(psi))
+        a = (y - Rd)/(x**2)
+
+    converged = (solved | (Rf == 0)) & isfinite(a)
+
+    return Rd[()], gamma[()], x[()], y[()], a[()], converged[()]